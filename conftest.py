@@ -118,6 +118,16 @@ MSCOLAB_SSO_DIR = fs.path.join(DATA_DIR, 'datasso')
 # In the unit days when Operations get archived because not used
 ARCHIVE_THRESHOLD = 30
 
+# In the unit seconds in which the saves of a user are recorded as a single change
+SAVE_BATCH_SECONDS = 0
+
+# In the unit seconds in which the files of changed operations are committed to their git
+# repositories, set to 0 to disable
+GIT_SNAPSHOT_SECONDS = 0
+
+# maximum number of chat messages or changes returned by a single paginated request
+MAX_PAGE_SIZE = 1000
+
 # To enable logging set to True or pass a logger object to use.
 SOCKETIO_LOGGER = True
 
@@ -26,10 +26,11 @@
 """
 import datetime
 import fs
+from sqlalchemy.orm import joinedload, selectinload
 
 from mslib.mscolab.conf import mscolab_settings
 from mslib.mscolab.models import db, Message, MessageType
-from mslib.mscolab.utils import get_message_dict
+from mslib.mscolab.utils import created_before, get_message_dict
 
 
 class ChatManager:
@@ -52,20 +53,32 @@ class ChatManager:
         db.session.commit()
         return message
 
-    def get_messages(self, op_id, timestamp=None):
+    def get_messages(self, op_id, timestamp=None, before=None, before_id=None, limit=None):
         """
         op_id: operation id
         timestamp:  if provided, messages only after this time stamp is provided
+        before, before_id: if provided, messages only before the message created at
+            this time stamp with this id are provided
+        limit: if provided, only the latest limit messages are provided
+
+        messages are ordered from old to new
         """
         if timestamp is None:
             timestamp = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
         else:
             timestamp = datetime.datetime.fromisoformat(timestamp)
-        messages = Message.query \
+        query = Message.query \
+            .options(joinedload(Message.user), selectinload(Message.replies).joinedload(Message.user)) \
             .filter(Message.op_id == op_id) \
             .filter(Message.reply_id.is_(None)) \
-            .filter(Message.created_at > timestamp) \
-            .all()
+            .filter(Message.created_at > timestamp)
+        if before is not None:
+            query = query.filter(created_before(Message, before, before_id))
+        if limit is None:
+            messages = query.order_by(Message.created_at, Message.id).all()
+        else:
+            messages = query.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit).all()
+            messages.reverse()
 
         message_list = []
         for message in messages:
@@ -43,6 +43,16 @@ class default_mscolab_settings:
     # In the unit days when Operations get archived because not used
     ARCHIVE_THRESHOLD = 30
 
+    # In the unit seconds in which the saves of a user are recorded as a single change
+    SAVE_BATCH_SECONDS = 30
+
+    # In the unit seconds in which the files of changed operations are committed to their git
+    # repositories, set to 0 to disable
+    GIT_SNAPSHOT_SECONDS = 600
+
+    # maximum number of chat messages or changes returned by a single paginated request
+    MAX_PAGE_SIZE = 1000
+
     # To enable logging set to True or pass a logger object to use.
     SOCKETIO_LOGGER = False
 
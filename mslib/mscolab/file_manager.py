@@ -34,10 +34,14 @@ import logging
 import git
 import threading
 import mimetypes
+import zlib
 from werkzeug.utils import secure_filename
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import defer, joinedload
 from mslib.mscolab.models import db, Operation, Permission, User, Change, Message
 from mslib.mscolab.conf import mscolab_settings
+from mslib.mscolab.utils import created_before
+from mslib.utils.waypoint_patch import apply_waypoint_patch, read_waypoints, write_waypoints
 
 
 class FileManager:
@@ -47,6 +51,10 @@ class FileManager:
         self.data_dir = data_dir
         self.operation_dict_lock = threading.Lock()
         self.operation_locks = {}
+        # version of the flight track of each operation, counted up on each change;
+        # it starts over when the server is restarted, clients of another
+        # version then fall back to the whole file
+        self.operation_versions = {}
 
     def _get_operation_lock(self, op_id):
         with self.operation_dict_lock:
@@ -86,13 +94,14 @@ class FileManager:
                 import_op = Operation.query.filter_by(path=f"{category}{mscolab_settings.GROUP_POSTFIX}").first()
                 if import_op is not None:
                     self.import_permissions(import_op.id, operation_id, user.id)
-            data = fs.open_fs(self.data_dir)
-            data.makedir(operation.path)
-            operation_file = data.open(fs.path.combine(operation.path, 'main.ftml'), 'w')
-            if content is not None:
-                operation_file.write(content)
-            else:
-                operation_file.write(mscolab_settings.STUB_CODE)
+            with fs.open_fs(self.data_dir) as data:
+                data.makedir(operation.path)
+                # the file has to be complete before it is committed
+                with data.open(fs.path.combine(operation.path, 'main.ftml'), 'w') as operation_file:
+                    if content is not None:
+                        operation_file.write(content)
+                    else:
+                        operation_file.write(mscolab_settings.STUB_CODE)
             operation_path = fs.path.combine(self.data_dir, operation.path)
             r = git.Repo.init(operation_path)
             r.git.clear_cache()
@@ -375,6 +384,7 @@ class FileManager:
             operation_dir.removetree(operation.path)
         db.session.delete(operation)
         db.session.commit()
+        self.operation_versions.pop(op_id, None)
         return True
 
     def get_authorized_users(self, op_id):
@@ -401,37 +411,191 @@ class FileManager:
 
         op_lock = self._get_operation_lock(operation.id)
         with op_lock:
+            return self._write_file(operation, content, user)
+
+    def patch_file(self, op_id, ops, version, user):
+        """
+        op_id: operation-id
+        ops: waypoint operations, see mslib.utils.waypoint_patch
+        version: version of the flight track the operations apply to
+        user: user of this request
+
+        returns the new version of the flight track, or False if version is outdated
+        or the operations do not apply
+        """
+        operation = Operation.query.filter_by(id=op_id).first()
+        if not operation:
+            return False
+
+        op_lock = self._get_operation_lock(operation.id)
+        with op_lock:
+            if version != self.operation_versions.get(operation.id, 0):
+                logging.debug("outdated patch of version %s for %s", version, operation.path)
+                return False
             with fs.open_fs(self.data_dir) as data:
-                """
-                old file is read, the diff between old and new is calculated and stored
-                as 'Change' in changes table. comment for each change is optional
-                """
                 old_data = data.readtext(fs.path.combine(operation.path, 'main.ftml'))
-                old_data_lines = old_data.splitlines()
-                content_lines = content.splitlines()
-                diff = difflib.unified_diff(old_data_lines, content_lines, lineterm='')
-                diff_content = '\n'.join(list(diff))
-                data.writetext(fs.path.combine(operation.path, 'main.ftml'), content)
-            # commit changes if comment is not None
-            if diff_content != "":
-                # commit to git repository
-                operation_path = fs.path.combine(self.data_dir, operation.path)
-                repo = git.Repo(operation_path)
-                repo.git.clear_cache()
-                repo.index.add(['main.ftml'])
-                cm = repo.index.commit("committing changes")
-                # change db table
-                change = Change(op_id, user.id, cm.hexsha)
-                db.session.add(change)
-                db.session.commit()
-                return True
+            try:
+                waypoints = apply_waypoint_patch(read_waypoints(old_data), ops)
+            except ValueError as ex:
+                logging.debug("invalid patch for %s: %s", operation.path, ex)
+                return False
+            if not self._write_file(operation, write_waypoints(waypoints), user):
+                # the operations did not change the flight track, the version counts them nevertheless
+                self.operation_versions[operation.id] = version + 1
+            return self.operation_versions[operation.id]
+
+    def _write_file(self, operation, content, user):
+        """
+        writes content to the file of operation and records it as change, the
+        operation lock has to be held by the caller
+
+        The content of each change is stored compressed in the database, the git
+        repository of the operation only gets snapshots by snapshot_operations.
+        Saves by the same user within SAVE_BATCH_SECONDS are recorded as a single change.
+
+        returns True if the content changed
+        """
+        with fs.open_fs(self.data_dir) as data:
+            """
+            old file is read, the diff between old and new is calculated and stored
+            as 'Change' in changes table. comment for each change is optional
+            """
+            old_data = data.readtext(fs.path.combine(operation.path, 'main.ftml'))
+            old_data_lines = old_data.splitlines()
+            content_lines = content.splitlines()
+            diff = difflib.unified_diff(old_data_lines, content_lines, lineterm='')
+            diff_content = '\n'.join(list(diff))
+            if diff_content == "":
+                return False
+            data.writetext(fs.path.combine(operation.path, 'main.ftml'), content)
+        compressed_content = zlib.compress(content.encode("utf-8"))
+        batched_change = self._get_batched_change(operation, user)
+        if batched_change is None:
+            # change db table, the commit hash is set when a snapshot is committed
+            change = Change(operation.id, user.id, None, content=compressed_content)
+            db.session.add(change)
+        else:
+            batched_change.content = compressed_content
+            # a snapshot of the change taken before is outdated
+            batched_change.commit_hash = None
+        db.session.commit()
+        self.operation_versions[operation.id] = self.operation_versions.get(operation.id, 0) + 1
+        return True
+
+    def _get_batched_change(self, operation, user):
+        """
+        returns the latest change of operation, if a save by user becomes part of it,
+        which is only the case for changes made by a save
+        """
+        change = Change.query\
+            .filter(Change.op_id == operation.id)\
+            .order_by(Change.id.desc())\
+            .first()
+        if (change is None or change.u_id != user.id or change.version_name is not None or
+                change.comment is not None or change.content is None):
+            return None
+        batch_end = change.created_at + datetime.timedelta(seconds=mscolab_settings.SAVE_BATCH_SECONDS)
+        if datetime.datetime.now(tz=datetime.timezone.utc) > batch_end:
+            return None
+        return change
+
+    def _read_change_content(self, operation, change):
+        """
+        returns the content of the file of operation after change
+        """
+        if change.content is not None:
+            return zlib.decompress(change.content).decode("utf-8")
+        # changes recorded before the contents were stored in the database
+        operation_path = fs.path.combine(self.data_dir, operation.path)
+        repo = git.Repo(operation_path)
+        return repo.git.show(f'{change.commit_hash}:main.ftml')
+
+    def _snapshot_operation(self, operation):
+        """
+        commits the file of operation to git, if its latest change is not committed yet,
+        the operation lock has to be held by the caller
+
+        returns True if a commit was made
+        """
+        change = Change.query\
+            .filter(Change.op_id == operation.id)\
+            .order_by(Change.id.desc())\
+            .first()
+        if change is None or change.commit_hash is not None:
             return False
+        operation_path = fs.path.combine(self.data_dir, operation.path)
+        repo = git.Repo(operation_path)
+        repo.git.clear_cache()
+        repo.index.add(['main.ftml'])
+        cm = repo.index.commit(f"snapshot of change {change.id}")
+        change.commit_hash = cm.hexsha
+        db.session.commit()
+        return True
+
+    def snapshot_operations(self):
+        """
+        commits the files of all operations changed since their last snapshot to git
+
+        returns the number of commits made
+        """
+        latest_changes = db.session.query(db.func.max(Change.id)).group_by(Change.op_id)
+        op_ids = [change.op_id for change in Change.query
+                  .filter(Change.id.in_(latest_changes))
+                  .filter(Change.commit_hash.is_(None))
+                  .all()]
+        count = 0
+        for op_id in op_ids:
+            with self._get_operation_lock(op_id):
+                operation = Operation.query.filter_by(id=op_id).first()
+                if operation is not None and self._snapshot_operation(operation):
+                    count += 1
+        return count
+
+    def import_git_changes(self):
+        """
+        stores the contents of the changes, which are only kept in the git repositories
+        of the operations, in the database
+
+        returns the number of imported changes
+        """
+        changes = Change.query\
+            .filter(Change.content.is_(None))\
+            .filter(~Change.commit_hash.is_(None))\
+            .order_by(Change.op_id)\
+            .all()
+        count = 0
+        for change in changes:
+            operation = Operation.query.filter_by(id=change.op_id).first()
+            if operation is None:
+                continue
+            with self._get_operation_lock(operation.id):
+                try:
+                    content = self._read_change_content(operation, change)
+                except (git.exc.GitError, fs.errors.FSError) as ex:
+                    logging.warning("can't import change %s of %s: %s", change.id, operation.path, ex)
+                    continue
+            change.content = zlib.compress(content.encode("utf-8"))
+            count += 1
+        db.session.commit()
+        return count
 
     def get_file(self, op_id, user):
         """
         op_id: operation-id
         user: user of this request
         """
+        result = self.get_file_and_version(op_id, user)
+        if result is False:
+            return False
+        return result[0]
+
+    def get_file_and_version(self, op_id, user):
+        """
+        op_id: operation-id
+        user: user of this request
+
+        returns the content of the file together with its version
+        """
         perm = Permission.query.filter_by(u_id=user.id, op_id=op_id).first()
         if perm is None:
             return False
@@ -443,32 +607,35 @@ class FileManager:
             with fs.open_fs(self.data_dir) as data:
                 operation_file = data.open(fs.path.combine(operation.path, 'main.ftml'), 'r')
                 operation_data = operation_file.read()
-            return operation_data
+            return operation_data, self.operation_versions.get(op_id, 0)
 
-    def get_all_changes(self, op_id, user, named_version=False):
+    def get_all_changes(self, op_id, user, named_version=False, before=None, before_id=None, limit=None):
         """
         op_id: operation-id
         user: user of this request
+        named_version: if True, only named versions are provided
+        before, before_id: if provided, only changes before the change created at
+            this time stamp with this id are provided
+        limit: if provided, only the latest limit changes are provided
 
         Get all changes, mostly to be used in the chat window, in the side panel
-        to render the recent changes.
+        to render the recent changes. Changes are ordered from new to old.
         """
         perm = Permission.query.filter_by(u_id=user.id, op_id=op_id).first()
         if perm is None:
             return False
+        query = Change.query\
+            .options(joinedload(Change.user), defer(Change.content))\
+            .filter(Change.op_id == op_id)
         # Get only named versions
         if named_version:
-            changes = Change.query\
-                .filter(Change.op_id == op_id)\
-                .filter(~Change.version_name.is_(None))\
-                .order_by(Change.created_at.desc())\
-                .all()
-        # Get all changes
-        else:
-            changes = Change.query\
-                .filter_by(op_id=op_id)\
-                .order_by(Change.created_at.desc())\
-                .all()
+            query = query.filter(~Change.version_name.is_(None))
+        if before is not None:
+            query = query.filter(created_before(Change, before, before_id))
+        query = query.order_by(Change.created_at.desc(), Change.id.desc())
+        if limit is not None:
+            query = query.limit(limit)
+        changes = query.all()
 
         return list(map(lambda change: {
             'id': change.id,
@@ -494,10 +661,7 @@ class FileManager:
         if not change:
             return False
         operation = Operation.query.filter_by(id=change.op_id).first()
-        operation_path = fs.path.combine(self.data_dir, operation.path)
-        repo = git.Repo(operation_path)
-        change_content = repo.git.show(f'{change.commit_hash}:main.ftml')
-        return change_content
+        return self._read_change_content(operation, change)
 
     def set_version_name(self, ch_id, op_id, u_id, version_name):
         if (not self.is_admin(u_id, op_id) and not self.is_creator(u_id, op_id) and not
@@ -529,18 +693,16 @@ class FileManager:
 
         op_lock = self._get_operation_lock(operation.id)
         with op_lock:
-            operation_path = fs.path.join(self.data_dir, operation.path)
-            repo = git.Repo(operation_path)
-            repo.git.clear_cache()
             try:
-                file_content = repo.git.show(f'{ch.commit_hash}:main.ftml')
-                with fs.open_fs(operation_path) as proj_fs:
-                    proj_fs.writetext('main.ftml', file_content)
-                repo.index.add(['main.ftml'])
-                cm = repo.index.commit(f"checkout to {ch.commit_hash}")
-                change = Change(ch.op_id, user.id, cm.hexsha)
+                file_content = self._read_change_content(operation, ch)
+                with fs.open_fs(self.data_dir) as data:
+                    data.writetext(fs.path.combine(operation.path, 'main.ftml'), file_content)
+                # the comment keeps later saves from being batched into the undo
+                change = Change(ch.op_id, user.id, None, comment=f"checkout to change {ch.id}",
+                                content=zlib.compress(file_content.encode("utf-8")))
                 db.session.add(change)
                 db.session.commit()
+                self.operation_versions[operation.id] = self.operation_versions.get(operation.id, 0) + 1
                 return True
             except Exception as ex:
                 logging.debug(ex)
@@ -179,6 +179,7 @@ class Operation(db.Model):
 class Message(db.Model):
 
     __tablename__ = "messages"
+    __table_args__ = (db.Index("ix_messages_op_id_created_at", "op_id", "created_at"),)
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)  # noqa: A003
     op_id = db.Column(db.Integer, db.ForeignKey('operations.id'))
     u_id = db.Column(db.Integer, db.ForeignKey('users.id'))
@@ -203,6 +204,7 @@ class Message(db.Model):
 class Change(db.Model):
 
     __tablename__ = "changes"
+    __table_args__ = (db.Index("ix_changes_op_id_created_at", "op_id", "created_at"),)
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)  # noqa: A003
     op_id = db.Column(db.Integer, db.ForeignKey('operations.id'))
     u_id = db.Column(db.Integer, db.ForeignKey('users.id'))
@@ -210,11 +212,14 @@ class Change(db.Model):
     version_name = db.Column(db.String(255), default=None)
     comment = db.Column(db.String(255), default=None)
     created_at = db.Column(AwareDateTime, default=lambda: datetime.datetime.now(tz=datetime.timezone.utc))
+    # zlib compressed content of the file after this change, None for changes only kept in git
+    content = db.Column(db.LargeBinary, default=None)
     user = db.relationship('User')
 
-    def __init__(self, op_id, u_id, commit_hash, version_name=None, comment=None):
+    def __init__(self, op_id, u_id, commit_hash, version_name=None, comment=None, content=None):
         self.op_id = op_id
         self.u_id = u_id
         self.commit_hash = commit_hash
         self.version_name = version_name
         self.comment = comment
+        self.content = content
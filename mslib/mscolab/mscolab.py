@@ -95,6 +95,13 @@ def handle_db_seed():
     print("Database seeded successfully!")
 
 
+def handle_db_import_git_changes():
+    from mslib.mscolab.server import APP, fm
+    with APP.app_context():
+        count = fm.import_git_changes()
+    print(f"{count} changes imported from the git repositories into the database!")
+
+
 def handle_mscolab_certificate_init():
     print('generating CRTs for the mscolab server......')
 
@@ -378,6 +385,10 @@ def main():
                                  action="store_true")
     database_parser.add_argument("--add_all_to_all_operation", help="adds all users into all other operations",
                                  action="store_true")
+    database_parser.add_argument("--import_git_changes",
+                                 help="stores the changes only kept in the git repositories of the operations "
+                                      "in the database",
+                                 action="store_true")
     sso_conf_parser = subparsers.add_parser("sso_conf", help="single sign on process configurations")
     sso_conf_parser = sso_conf_parser.add_mutually_exclusive_group(required=True)
     sso_conf_parser.add_argument("--init_sso_crts",
@@ -460,6 +471,8 @@ def main():
                 # deletes users from the db
                 for email in args.delete_users_by_file.readlines():
                     delete_user(email.strip())
+        elif args.import_git_changes:
+            handle_db_import_git_changes()
 
     elif args.action == "sso_conf":
         if args.init_sso_crts:
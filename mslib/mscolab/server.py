@@ -135,7 +135,27 @@ def initialize_managers(app):
     return app, sockio, cm, fm
 
 
+def start_git_snapshots(app, sockio, fm):
+    """
+    starts the background task, which commits the files of the changed operations
+    to their git repositories every GIT_SNAPSHOT_SECONDS
+    """
+    def snapshot_operations():
+        while True:
+            sockio.sleep(mscolab_settings.GIT_SNAPSHOT_SECONDS)
+            with app.app_context():
+                try:
+                    count = fm.snapshot_operations()
+                    logging.debug("committed snapshots of %s operations", count)
+                except Exception as ex:
+                    logging.error("Can't commit snapshots of the operations: %s", ex)
+
+    if mscolab_settings.GIT_SNAPSHOT_SECONDS > 0:
+        sockio.start_background_task(snapshot_operations)
+
+
 _app, sockio, cm, fm = initialize_managers(APP)
+start_git_snapshots(_app, sockio, fm)
 
 
 def check_login(emailid, password):
@@ -399,6 +419,23 @@ def delete_own_account():
     return jsonify({"success": result}), 200
 
 
+def get_page_arguments():
+    """
+    returns the keyset pagination arguments before, before_id and limit of the request,
+    limit is clamped to 1..MAX_PAGE_SIZE, raises ValueError for malformed arguments
+    """
+    before = request.args.get("before", request.form.get("before", None))
+    before_id = request.args.get("before_id", request.form.get("before_id", None))
+    limit = request.args.get("limit", request.form.get("limit", None))
+    if before is not None:
+        datetime.datetime.fromisoformat(before)
+    if before_id is not None:
+        before_id = int(before_id)
+    if limit is not None:
+        limit = min(max(int(limit), 1), mscolab_settings.MAX_PAGE_SIZE)
+    return before, before_id, limit
+
+
 # Chat related routes
 @APP.route("/messages", methods=["GET"])
 @verify_user
@@ -407,7 +444,12 @@ def messages():
     op_id = request.args.get("op_id", request.form.get("op_id", None))
     if fm.is_member(user.id, op_id):
         timestamp = request.args.get("timestamp", request.form.get("timestamp", "1970-01-01T00:00:00+00:00"))
-        chat_messages = cm.get_messages(op_id, timestamp)
+        try:
+            datetime.datetime.fromisoformat(timestamp)
+            before, before_id, limit = get_page_arguments()
+        except ValueError as ex:
+            return jsonify({"success": False, "message": f"Invalid arguments: {ex}"}), 400
+        chat_messages = cm.get_messages(op_id, timestamp, before, before_id, limit)
         return jsonify({"messages": chat_messages})
     return "False"
 
@@ -480,10 +522,11 @@ def create_operation():
 def get_operation_by_id():
     op_id = request.args.get('op_id', request.form.get('op_id', None))
     user = g.user
-    result = fm.get_file(int(op_id), user)
+    result = fm.get_file_and_version(int(op_id), user)
     if result is False:
         return "False"
-    return json.dumps({"content": result})
+    content, version = result
+    return json.dumps({"content": content, "version": version})
 
 
 @APP.route('/get_all_changes', methods=['GET'])
@@ -491,8 +534,12 @@ def get_operation_by_id():
 def get_all_changes():
     op_id = request.args.get('op_id', request.form.get('op_id', None))
     named_version = request.args.get('named_version') == "True"
+    try:
+        before, before_id, limit = get_page_arguments()
+    except ValueError as ex:
+        return jsonify({"success": False, "message": f"Invalid arguments: {ex}"}), 400
     user = g.user
-    result = fm.get_all_changes(int(op_id), user, named_version)
+    result = fm.get_all_changes(int(op_id), user, named_version, before, before_id, limit)
     if result is False:
         jsonify({"success": False, "message": "Some error occurred!"})
     return jsonify({"success": True, "changes": result})
@@ -562,7 +609,7 @@ def update_operation():
     if r == "True":
         token = request.args.get('token', request.form.get('token', False))
         json_config = {"token": token}
-        sockio.sm.update_operation_list(json_config)
+        sockio.sm.update_operation_list(json_config, op_id=int(op_id))
     return r
 
 
@@ -592,7 +639,7 @@ def set_last_used():
         fm.update_operation(int(op_id), "active", True, user)
         token = request.args.get('token', request.form.get('token', False))
         json_config = {"token": token}
-        sockio.sm.update_operation_list(json_config)
+        sockio.sm.update_operation_list(json_config, op_id=int(op_id))
     return jsonify({"success": True}), 200
 
 
@@ -714,7 +761,7 @@ def import_permissions():
 
         token = request.args.get('token', request.form.get('token', False))
         json_config = {"token": token}
-        sockio.sm.update_operation_list(json_config)
+        sockio.sm.update_operation_list(json_config, op_id=current_op_id)
 
         sockio.sm.emit_operation_permissions_updated(user.id, current_op_id)
         return jsonify({"success": True})
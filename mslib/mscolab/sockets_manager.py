@@ -27,13 +27,13 @@
 import json
 import logging
 from flask import request
-from flask_socketio import SocketIO, join_room, leave_room
+from flask_socketio import SocketIO, join_room
 
 from mslib.mscolab.chat_manager import ChatManager
 from mslib.mscolab.file_manager import FileManager
 from mslib.mscolab.models import MessageType, Permission, User
 from mslib.mscolab.utils import get_message_dict
-from mslib.mscolab.utils import get_session_id
+from mslib.mscolab.utils import get_session_ids, get_user_room
 from mslib.mscolab.conf import mscolab_settings
 
 socketio = SocketIO(logger=mscolab_settings.SOCKETIO_LOGGER, engineio_logger=mscolab_settings.ENGINEIO_LOGGER,
@@ -57,16 +57,20 @@ class SocketsManager:
     def handle_connect(self):
         logging.debug(request.sid)
 
-    def update_operation_list(self, json_config):
+    def update_operation_list(self, json_config, op_id=None):
         """
         json_config has:
         - token: authentication token
+
+        op_id: operation id, the members of this operation are notified,
+               if None only the sessions of the requesting user are notified
         """
         token = json_config["token"]
         user = User.verify_auth_token(token)
         if not user:
             return
-        socketio.emit('operation-list-update')
+        room = get_user_room(user.id) if op_id is None else str(op_id)
+        socketio.emit('operation-list-update', to=room)
 
     def join_creator_to_operation(self, json_config):
         """
@@ -87,14 +91,12 @@ class SocketsManager:
             - u_id: user id(collaborator's id)
             - op_id: operation id
         """
-        s_id = get_session_id(self.sockets, u_id)
-        if s_id is not None:
-            join_room(str(op_id), sid=s_id)
+        for s_id in get_session_ids(self.sockets, u_id):
+            socketio.server.enter_room(s_id, str(op_id), namespace="/")
 
     def remove_collaborator_from_operation(self, u_id, op_id):
-        s_id = get_session_id(self.sockets, u_id)
-        if s_id is not None:
-            leave_room(str(op_id), sid=s_id)
+        for s_id in get_session_ids(self.sockets, u_id):
+            socketio.server.leave_room(s_id, str(op_id), namespace="/")
 
     def handle_start_event(self, json_config):
         """
@@ -125,6 +127,8 @@ class SocketsManager:
             - so joining the actual socketio room would be enough
             """
             join_room(str(permission.op_id))
+        # notifications addressed to this user only, e.g. a new permission
+        join_room(get_user_room(user.id))
         socket_storage = {
             's_id': request.sid,
             'u_id': user.id
@@ -150,9 +154,9 @@ class SocketsManager:
                 new_message = self.cm.add_message(user, _json['message_text'], str(op_id), reply_id=reply_id)
                 new_message_dict = get_message_dict(new_message)
                 if reply_id == -1:
-                    socketio.emit('chat-message-client', json.dumps(new_message_dict))
+                    socketio.emit('chat-message-client', json.dumps(new_message_dict), to=str(op_id))
                 else:
-                    socketio.emit('chat-message-reply-client', json.dumps(new_message_dict))
+                    socketio.emit('chat-message-reply-client', json.dumps(new_message_dict), to=str(op_id))
 
     def handle_message_edit(self, socket_message):
         message_id = socket_message["message_id"]
@@ -166,7 +170,7 @@ class SocketsManager:
                 socketio.emit('edit-message-client', json.dumps({
                     "message_id": message_id,
                     "new_message_text": new_message_text
-                }))
+                }), to=str(op_id))
 
     def handle_message_delete(self, socket_message):
         message_id = socket_message["message_id"]
@@ -176,7 +180,7 @@ class SocketsManager:
             perm = self.permission_check_emit(user.id, int(op_id))
             if perm:
                 self.cm.delete_message(message_id)
-                socketio.emit('delete-message-client', json.dumps({"message_id": message_id}))
+                socketio.emit('delete-message-client', json.dumps({"message_id": message_id}), to=str(op_id))
 
     def permission_check_emit(self, u_id, op_id):
         """
@@ -223,21 +227,55 @@ class SocketsManager:
                 message_ = f"[service message] **{user.username}** saved changes"
                 new_message = self.cm.add_message(user, message_, str(op_id), message_type=MessageType.SYSTEM_MESSAGE)
                 new_message_dict = get_message_dict(new_message)
-                socketio.emit('chat-message-client', json.dumps(new_message_dict))
+                socketio.emit('chat-message-client', json.dumps(new_message_dict), to=str(op_id))
                 # emit file-changed event to trigger reload of flight track
-                socketio.emit('file-changed', json.dumps({"op_id": op_id, "u_id": user.id}))
+                socketio.emit('file-changed', json.dumps({"op_id": op_id, "u_id": user.id}), to=str(op_id))
+        else:
+            logging.debug("Auth Token expired!")
+
+    def handle_file_patch(self, json_req):
+        """
+        json_req: {
+            "op_id": operation id
+            "version": version of the flight track the patch applies to
+            "ops": waypoint operations, see mslib.utils.waypoint_patch
+        }
+
+        returns the acknowledgement for the sending client, the other members of
+        the operation receive the patch
+        """
+        op_id = json_req['op_id']
+        ops = json_req['ops']
+        version = False
+        user = User.verify_auth_token(json_req['token'])
+        if user is not None:
+            if self.permission_check_emit(user.id, int(op_id)):
+                version = self.fm.patch_file(int(op_id), ops, int(json_req['version']), user)
         else:
             logging.debug("Auth Token expired!")
+        if version is False:
+            return json.dumps({"success": False, "op_id": op_id})
+
+        message_ = f"[service message] **{user.username}** saved changes"
+        new_message = self.cm.add_message(user, message_, str(op_id), message_type=MessageType.SYSTEM_MESSAGE)
+        new_message_dict = get_message_dict(new_message)
+        socketio.emit('chat-message-client', json.dumps(new_message_dict), to=str(op_id))
+        socketio.emit('file-patched', json.dumps({"op_id": op_id, "u_id": user.id, "base_version": version - 1,
+                                                  "version": version, "ops": ops}),
+                      to=str(op_id), skip_sid=request.sid)
+        return json.dumps({"success": True, "op_id": op_id, "version": version})
 
     def emit_file_change(self, op_id):
-        socketio.emit('file-changed', json.dumps({"op_id": op_id}))
+        socketio.emit('file-changed', json.dumps({"op_id": op_id}), to=str(op_id))
 
     def emit_new_permission(self, u_id, op_id):
         """
         to refresh operation list of u_id
         and to refresh collaborators' list
         """
-        socketio.emit('new-permission', json.dumps({"op_id": op_id, "u_id": u_id}))
+        # the sessions of u_id receive the events of the operation from now on
+        self.join_collaborator_to_operation(u_id, op_id)
+        socketio.emit('new-permission', json.dumps({"op_id": op_id, "u_id": u_id}), to=str(op_id))
 
     def emit_update_permission(self, u_id, op_id, access_level=None):
         """
@@ -250,16 +288,18 @@ class SocketsManager:
 
         socketio.emit('update-permission', json.dumps({"op_id": op_id,
                                                        "u_id": u_id,
-                                                       "access_level": access_level}))
+                                                       "access_level": access_level}), to=str(op_id))
 
     def emit_revoke_permission(self, u_id, op_id):
-        socketio.emit("revoke-permission", json.dumps({"op_id": op_id, "u_id": u_id}))
+        socketio.emit("revoke-permission", json.dumps({"op_id": op_id, "u_id": u_id}), to=str(op_id))
+        self.remove_collaborator_from_operation(u_id, op_id)
 
     def emit_operation_permissions_updated(self, u_id, op_id):
-        socketio.emit("operation-permissions-updated", json.dumps({"op_id": op_id, "u_id": u_id}))
+        socketio.emit("operation-permissions-updated", json.dumps({"op_id": op_id, "u_id": u_id}), to=str(op_id))
 
     def emit_operation_delete(self, op_id):
-        socketio.emit("operation-deleted", json.dumps({"op_id": op_id}))
+        socketio.emit("operation-deleted", json.dumps({"op_id": op_id}), to=str(op_id))
+        socketio.close_room(str(op_id))
 
 
 def setup_managers(app):
@@ -281,6 +321,7 @@ def setup_managers(app):
     socketio.on_event('edit-message', sm.handle_message_edit)
     socketio.on_event('delete-message', sm.handle_message_delete)
     socketio.on_event('file-save', sm.handle_file_save)
+    socketio.on_event('file-patch', sm.handle_file_patch)
     socketio.on_event('add-user-to-operation', sm.join_creator_to_operation)
     socketio.on_event('update-operation-list', sm.update_operation_list)
 
@@ -23,6 +23,7 @@
     See the License for the specific language governing permissions and
     limitations under the License.
 """
+import datetime
 import fs
 import os
 import logging
@@ -46,6 +47,29 @@ def get_session_id(sockets, u_id):
     return s_id
 
 
+def get_session_ids(sockets, u_id):
+    return [ss["s_id"] for ss in sockets if ss["u_id"] == u_id]
+
+
+def get_user_room(u_id):
+    """
+    name of the socketio room every session of the user u_id joins,
+    operation rooms are named by the stringified op_id
+    """
+    return f"user-{u_id}"
+
+
+def created_before(model, before, before_id=None):
+    """
+    returns the keyset pagination filter for rows of model ordered by (created_at, id),
+    which selects the rows ordered before the one created at the isoformat time before with the id before_id
+    """
+    before = datetime.datetime.fromisoformat(before)
+    if before_id is None:
+        return model.created_at < before
+    return (model.created_at < before) | ((model.created_at == before) & (model.id < int(before_id)))
+
+
 def get_message_dict(message):
     return {
         "id": message.id,
@@ -58,6 +58,27 @@ class SimpleAircraft:
         self._descent = self._setup(data["descent"])
         self._cruise = self._setup(data["cruise"])
         self._ceiling_poly = np.asarray(data.get("ceiling", [410]))[::-1]
+        self._setup_grids()
+
+    def __setstate__(self, state):
+        # Aircraft pickled by older versions (e.g. in the settings) lack the grids.
+        self.__dict__.update(state)
+        self._setup_grids()
+
+    def _setup_grids(self):
+        """
+        Resamples the tables of each maneuver for all weights onto the union
+        of their altitudes, so that they can be interpolated as one regular
+        array of shape (weights, altitudes, values) by the array variants of
+        the performance methods. As the tables are interpolated linearly in
+        altitude, this does not change any result.
+        """
+        self._grids = {}
+        for name, (weights, tables) in (("climb", self._climb), ("cruise", self._cruise), ("descent", self._descent)):
+            altitudes = np.unique(np.concatenate([table[:, 0] for table in tables]))
+            values = np.asarray([[np.interp(altitudes, table[:, 0], table[:, column])
+                                  for column in range(1, table.shape[1])] for table in tables])
+            self._grids[name] = weights, altitudes, values.transpose(0, 2, 1)
 
     def _setup(self, data):
         data = np.asarray(data)
@@ -97,6 +118,36 @@ class SimpleAircraft:
         assert 0 <= weight1 <= 1, (xs, x, weight1)
         return index0, weight0, index1, weight1
 
+    @staticmethod
+    def _get_weights_array(xs, x):
+        """
+        Array variant of _get_weights.
+
+        Args:
+            xs: sorted array of values
+            x: array of values for which to compute interpolation weights
+
+        Returns: index_0, index_1, weight_1 for interpolation.
+        """
+        index0 = np.clip(np.searchsorted(xs, x, side="right") - 1, 0, len(xs) - 1)
+        index1 = np.minimum(index0 + 1, len(xs) - 1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            weight1 = np.where(index0 == index1, 0, np.clip((x - xs[index0]) / (xs[index1] - xs[index0]), 0, 1))
+        return index0, index1, weight1
+
+    def _interpolate_array(self, name, altitude, grossweight):
+        weights, altitudes, values = self._grids[name]
+        altitude, grossweight = np.broadcast_arrays(
+            np.asarray(altitude, dtype=float), np.asarray(grossweight, dtype=float))
+        alt0, alt1, alt_weight1 = self._get_weights_array(altitudes, altitude)
+        weight0, weight1, weight_weight1 = self._get_weights_array(weights, grossweight)
+        alt_weight1, weight_weight1 = alt_weight1[..., np.newaxis], weight_weight1[..., np.newaxis]
+        result = ((values[weight0, alt0] * (1 - alt_weight1) + values[weight0, alt1] * alt_weight1) *
+                  (1 - weight_weight1) +
+                  (values[weight1, alt0] * (1 - alt_weight1) + values[weight1, alt1] * alt_weight1) *
+                  weight_weight1)
+        return np.moveaxis(result, -1, 0)
+
     def _interpolate_alt(self, table, altitude):
         idx0, w0, idx1, w1 = self._get_weights(table[:, 0], altitude)
         return w0 * table[idx0, 1:] + w1 * table[idx1, 1:]
@@ -141,6 +192,47 @@ class SimpleAircraft:
         """
         return self._interpolate(self._descent, altitude, grossweight)
 
+    def get_climb_performance_array(self, altitude, grossweight):
+        """
+        Array variant of get_climb_performance. Returns time [min], distance
+        [nm] and fuel [lbs] as arrays of the broadcast shape of the arguments.
+
+        Args:
+            altitude:     array of altitudes in ft to climb to
+            grossweight:  array of total weights of the aircraft in lbs
+        """
+        return self._interpolate_array("climb", altitude, grossweight)
+
+    def get_cruise_performance_array(self, altitude, grossweight):
+        """
+        Array variant of get_cruise_performance. Returns true airspeed [knots]
+        and fuelflow [lbs/hr] as arrays of the broadcast shape of the arguments.
+
+        Args:
+            altitude:     array of altitudes in ft
+            grossweight:  array of total weights of the aircraft in lbs
+        """
+        return self._interpolate_array("cruise", altitude, grossweight)
+
+    def get_descent_performance_array(self, altitude, grossweight):
+        """
+        Array variant of get_descent_performance. Returns time [min], distance
+        [nm] and fuel [lbs] as arrays of the broadcast shape of the arguments.
+
+        Args:
+            altitude:     array of altitudes in ft to descend from
+            grossweight:  array of total weights of the aircraft in lbs
+        """
+        return self._interpolate_array("descent", altitude, grossweight)
+
+    def depends_on_weight(self):
+        """
+        Returns whether the climb, cruise or descent performance of the
+        aircraft depends on its gross weight, i.e. whether any of the tables
+        holds data for more than one weight.
+        """
+        return any(len(table[0]) > 1 for table in (self._climb, self._cruise, self._descent))
+
     def get_ceiling_altitude(self, grossweight):
         """
         Ceiling altitude of aircraft for given weight [lbs]. Computed by
@@ -156,3 +248,17 @@ class SimpleAircraft:
                           "Please reload performance data from JSON.")
             maxFL = 410
         return maxFL
+
+    def get_ceiling_altitude_array(self, grossweight):
+        """
+        Array variant of get_ceiling_altitude.
+
+        Args:
+            grossweight:  array of total weights of the aircraft in lbs
+        """
+        grossweight = np.asarray(grossweight, dtype=float)
+        if hasattr(self, "_ceiling_poly"):
+            return np.polyval(self._ceiling_poly, grossweight).astype(int)
+        logging.error("No data stored for computation of ceiling altitude. "
+                      "Please reload performance data from JSON.")
+        return np.full(grossweight.shape, 410)
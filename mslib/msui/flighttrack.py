@@ -39,6 +39,7 @@ import logging
 import os
 
 import fs
+import numpy as np
 import xml.dom.minidom
 import xml.parsers.expat
 
@@ -51,6 +52,7 @@ from mslib.utils import thermolib
 from mslib.utils.config import config_loader, save_settings_qsettings, load_settings_qsettings
 from mslib.utils.config import MSUIDefaultConfig as mss_default
 from mslib.utils.qt import variant_to_string, variant_to_float
+from mslib.utils.waypoint_patch import waypoint_dict
 from mslib.msui.performance_settings import DEFAULT_PERFORMANCE
 
 from mslib.utils import writexml
@@ -187,6 +189,8 @@ class WaypointsTableModel(QtCore.QAbstractTableModel):
         self.waypoints = []  # user-defined waypoints
         # file-save events are handled in a different manner
         self.mscolab_mode = mscolab_mode
+        # cached performance of the legs between waypoints, see update_distances
+        self._leg_keys, self._leg_values, self._legs_aircraft = [], np.zeros((0, 3)), None
 
         # self.aircraft.setErrorHandling("permissive")
         self.settings_tag = "performance"
@@ -456,8 +460,8 @@ class WaypointsTableModel(QtCore.QAbstractTableModel):
         self.beginRemoveRows(QtCore.QModelIndex(), position,
                              position + rows - 1)
         self.waypoints = self.waypoints[:position] + self.waypoints[position + rows:]
-        if position < len(self.waypoints):
-            self.update_distances(position, rows=min(rows, len(self.waypoints) - position))
+        # also removes the legs of the last waypoints from the table of update_distances
+        self.update_distances(position, rows=min(rows, len(self.waypoints) - position))
 
         # endRemoveRows emits rowsRemoved(index, first, last).
         self.endRemoveRows()
@@ -466,18 +470,18 @@ class WaypointsTableModel(QtCore.QAbstractTableModel):
 
     def update_distances(self, position, rows=1):
         """
-        Update all distances in a flight track that are affected by a
-        waypoint change involving <rows> waypoints starting at index
-        <position>.
+        Update all distances and performance values in a flight track that
+        are affected by a waypoint change involving <rows> waypoints starting
+        at index <position>.
 
         Distances are computed along great circles.
 
-        If rows=1, the distance to the previous waypoint is updated for
-        waypoints <position> and <position+1>. The total flight track distance
-        is updated for all waypoint following <position>.
-
-        If rows>1, the distances to the previous waypoints are updated
-        according to the number of modified waypoints.
+        Distance, duration and fuel consumption of each leg are kept in a
+        table along with the coordinates and flight levels of its waypoints
+        (and the gross weight at its start, if the aircraft performance
+        depends on it). Only the legs next to the changed waypoints are
+        checked and recomputed if their inputs changed. The cumulative values
+        are then updated from the first changed waypoint on.
         """
         waypoints = self.waypoints
         aircraft = self.performance_settings["aircraft"]
@@ -504,70 +508,121 @@ class WaypointsTableModel(QtCore.QAbstractTableModel):
                     duration_p, fuel_p = get_duration_fuel(flightlevel1, flightlevel1, distance - dist, weight, False)
                 return duration + duration_p, fuel + fuel_p
 
-        pos = position
-        for offset in range(rows):
-            pos = position + offset
-            wp1 = waypoints[pos]
-            # The distance to the first waypoint is zero.
-            if pos == 0:
-                wp1.distance_to_prev = 0.
-                wp1.distance_total = 0.
-
-                wp1.leg_time = 0  # time from previous waypoint
-                wp1.cum_time = 0  # total time of flight
-                wp1.utc_time = self.performance_settings["takeoff_time"].toPyDateTime()
-                wp1.weight = self.performance_settings["takeoff_weight"]
-                wp1.leg_fuel = 0
-                wp1.rem_fuel = self.performance_settings["takeoff_weight"] - self.performance_settings["empty_weight"]
-                wp1.ascent_rate = 0
-            else:
-                wp0 = waypoints[pos - 1]
-                wp1.distance_to_prev = get_distance(
-                    wp0.lat, wp0.lon, wp1.lat, wp1.lon)
-
-                last = (pos - 1 == rows)
-                time, fuel = get_duration_fuel(
-                    wp0.flightlevel, wp1.flightlevel, wp1.distance_to_prev, wp0.weight, lastleg=last)
-                wp1.leg_time = time
-                wp1.cum_time = wp0.cum_time + wp1.leg_time
-                wp1.utc_time = wp0.utc_time + datetime.timedelta(seconds=wp1.leg_time)
-                wp1.leg_fuel = fuel
-                wp1.rem_fuel = wp0.rem_fuel - wp1.leg_fuel
-                wp1.weight = wp0.weight - wp1.leg_fuel
-                if wp1.leg_time != 0:
-                    wp1.ascent_rate = int((wp1.flightlevel - wp0.flightlevel) * 100 / (wp1.leg_time / 60))
-                else:
-                    wp1.ascent_rate = 0
-            wp1.ceiling_alt = aircraft.get_ceiling_altitude(wp1.weight)
-
-        # Update the distance of the following waypoint as well.
-        if pos < len(waypoints) - 1:
-            wp2 = waypoints[pos + 1]
-            wp2.distance_to_prev = get_distance(
-                wp1.lat, wp1.lon, wp2.lat, wp2.lon)
-            if wp2.leg_time != 0:
-                wp2.ascent_rate = int((wp2.flightlevel - wp1.flightlevel) * 100 / (wp2.leg_time / 60))
-            else:
-                wp2.ascent_rate = 0
-
-        # Update total distances of waypoint at index position and all
-        # following waypoints.
-        for i in range(max(min(position, 1), 1), len(waypoints)):
-            wp0 = waypoints[i - 1]
-            wp1 = waypoints[i]
-            wp1.distance_total = wp0.distance_total + wp1.distance_to_prev
-            wp1.weight = wp0.weight - wp0.leg_fuel
-            last = (i + 1 == len(waypoints))
-            time, fuel = get_duration_fuel(
-                wp0.flightlevel, wp1.flightlevel, wp1.distance_to_prev, wp0.weight, lastleg=last)
-
-            wp1.leg_time = time
-            wp1.cum_time = wp0.cum_time + wp1.leg_time
-            wp1.utc_time = wp0.utc_time + datetime.timedelta(seconds=wp1.leg_time)
-            wp1.leg_fuel = fuel
-            wp1.rem_fuel = wp0.rem_fuel - wp1.leg_fuel
-            wp1.weight = wp0.weight - wp1.leg_fuel
-            wp1.ceiling_alt = aircraft.get_ceiling_altitude(wp1.weight)
+        def get_durations_fuels(flightlevel0, flightlevel1, distance, weight, lastleg):
+            """
+            Array variant of get_duration_fuel evaluating many legs at once.
+            """
+            climb = flightlevel0 < flightlevel1
+            performance0, performance1 = [
+                np.where(climb, aircraft.get_climb_performance_array(flightlevel * 100, weight),
+                         aircraft.get_descent_performance_array(flightlevel * 100, weight))
+                for flightlevel in (flightlevel0, flightlevel1)]
+            duration, dist, fuel = np.where(flightlevel0 == flightlevel1, 0, performance1 - performance0)
+            duration, dist = duration * 60, dist * 1.852  # convert from min to s and from nm to km
+            # cruise at the flight level reached, or before descending on the last leg
+            tas, fuelflow = aircraft.get_cruise_performance_array(
+                np.where(lastleg, flightlevel0, flightlevel1) * 100, weight)
+            cruise_duration = 3600. * (distance - dist) / (1.852 * tas)  # convert to s (tas is in nm/h)
+            return duration + cruise_duration, fuel + cruise_duration * fuelflow / 3600.
+
+        # Per-leg distance, duration and fuel, indexed by the waypoint at the
+        # end of the leg. Rows inserted or removed since the last call are
+        # inserted into or removed from the table at <position>.
+        count = len(waypoints)
+        delta = count - len(self._leg_keys)
+        if aircraft is not self._legs_aircraft or not 0 <= position <= count - max(delta, 0):
+            self._leg_keys, self._leg_values = [None] * count, np.zeros((count, 3))
+            self._legs_aircraft = aircraft
+            position, rows = 0, count
+        elif delta > 0:
+            self._leg_keys[position:position] = [None] * delta
+            self._leg_values = np.concatenate(
+                [self._leg_values[:position], np.zeros((delta, 3)), self._leg_values[position:]])
+        elif delta < 0:
+            del self._leg_keys[position:position - delta]
+            self._leg_values = np.delete(self._leg_values, np.s_[position:position - delta], axis=0)
+        if count > 0:
+            # no leg ends at the first waypoint
+            self._leg_keys[0] = None
+            self._leg_values[0] = 0
+
+        def get_key(i):
+            wp0, wp1 = waypoints[i - 1], waypoints[i]
+            return (wp0.lat, wp0.lon, wp1.lat, wp1.lon), wp0.flightlevel, wp1.flightlevel, i + 1 == count
+
+        def update_leg_distances(indices):
+            indices = [i for i in indices if self._leg_keys[i] is None or self._leg_keys[i][0] != keys[i][0]]
+            if len(indices) > 1:
+                self._leg_values[indices, 0] = get_distance(*np.asarray([keys[i][0] for i in indices]).T)
+            elif indices:
+                # pyproj treats arrays of one element as deprecated scalars
+                self._leg_values[indices[0], 0] = get_distance(*keys[indices[0]][0])
+
+        # Only the legs ending at the changed waypoints or right after them
+        # are checked, and the last two, as the last leg is flown differently.
+        # Of those, the legs whose inputs changed are recomputed.
+        checked = set(range(max(position, 1), min(position + max(rows, 1) + 1, count)))
+        checked.update(range(max(count - 2, 1), count))
+        takeoff_weight = float(self.performance_settings["takeoff_weight"])
+        if not aircraft.depends_on_weight():
+            keys = {i: get_key(i) for i in checked}
+            missing = sorted(i for i in checked if keys[i] != self._leg_keys[i])
+            update_leg_distances(missing)
+            if missing:
+                indices = np.asarray(missing)
+                flightlevels = np.asarray([[waypoints[i - 1].flightlevel, waypoints[i].flightlevel]
+                                           for i in missing], dtype=float).T
+                self._leg_values[indices, 1], self._leg_values[indices, 2] = get_durations_fuels(
+                    flightlevels[0], flightlevels[1], self._leg_values[indices, 0], takeoff_weight,
+                    indices + 1 == count)
+                for i in missing:
+                    self._leg_keys[i] = keys[i]
+        else:
+            # The weight at the start of each leg depends on the fuel burnt
+            # on the legs before, so all legs after a changed one are checked.
+            first = min(checked, default=count)
+            keys = {i: get_key(i) for i in range(first, count)}
+            update_leg_distances(list(keys))
+            missing = []
+            # summed up like np.cumsum, so that unchanged legs get the same weight
+            fuel = self._leg_values[:first, 2].cumsum()[-1] if first > 0 else 0.
+            for i in range(first, count):
+                key = keys[i] + (takeoff_weight - fuel,)
+                if key != self._leg_keys[i]:
+                    self._leg_values[i, 1:] = get_duration_fuel(
+                        key[1], key[2], self._leg_values[i, 0], key[4], key[3])
+                    self._leg_keys[i] = key
+                    missing.append(i)
+                fuel += self._leg_values[i, 2]
+
+        # The cumulative values change from the first changed waypoint on.
+        start = min([position] + missing)
+        distances, leg_times, leg_fuels = self._leg_values.T
+        weights = takeoff_weight - np.cumsum(leg_fuels)
+        previous = max(start - 1, 0)
+        flightlevels = np.asarray([wp.flightlevel for wp in waypoints[previous:]], dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ascent_rates = np.diff(flightlevels, prepend=flightlevels[:1]) * 100 / (leg_times[previous:] / 60)
+        ascent_rates[leg_times[previous:] == 0] = 0
+        takeoff_time = self.performance_settings["takeoff_time"].toPyDateTime()
+        rem_fuel = self.performance_settings["takeoff_weight"] - self.performance_settings["empty_weight"]
+        for wp, distance, distance_total, leg_time, cum_time, leg_fuel, cum_fuel, weight, ceiling_alt, \
+                ascent_rate in zip(
+                waypoints[start:], distances[start:].tolist(), np.cumsum(distances)[start:].tolist(),
+                leg_times[start:].tolist(), np.cumsum(leg_times)[start:].tolist(), leg_fuels[start:].tolist(),
+                np.cumsum(leg_fuels)[start:].tolist(), weights[start:].tolist(),
+                aircraft.get_ceiling_altitude_array(weights[start:]).tolist(),
+                ascent_rates[start - previous:].astype(int).tolist()):
+            wp.distance_to_prev = distance
+            wp.distance_total = distance_total
+            wp.leg_time = leg_time  # time from previous waypoint
+            wp.cum_time = cum_time  # total time of flight
+            wp.utc_time = takeoff_time + datetime.timedelta(seconds=cum_time)
+            wp.leg_fuel = leg_fuel
+            wp.rem_fuel = rem_fuel - cum_fuel
+            wp.weight = weight
+            wp.ceiling_alt = ceiling_alt
+            wp.ascent_rate = ascent_rate
 
         index1 = self.createIndex(0, TIME_UTC)
         self.dataChanged.emit(index1, index1)
@@ -588,6 +643,43 @@ class WaypointsTableModel(QtCore.QAbstractTableModel):
         self.layoutChanged.emit()
         self.dataChanged.emit(index, index)
 
+    def waypoint_dicts(self):
+        """
+        Return the waypoints as dictionaries as used by mslib.utils.waypoint_patch.
+        """
+        return [waypoint_dict(wp.location, wp.lat, wp.lon, wp.flightlevel, wp.comments) for wp in self.waypoints]
+
+    def apply_waypoint_patch(self, ops):
+        """
+        Apply the operations of a waypoint patch (see mslib.utils.waypoint_patch)
+        in place, so that only the changed waypoints are updated.
+        """
+        for op in ops:
+            index = op["index"]
+            if op["op"] == "insert":
+                self.insertRows(index, waypoints=[self._waypoint_from_dict(op["waypoint"])])
+            elif op["op"] == "delete":
+                self.removeRows(index)
+            elif op["op"] == "move":
+                waypoint = self.waypoints[index]
+                self.removeRows(index)
+                self.insertRows(op["to"], waypoints=[waypoint])
+            elif op["op"] == "edit":
+                self.waypoints[index] = self._waypoint_from_dict(op["waypoint"])
+                self.update_distances(index)
+                self.modified = True
+                self.dataChanged.emit(self.index(index, 0), self.index(index, self.columnCount() - 1))
+            else:
+                raise ValueError(f"unknown operation {op['op']!r}")
+
+    @staticmethod
+    def _waypoint_from_dict(data):
+        waypoint = Waypoint(data["lat"], data["lon"], data["flightlevel"],
+                            location=data["location"], comments=data["comments"])
+        # keep the coordinates of the sender even for known locations
+        waypoint.lat, waypoint.lon = data["lat"], data["lon"]
+        return waypoint
+
     def replace_waypoints(self, new_waypoints):
         self.waypoints = []
         self.insertRows(0, rows=len(new_waypoints), waypoints=new_waypoints)
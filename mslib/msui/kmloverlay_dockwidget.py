@@ -67,12 +67,12 @@ class KMLPatch:
         :param name: name of placemark for annotation
         """
         x, y = self.map(point.geometry.x, point.geometry.y)
-        self.patches.append(self.map.plot(x, y, "o", zorder=10, color=self.color))
+        self.artists.append((self.map.plot, (x, y, "o"), dict(zorder=10, color=self.color)))
         if name is not None:
-            self.patches.append([self.map.ax.annotate(
-                name, xy=(x, y), xycoords="data", xytext=(5, 5), textcoords='offset points', zorder=10,
+            self.artists.append((self.map.ax.annotate, (name,), dict(
+                xy=(x, y), xycoords="data", xytext=(5, 5), textcoords='offset points', zorder=10,
                 bbox=dict(boxstyle="round, pad=0.15", fc="w"),
-                path_effects=[patheffects.withStroke(linewidth=2, foreground='w')])])
+                path_effects=[patheffects.withStroke(linewidth=2, foreground='w')])))
 
     def add_line(self, line, style, name):
         """
@@ -82,7 +82,7 @@ class KMLPatch:
         """
         kwargs = style.get("LineStyle", {"linewidth": self.linewidth, "color": self.color})
         x, y = self.compute_xy(line.geometry)
-        self.patches.append(self.map.plot(x, y, "-", zorder=10, **kwargs))
+        self.artists.append((self.map.plot, (x, y, "-"), dict(zorder=10, **kwargs)))
 
     def add_polygon(self, polygon, style, _):
         """
@@ -93,12 +93,12 @@ class KMLPatch:
         # Exterior
         kwargs = style.get("LineStyle", {"linewidth": self.linewidth, "color": self.color})
         x, y = self.compute_xy(polygon.geometry.exterior)
-        self.patches.append(self.map.plot(x, y, "-", zorder=10, **kwargs))
+        self.artists.append((self.map.plot, (x, y, "-"), dict(zorder=10, **kwargs)))
 
         # Interior Rings
         for interior in list(polygon.geometry.interiors):
             x1, y1 = self.compute_xy(interior)
-            self.patches.append(self.map.plot(x1, y1, "-", zorder=10, **kwargs))
+            self.artists.append((self.map.plot, (x1, y1, "-"), dict(zorder=10, **kwargs)))
 
     def add_multipoint(self, geoms, style, name):
         """
@@ -108,11 +108,11 @@ class KMLPatch:
         :param name: name of placemark for annotation
         """
         xs, ys = self.map([point.x for point in geoms], [point.y for point in geoms])
-        self.patches.append(self.map.plot(xs, ys, "o", zorder=10, color=self.color))
+        self.artists.append((self.map.plot, (xs, ys, "o"), dict(zorder=10, color=self.color)))
         if name is not None:
-            self.patches.append([self.map.ax.annotate(
-                name, xy=(xs[0], ys[0]), xycoords="data", xytext=(5, 5), textcoords='offset points', zorder=10,
-                path_effects=[patheffects.withStroke(linewidth=2, foreground='w')])])
+            self.artists.append((self.map.ax.annotate, (name,), dict(
+                xy=(xs[0], ys[0]), xycoords="data", xytext=(5, 5), textcoords='offset points', zorder=10,
+                path_effects=[patheffects.withStroke(linewidth=2, foreground='w')])))
 
     def add_multiline(self, line, style, name):
         """
@@ -122,7 +122,7 @@ class KMLPatch:
         """
         kwargs = style.get("LineStyle", {"linewidth": self.linewidth, "color": self.color})
         x, y = self.compute_xy(line)
-        self.patches.append(self.map.plot(x, y, "-", zorder=10, **kwargs))
+        self.artists.append((self.map.plot, (x, y, "-"), dict(zorder=10, **kwargs)))
 
     def add_multipolygon(self, polygon, style, _):
         """
@@ -132,7 +132,7 @@ class KMLPatch:
         """
         kwargs = style.get("LineStyle", {"linewidth": self.linewidth, "color": self.color})
         x, y = self.compute_xy(polygon.exterior)
-        self.patches.append(self.map.plot(x, y, "-", zorder=10, **kwargs))
+        self.artists.append((self.map.plot, (x, y, "-"), dict(zorder=10, **kwargs)))
 
     def parse_geometries(self, placemark):
         name = placemark.name
@@ -237,14 +237,30 @@ class KMLPatch:
     def draw(self):
         """
         Do the actual plotting of the patch.
+
+        The KML data is parsed and projected by compute_artists outside of the GUI thread.
+        """
+        self.map.overlay_workers.submit(self, self.compute_artists, self.add_artists)
+
+    def compute_artists(self):
+        """
+        Returns the (method, args, kwargs) tuples creating the artists of the patch.
         """
-        # Plot satellite track.
         self.styles = {}
+        self.artists = []
         kml_doc = list(self.kml.features())  # All kml files are enclosed in a single root < > and </ >
         kml_style = kml_doc[0]
         self.parse_styles(kml_style)
         self.parse_placemarks(kml_doc)
+        return self.artists
 
+    def add_artists(self, artists):
+        """
+        Plots the artists computed by compute_artists.
+        """
+        for method, args, kwargs in artists:
+            patch = method(*args, **kwargs)
+            self.patches.append(patch if isinstance(patch, list) else [patch])
         self.map.ax.figure.canvas.draw()
 
     def update(self, color=None, linewidth=None):
@@ -264,6 +280,7 @@ class KMLPatch:
         """
         Remove this satellite patch from the map canvas.
         """
+        self.map.overlay_workers.cancel(self)
         for patch in self.patches:
             for element in patch:
                 element.remove()
@@ -33,7 +33,6 @@
 """
 
 import logging
-import copy
 import numpy as np
 from shapely.geometry import Polygon
 import matplotlib
@@ -49,8 +48,9 @@ except ImportError:
     import pyproj
 
 from mslib.msui import mpl_pathinteractor as mpl_pi
-from mslib.utils.airdata import get_airports, get_airspaces
+from mslib.utils.airdata import get_airports, get_airspaces, get_airports_index, get_airspaces_index
 from mslib.utils.loggerdef import configure_mpl_logger
+from mslib.utils.qt import WorkerPool
 
 
 OPENAIP_NOTICE = "Airspace data used comes from openAIP.\n" \
@@ -169,6 +169,9 @@ class MapCanvas(basemap.Basemap):
         if not hasattr(self, "airspaces") or not self.airspaces:
             self.airspaces = None
             self.airspacetext = None
+        if not hasattr(self, "overlay_workers"):
+            # computes the geometry of overlays (airports, KML, remote sensing, ...) outside of the GUI thread
+            self.overlay_workers = WorkerPool()
 
     def update_info_text(self, openaip=None, ourairports=None, name=None, crs=None):
         if openaip is not None:
@@ -365,6 +368,8 @@ class MapCanvas(basemap.Basemap):
             self.ax.figure.canvas.mpl_disconnect(self.airports_event)
         if value and len(port_type) > 0:
             self.draw_airports(port_type)
+        else:
+            self.overlay_workers.cancel("airports")
 
     def set_draw_airspaces(self, value, airspaces=[], range_km=None, reload=True):
         """
@@ -380,120 +385,210 @@ class MapCanvas(basemap.Basemap):
         if value and len(airspaces) > 0:
             country_codes = [airspace.split(" ")[-1] for airspace in airspaces]
             self.draw_airspaces(country_codes, range_km)
+        else:
+            self.overlay_workers.cancel("airspaces")
+
+    def _get_view_extent(self, samples=25):
+        """
+        Returns the latitude range and the longitude arc (start and width in
+        degrees) covered by the map, or None if the map extends beyond the
+        projection domain.
+
+        The extent is estimated from a grid of points in the map and widened
+        by the largest difference between neighbouring points, so that it
+        covers at least the whole map.
+        """
+        xs, ys = np.meshgrid(np.linspace(self.llcrnrx, self.urcrnrx, samples),
+                             np.linspace(self.llcrnry, self.urcrnry, samples))
+        lons, lats = (np.asarray(_x, dtype=float) for _x in self.projtran(xs, ys, inverse=True))
+        if not (np.isfinite(lons) & np.isfinite(lats) & (np.abs(lats) <= 90)).all():
+            return None
+        lat_margin = max(np.abs(np.diff(lats, axis=_i)).max() for _i in (0, 1))
+        lon_margin = max(np.abs((np.diff(lons, axis=_i) + 180) % 360 - 180).max() for _i in (0, 1))
+        # the covered longitudes are the complement of the largest gap between them
+        lons = np.sort(lons.ravel() % 360)
+        gaps = np.diff(lons, append=lons[0] + 360)
+        largest = gaps.argmax()
+        lon_width = 360 - gaps[largest] + 2 * lon_margin
+        return (lats.min() - lat_margin, lats.max() + lat_margin,
+                (lons[(largest + 1) % len(lons)] - lon_margin) % 360, min(lon_width, 360))
+
+    def _in_view(self, index, extent):
+        """
+        Returns a boolean mask of the features of a BoundingBoxIndex that may
+        be visible in the map with the given extent (see _get_view_extent).
+        """
+        if extent is None:
+            return np.ones(index.lon_min.shape, dtype=bool)
+        return index.query(*extent)
 
     def draw_airspaces(self, countries=[], range_km=None):
         """
         Load and draw airspace data
+
+        The airspaces in view are selected and projected outside of the GUI thread.
         """
         if not self.airspaces:
-            airspaces = copy.deepcopy(get_airspaces(countries))
+            airspaces = get_airspaces(countries)
             if not airspaces:
                 logging.error("Tried to draw airspaces without asp files.")
                 return
-
-            for i, airspace in enumerate(airspaces):
-                airspaces[i]["polygon"] = list(zip(*self.projtran(*list(zip(*airspace["polygon"])))))
-            map_polygon = Polygon([(self.llcrnrx, self.llcrnry), (self.urcrnrx, self.llcrnry),
-                                  (self.urcrnrx, self.urcrnry), (self.llcrnrx, self.urcrnry)])
-            airspaces = [airspace for airspace in airspaces if
-                         (not range_km or range_km[0] <= airspace["bottom"] <= range_km[1]) and
-                         Polygon(airspace["polygon"]).intersects(map_polygon)]
-            if not airspaces:
-                return
-
-            self.update_info_text(openaip=OPENAIP_NOTICE)
-            airspaces.sort(key=lambda x: (x["bottom"], x["top"] - x["bottom"]))
-            max_height = max(airspaces[-1]["bottom"], 0.001)
-            cmap = get_cmap("Blues")
-            airspace_colors = [cmap(1 - airspaces[i]["bottom"] / max_height) for i in range(len(airspaces))]
-
-            collection = PolyCollection([airspace["polygon"] for airspace in airspaces], alpha=0.5, edgecolor="black",
-                                        zorder=5, facecolors=airspace_colors)
-            collection.set_pickradius(0)
-            self.airspaces = self.ax.add_collection(collection)
-            self.airspacetext = self.ax.annotate(airspaces[0]["name"], xy=airspaces[0]["polygon"][0], xycoords="data",
-                                                 bbox={"boxstyle": "round", "facecolor": "w",
-                                                       "edgecolor": "0.5", "alpha": 0.9}, zorder=7)
-            self.airspacetext.set_visible(False)
-
-            def update_text(index, xydata):
-                self.airspacetext.xy = xydata
-                self.airspacetext.set_position(xydata)
-                self.airspacetext.set_text("\n".join([f"{airspaces[i]['name']}, {airspaces[i]['bottom']} - "
-                                                     f"{airspaces[i]['top']}km" for i in index["ind"]]))
-                highlight_cmap = get_cmap("YlGn")
-                for i in index["ind"]:
-                    airspace_colors[i] = highlight_cmap(1 - airspaces[i]["bottom"] / max_height)
-                self.airspaces.set_facecolor(airspace_colors)
-                for i in index["ind"]:
-                    airspace_colors[i] = cmap(1 - airspaces[i]["bottom"] / max_height)
-
-            def on_move(event):
-                if self.airspaces and event.inaxes == self.ax:
-                    cont, ind = self.airspaces.contains(event)
-                    if cont:
-                        update_text(ind, (event.xdata, event.ydata))
-                        self.airspacetext.set_visible(True)
-                        self.ax.figure.canvas.draw_idle()
-                    elif self.airspacetext.get_visible():
-                        self.airspacetext.set_visible(False)
-                        self.airspaces.set_facecolor(airspace_colors)
-                        self.ax.figure.canvas.draw_idle()
-
-            self.airspace_event = self.ax.figure.canvas.mpl_connect('motion_notify_event', on_move)
+            extent, projtran = self._get_view_extent(), self.projtran
+            corners = self.llcrnrx, self.llcrnry, self.urcrnrx, self.urcrnry
+            self.overlay_workers.submit(
+                "airspaces", lambda: self._compute_airspaces(airspaces, range_km, extent, projtran, corners),
+                self._add_airspaces)
+
+    def _compute_airspaces(self, airspaces, range_km, extent, projtran, corners):
+        """
+        Returns the airspaces visible in the map, sorted by their bottom, their colours
+        and the PolyCollection showing them, or None if there are none.
+        """
+        # Only project the airspaces whose bounding box intersects the map.
+        polygons, bottoms, index = get_airspaces_index(airspaces)
+        candidates = self._in_view(index, extent)
+        if range_km:
+            candidates &= (range_km[0] <= bottoms) & (bottoms <= range_km[1])
+        candidates = np.nonzero(candidates)[0]
+        if len(candidates) == 0:
+            return None
+        points = np.concatenate([polygons[_i] for _i in candidates])
+        xs, ys = projtran(points[:, 0], points[:, 1])
+        projected = np.split(np.stack([xs, ys], axis=-1), np.cumsum([len(polygons[_i]) for _i in candidates[:-1]]))
+        llcrnrx, llcrnry, urcrnrx, urcrnry = corners
+        map_polygon = Polygon([(llcrnrx, llcrnry), (urcrnrx, llcrnry), (urcrnrx, urcrnry), (llcrnrx, urcrnry)])
+        selected = [(airspaces[_i], polygon) for _i, polygon in zip(candidates, projected)
+                    if Polygon(polygon).intersects(map_polygon)]
+        if not selected:
+            return None
+        selected.sort(key=lambda x: (x[0]["bottom"], x[0]["top"] - x[0]["bottom"]))
+        airspaces = [airspace for airspace, _ in selected]
+        polygons = [polygon for _, polygon in selected]
+
+        max_height = max(airspaces[-1]["bottom"], 0.001)
+        cmap = get_cmap("Blues")
+        airspace_colors = [cmap(1 - airspaces[i]["bottom"] / max_height) for i in range(len(airspaces))]
+
+        collection = PolyCollection(polygons, alpha=0.5, edgecolor="black",
+                                    zorder=5, facecolors=airspace_colors)
+        collection.set_pickradius(0)
+        return airspaces, airspace_colors, collection
+
+    def _add_airspaces(self, result):
+        """
+        Adds the airspaces computed by _compute_airspaces to the map.
+        """
+        if result is None:
+            return
+        airspaces, airspace_colors, collection = result
+        max_height = max(airspaces[-1]["bottom"], 0.001)
+        cmap = get_cmap("Blues")
+
+        self.update_info_text(openaip=OPENAIP_NOTICE)
+        self.airspaces = self.ax.add_collection(collection)
+        self.airspacetext = self.ax.annotate(airspaces[0]["name"], xy=collection.get_paths()[0].vertices[0],
+                                             xycoords="data",
+                                             bbox={"boxstyle": "round", "facecolor": "w",
+                                                   "edgecolor": "0.5", "alpha": 0.9}, zorder=7)
+        self.airspacetext.set_visible(False)
+
+        def update_text(index, xydata):
+            self.airspacetext.xy = xydata
+            self.airspacetext.set_position(xydata)
+            self.airspacetext.set_text("\n".join([f"{airspaces[i]['name']}, {airspaces[i]['bottom']} - "
+                                                  f"{airspaces[i]['top']}km" for i in index["ind"]]))
+            highlight_cmap = get_cmap("YlGn")
+            for i in index["ind"]:
+                airspace_colors[i] = highlight_cmap(1 - airspaces[i]["bottom"] / max_height)
+            self.airspaces.set_facecolor(airspace_colors)
+            for i in index["ind"]:
+                airspace_colors[i] = cmap(1 - airspaces[i]["bottom"] / max_height)
+
+        def on_move(event):
+            if self.airspaces and event.inaxes == self.ax:
+                cont, ind = self.airspaces.contains(event)
+                if cont:
+                    update_text(ind, (event.xdata, event.ydata))
+                    self.airspacetext.set_visible(True)
+                    self.ax.figure.canvas.draw_idle()
+                elif self.airspacetext.get_visible():
+                    self.airspacetext.set_visible(False)
+                    self.airspaces.set_facecolor(airspace_colors)
+                    self.ax.figure.canvas.draw_idle()
+
+        self.airspace_event = self.ax.figure.canvas.mpl_connect('motion_notify_event', on_move)
+        self.ax.figure.canvas.draw_idle()
 
     def draw_airports(self, port_type):
         """
         Load and draw airports and their respective name on hover
+
+        The airports in view are selected and projected outside of the GUI thread.
         """
         if not self.airports:
             airports = get_airports()
             if not airports:
                 logging.error("Tried to draw airports but none were found. Try redownloading.")
                 return
-
-            lons, lats = self.projtran(*zip(*[(float(airport["longitude_deg"]),
-                                            float(airport["latitude_deg"])) for airport in airports]))
-            for i, airport in enumerate(airports):
-                airports[i]["longitude_deg"] = lons[i]
-                airports[i]["latitude_deg"] = lats[i]
-
-            airports = [airport for airport in airports if airport["type"] in port_type and
-                        self.llcrnrx <= float(airport["longitude_deg"]) <= self.urcrnrx and
-                        self.llcrnry <= float(airport["latitude_deg"]) <= self.urcrnry]
-            lons = [float(airport["longitude_deg"]) for airport in airports]
-            lats = [float(airport["latitude_deg"]) for airport in airports]
-            annotations = [airport["name"] for airport in airports]
-            if not airports:
-                return
-
-            self.update_info_text(ourairports=OURAIRPORTS_NOTICE)
-            self.airports = self.ax.scatter(lons, lats, marker="o", color="r", linewidth=1, s=9, edgecolor="black",
-                                            zorder=6)
-            self.airports.set_pickradius(1)
-            self.airtext = self.ax.annotate(annotations[0], xy=(lons[0], lats[0]), xycoords="data",
-                                            bbox={"boxstyle": "round", "facecolor": "w",
-                                                  "edgecolor": "0.5", "alpha": 0.9}, zorder=8)
-            self.airtext.set_visible(False)
-
-            def update_text(index):
-                pos = self.airports.get_offsets()[index["ind"][0]]
-                self.airtext.xy = pos
-                self.airtext.set_position(pos)
-                self.airtext.set_text("\n".join([annotations[i] for i in index["ind"]]))
-
-            def on_move(event):
-                if self.airports and event.inaxes == self.ax:
-                    cont, ind = self.airports.contains(event)
-                    if cont:
-                        update_text(ind)
-                        self.airtext.set_visible(True)
-                        self.ax.figure.canvas.draw_idle()
-                    elif self.airtext.get_visible():
-                        self.airtext.set_visible(False)
-                        self.ax.figure.canvas.draw_idle()
-
-            self.airports_event = self.ax.figure.canvas.mpl_connect('motion_notify_event', on_move)
+            extent, projtran = self._get_view_extent(), self.projtran
+            corners = self.llcrnrx, self.llcrnry, self.urcrnrx, self.urcrnry
+            self.overlay_workers.submit(
+                "airports", lambda: self._compute_airports(airports, port_type, extent, projtran, corners),
+                self._add_airports)
+
+    def _compute_airports(self, airports, port_type, extent, projtran, corners):
+        """
+        Returns the map coordinates and names of the airports of the requested types
+        visible in the map, or None if there are none.
+        """
+        # Only project the airports of the requested types near the map.
+        lons, lats, types, index = get_airports_index(airports)
+        candidates = np.nonzero(np.isin(types, port_type) & self._in_view(index, extent))[0]
+        if len(candidates) == 0:
+            return None
+        lons, lats = projtran(lons[candidates], lats[candidates])
+        llcrnrx, llcrnry, urcrnrx, urcrnry = corners
+        visible = (llcrnrx <= lons) & (lons <= urcrnrx) & (llcrnry <= lats) & (lats <= urcrnry)
+        annotations = [airports[_i]["name"] for _i in candidates[visible]]
+        if not annotations:
+            return None
+        return lons[visible], lats[visible], annotations
+
+    def _add_airports(self, result):
+        """
+        Adds the airports computed by _compute_airports to the map.
+        """
+        if result is None:
+            return
+        lons, lats, annotations = result
+        self.update_info_text(ourairports=OURAIRPORTS_NOTICE)
+        self.airports = self.ax.scatter(lons, lats, marker="o", color="r", linewidth=1, s=9, edgecolor="black",
+                                        zorder=6)
+        self.airports.set_pickradius(1)
+        self.airtext = self.ax.annotate(annotations[0], xy=(lons[0], lats[0]), xycoords="data",
+                                        bbox={"boxstyle": "round", "facecolor": "w",
+                                              "edgecolor": "0.5", "alpha": 0.9}, zorder=8)
+        self.airtext.set_visible(False)
+
+        def update_text(index):
+            pos = self.airports.get_offsets()[index["ind"][0]]
+            self.airtext.xy = pos
+            self.airtext.set_position(pos)
+            self.airtext.set_text("\n".join([annotations[i] for i in index["ind"]]))
+
+        def on_move(event):
+            if self.airports and event.inaxes == self.ax:
+                cont, ind = self.airports.contains(event)
+                if cont:
+                    update_text(ind)
+                    self.airtext.set_visible(True)
+                    self.ax.figure.canvas.draw_idle()
+                elif self.airtext.get_visible():
+                    self.airtext.set_visible(False)
+                    self.ax.figure.canvas.draw_idle()
+
+        self.airports_event = self.ax.figure.canvas.mpl_connect('motion_notify_event', on_move)
+        self.ax.figure.canvas.draw_idle()
 
     def set_fillcontinents_visible(self, visible=True, land_color=None,
                                    lake_color=None):
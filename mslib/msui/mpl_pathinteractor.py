@@ -512,28 +512,26 @@ class PathH_Plotter(PathPlotter):
         # necessary as scatter() does not provide a set_data method.
         self.line.set_data(list(zip(*vertices)))
 
-        if self.tangent_lines is not None:
+        if self.tangent_lines is not None and not self.show_tangent_points:
             self.tangent_lines.remove()
             self.tangent_lines = None
-        if self.solar_lines is not None:
+        if self.solar_lines is not None and self.show_solar_angle is None:
             self.solar_lines.remove()
             self.solar_lines = None
 
-        if len(waypoints_model_data) > 0:
+        # The remote sensing overlays are computed in the background, the current
+        # ones are shown until they are replaced by set_remote_sensing_lines.
+        if len(waypoints_model_data) > 0 and (self.show_tangent_points or self.show_solar_angle is not None):
+            assert self.remote_sensing is not None
             wp_heights = [(wpd.flightlevel * 0.03048) for wpd in waypoints_model_data]
             wp_times = [wpd.utc_time for wpd in waypoints_model_data]
-
-            if self.show_tangent_points:
-                assert self.remote_sensing is not None
-                self.tangent_lines = self.remote_sensing.compute_tangent_lines(
-                    self.map, wp_vertices, wp_heights)
-                self.ax.add_collection(self.tangent_lines)
-
-            if self.show_solar_angle is not None:
-                assert self.remote_sensing is not None
-                self.solar_lines = self.remote_sensing.compute_solar_lines(
-                    self.map, wp_vertices, wp_heights, wp_times, self.show_solar_angle)
-                self.ax.add_collection(self.solar_lines)
+            show_tangent_points, show_solar_angle = self.show_tangent_points, self.show_solar_angle
+            self.map.overlay_workers.submit(
+                self, lambda: self.compute_remote_sensing_lines(
+                    wp_vertices, wp_heights, wp_times, show_tangent_points, show_solar_angle),
+                self.set_remote_sensing_lines)
+        else:
+            self.map.overlay_workers.cancel(self)
 
         if self.wp_scatter is not None:
             self.wp_scatter.remove()
@@ -566,7 +564,12 @@ class PathH_Plotter(PathPlotter):
                 visible=self.showverts and self.label_waypoints)
             self.wp_labels.append(text)
 
-        # Redraw the artists.
+        self.blit_artists()
+
+    def blit_artists(self):
+        """Restore the background stored by draw_callback() and redraw the
+           animated artists on top of it.
+        """
         if self.background:
             self.canvas.restore_region(self.background)
         try:
@@ -579,12 +582,38 @@ class PathH_Plotter(PathPlotter):
 
         for wp_label in self.wp_labels:
             self.ax.draw_artist(wp_label)
-        if self.show_tangent_points:
+        if self.tangent_lines is not None:
             self.ax.draw_artist(self.tangent_lines)
-        if self.show_solar_angle is not None:
+        if self.solar_lines is not None:
             self.ax.draw_artist(self.solar_lines)
         self.canvas.blit(self.ax.bbox)
 
+    def compute_remote_sensing_lines(self, wp_vertices, wp_heights, wp_times, show_tangent_points, show_solar_angle):
+        """Compute the tangent point and solar angle overlays of the flight
+           track (None if not shown). Does not touch the plot, so that it can
+           run outside of the GUI thread.
+        """
+        tangent_lines, solar_lines = None, None
+        if show_tangent_points:
+            tangent_lines = self.remote_sensing.compute_tangent_lines(self.map, wp_vertices, wp_heights)
+        if show_solar_angle is not None:
+            solar_lines = self.remote_sensing.compute_solar_lines(
+                self.map, wp_vertices, wp_heights, wp_times, show_solar_angle)
+        return tangent_lines, solar_lines
+
+    def set_remote_sensing_lines(self, lines):
+        """Replace the remote sensing overlays by the ones computed by
+           compute_remote_sensing_lines() and redraw them.
+        """
+        for line in (self.tangent_lines, self.solar_lines):
+            if line is not None:
+                line.remove()
+        self.tangent_lines, self.solar_lines = lines
+        for line in lines:
+            if line is not None:
+                self.ax.add_collection(line)
+        self.blit_artists()
+
     def draw_callback(self, event):
         """Extends PathInteractor.draw_callback() by drawing the scatter
            instance.
@@ -592,9 +621,9 @@ class PathH_Plotter(PathPlotter):
         super().draw_callback(event)
         if self.wp_scatter:
             self.ax.draw_artist(self.wp_scatter)
-        if self.show_solar_angle:
+        if self.solar_lines is not None:
             self.ax.draw_artist(self.solar_lines)
-        if self.show_tangent_points:
+        if self.tangent_lines is not None:
             self.ax.draw_artist(self.tangent_lines)
 
     def set_path_color(self, line_color=None, marker_facecolor=None,
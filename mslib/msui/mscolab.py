@@ -36,6 +36,7 @@ import json
 import hashlib
 import logging
 import types
+import functools
 import fs
 import requests
 import re
@@ -61,7 +62,8 @@ from PyQt5.QtGui import QPixmap
 
 from mslib.utils.auth import get_password_from_keyring, save_password_to_keyring
 from mslib.utils.verify_user_token import verify_user_token
-from mslib.utils.qt import get_open_filename, get_save_filename, dropEvent, dragEnterEvent, show_popup
+from mslib.utils.waypoint_patch import apply_waypoint_patch, diff_waypoints
+from mslib.utils.qt import get_open_filename, get_save_filename, dropEvent, dragEnterEvent, show_popup, WorkerPool
 from mslib.msui.qt5 import ui_mscolab_help_dialog as msc_help_dialog
 from mslib.msui.qt5 import ui_add_operation_dialog as add_operation_ui
 from mslib.msui.qt5 import ui_mscolab_merge_waypoints_dialog as merge_wp_ui
@@ -71,6 +73,11 @@ from mslib.msui.qt5 import ui_operation_archive as ui_opar
 from mslib.msui import constants
 from mslib.utils.config import config_loader, modify_config_file
 
+# changes of the flight track are saved once no further change followed for SAVE_DELAY
+# milliseconds, but a burst of changes is saved at least every SAVE_INTERVAL milliseconds
+SAVE_DELAY = 500
+SAVE_INTERVAL = 2000
+
 
 class MSColab_OperationArchiveBrowser(QtWidgets.QDialog, ui_opar.Ui_OperationArchiveBrowser):
     def __init__(self, parent=None, mscolab=None):
@@ -548,6 +555,21 @@ class MSUIMscolab(QtCore.QObject):
         self.operations = None
         # store active_flight_path here as object
         self.waypoints_model = None
+        # server version of the flight track and its waypoints as last synchronised,
+        # changes are sent as waypoint patches against them
+        self.waypoints_version = None
+        self.waypoints_synced = None
+        # base version and waypoints of the patch sent last, until the server answered
+        self.waypoints_sent = None
+        # set while a patch of another client is applied to waypoints_model
+        self.applying_waypoint_patch = False
+        # collects the changes of waypoints_model, see handle_waypoints_changed
+        self.save_timer = QtCore.QTimer(self)
+        self.save_timer.setSingleShot(True)
+        self.save_timer.timeout.connect(self.save_waypoints_changes)
+        self.save_burst = QtCore.QElapsedTimer()
+        # checks the token in the background after saving
+        self.token_workers = WorkerPool(self)
         # Store active operation's file path
         self.local_ftml_file = None
         # Store active_operation_description
@@ -664,6 +686,9 @@ class MSUIMscolab(QtCore.QObject):
         else:
             self.conn.signal_operation_list_updated.connect(self.reload_operation_list)
             self.conn.signal_reload.connect(self.reload_window)
+            self.conn.signal_file_patched.connect(self.handle_file_patched)
+            self.conn.signal_file_patch_acknowledged.connect(self.handle_file_patch_acknowledged)
+            self.conn.signal_file_patch_rejected.connect(self.handle_file_patch_rejected)
             self.conn.signal_new_permission.connect(self.render_new_permission)
             self.conn.signal_update_permission.connect(self.handle_update_permission)
             self.conn.signal_revoke_permission.connect(self.handle_revoke_permission)
@@ -1394,6 +1419,9 @@ class MSUIMscolab(QtCore.QObject):
             self.logout()
 
     def handle_work_locally_toggle(self):
+        if self.save_timer.isActive():
+            # the changes belong to the flight track worked on before the toggle
+            self.save_waypoints_changes(local=not self.ui.workLocallyCheckbox.isChecked())
         if verify_user_token(self.mscolab_server_url, self.token):
             if self.ui.workLocallyCheckbox.isChecked():
                 if self.version_window is not None:
@@ -1817,6 +1845,8 @@ class MSUIMscolab(QtCore.QObject):
                     item.setFont(font)
                     return
 
+            if self.save_timer.isActive():
+                self.save_waypoints_changes()
             # close all hanging window
             self.close_external_windows()
             self.hide_operation_options()
@@ -1962,7 +1992,7 @@ class MSUIMscolab(QtCore.QObject):
         # change working status label
         self.ui.workingStatusLabel.setText(self.ui.tr("\n\nNo Operation Selected"))
 
-    def request_wps_from_server(self):
+    def request_wps_from_server(self, with_version=False):
         if verify_user_token(self.mscolab_server_url, self.token):
             data = {
                 "token": self.token,
@@ -1971,8 +2001,10 @@ class MSUIMscolab(QtCore.QObject):
             url = urljoin(self.mscolab_server_url, "get_operation_by_id")
             r = requests.get(url, data=data)
             if r.text != "False":
-                xml_content = json.loads(r.text)["content"]
-                return xml_content
+                result = json.loads(r.text)
+                if with_version:
+                    return result["content"], result.get("version")
+                return result["content"]
             else:
                 show_popup(self.ui, "Error", "Session expired, new login required")
         else:
@@ -1982,10 +2014,15 @@ class MSUIMscolab(QtCore.QObject):
     def load_wps_from_server(self):
         if self.ui.workLocallyCheckbox.isChecked():
             return
-        xml_content = self.request_wps_from_server()
-        if xml_content is not None:
+        if self.save_timer.isActive():
+            self.save_waypoints_changes()
+        result = self.request_wps_from_server(with_version=True)
+        if result is not None:
+            xml_content, self.waypoints_version = result
+            self.waypoints_sent = None
             self.waypoints_model = ft.WaypointsTableModel(xml_content=xml_content)
             self.waypoints_model.name = self.active_operation_name
+            self.waypoints_synced = self.waypoints_model.waypoint_dicts()
             self.waypoints_model.dataChanged.connect(self.handle_waypoints_changed)
 
     def reload_operations(self):
@@ -2003,17 +2040,153 @@ class MSUIMscolab(QtCore.QObject):
         self.reload_view_windows()
 
     def handle_waypoints_changed(self):
+        """
+        collects the changes of the flight track, they are saved once they settle,
+        see SAVE_DELAY and SAVE_INTERVAL
+        """
         logging.debug("handle_waypoints_changed")
-        if verify_user_token(self.mscolab_server_url, self.token):
-            if self.ui.workLocallyCheckbox.isChecked():
-                self.waypoints_model.save_to_ftml(self.local_ftml_file)
-            else:
-                xml_content = self.waypoints_model.get_xml_content()
-                self.conn.save_file(self.token, self.active_op_id, xml_content, comment=None)
-        else:
+        if self.applying_waypoint_patch:
+            return
+        if not self.save_timer.isActive():
+            self.save_burst.start()
+            self.save_timer.start(SAVE_DELAY)
+        elif self.save_burst.elapsed() + SAVE_DELAY < SAVE_INTERVAL:
+            self.save_timer.start(SAVE_DELAY)
+
+    def save_waypoints_changes(self, local=None):
+        """
+        saves the changes of the flight track collected so far, to the local file
+        if local is True, to the server if it is False, or as the checkbox says if it is None
+        """
+        self.save_timer.stop()
+        if self.waypoints_model is None or self.active_op_id is None:
+            return
+        if local is None:
+            local = self.ui.workLocallyCheckbox.isChecked()
+        if local:
+            self.waypoints_model.save_to_ftml(self.local_ftml_file)
+            return
+        if self.conn is None:
+            return
+        if self.waypoints_version is None or self.waypoints_synced is None:
+            xml_content = self.waypoints_model.get_xml_content()
+            # checks the token itself
+            self.conn.save_file(self.token, self.active_op_id, xml_content, comment=None)
+            return
+        if self.waypoints_sent is not None:
+            # the next patch is based on the version the server answers with
+            self.save_timer.start(SAVE_DELAY)
+            return
+        waypoints = self.waypoints_model.waypoint_dicts()
+        ops = diff_waypoints(self.waypoints_synced, waypoints)
+        if not ops:
+            return
+        self.conn.patch_file(self.active_op_id, self.waypoints_version, ops)
+        # the server acknowledges the patch as the next version, or rejects it
+        self.waypoints_sent = (self.waypoints_version, waypoints)
+        # the server refuses patches with an invalid token, the check only informs the user
+        self.token_workers.submit(
+            "verify_user_token", functools.partial(verify_user_token, self.mscolab_server_url, self.token),
+            self.handle_token_verified)
+
+    def handle_token_verified(self, valid):
+        if not valid and self.token is not None:
             show_popup(self.ui, "Error", "Your Connection is expired. New Login required!")
             self.logout()
 
+    @QtCore.pyqtSlot(str)
+    def handle_file_patched(self, message):
+        """
+        applies the waypoint patch of another client to the synchronised flight
+        track and rebases the local changes on it, or reloads the flight track
+        if the patch does not fit the local version
+        """
+        message = json.loads(message)
+        if (message["op_id"] != self.active_op_id or self.ui.workLocallyCheckbox.isChecked() or
+                self.waypoints_model is None):
+            return
+        if self.waypoints_sent is not None and message["base_version"] == self.waypoints_version + 1:
+            # the patch builds on the own one, whose acknowledgement is still on its way
+            self.handle_file_patch_acknowledged(message["op_id"], message["base_version"])
+        if self.waypoints_synced is None or message["base_version"] != self.waypoints_version:
+            logging.debug("patch of version %s does not fit %s", message["base_version"], self.waypoints_version)
+            self.reload_wps_keeping_local_changes()
+            return
+        waypoints = self.waypoints_model.waypoint_dicts()
+        local_ops = diff_waypoints(self.waypoints_synced, waypoints)
+        self.waypoints_synced = apply_waypoint_patch(self.waypoints_synced, message["ops"])
+        self.waypoints_version = message["version"]
+        if local_ops:
+            self.apply_local_changes(waypoints, local_ops)
+        else:
+            self.apply_waypoint_changes(message["ops"])
+
+    def reload_wps_keeping_local_changes(self):
+        """
+        reloads the flight track from the server and applies the local changes
+        the server has not acknowledged yet on top of it
+        """
+        waypoints = self.waypoints_model.waypoint_dicts()
+        local_ops = [] if self.waypoints_synced is None else diff_waypoints(self.waypoints_synced, waypoints)
+        # the changes are sent against the reloaded version instead
+        self.save_timer.stop()
+        self.reload_wps_from_server()
+        if local_ops and self.waypoints_synced is not None:
+            self.apply_local_changes(waypoints, local_ops)
+
+    def apply_local_changes(self, waypoints, local_ops):
+        """
+        changes waypoints_model into the synchronised flight track with the local
+        changes local_ops applied, which turned it into waypoints before, and saves them
+        """
+        try:
+            rebased = apply_waypoint_patch(self.waypoints_synced, local_ops)
+        except ValueError as ex:
+            # the local changes do not fit the changed flight track, they win
+            logging.debug("local changes do not apply to version %s: %s", self.waypoints_version, ex)
+            rebased = waypoints
+        self.apply_waypoint_changes(diff_waypoints(self.waypoints_model.waypoint_dicts(), rebased))
+        self.handle_waypoints_changed()
+
+    def apply_waypoint_changes(self, ops):
+        """
+        applies waypoint operations to waypoints_model in place, without saving them
+        """
+        self.applying_waypoint_patch = True
+        try:
+            self.waypoints_model.apply_waypoint_patch(ops)
+        finally:
+            self.applying_waypoint_patch = False
+
+    @QtCore.pyqtSlot(int, int)
+    def handle_file_patch_acknowledged(self, op_id, version):
+        """
+        the server accepted the patch sent last as version
+        """
+        if op_id != self.active_op_id or self.waypoints_sent is None:
+            return
+        self.waypoints_synced = self.waypoints_sent[1]
+        self.waypoints_version = version
+        self.waypoints_sent = None
+
+    @QtCore.pyqtSlot(int)
+    def handle_file_patch_rejected(self, op_id):
+        """
+        the server did not accept a patch, as another client changed the flight track
+        meanwhile, so the local changes are sent again against the current version
+        """
+        if op_id != self.active_op_id or self.waypoints_sent is None:
+            return
+        version = self.waypoints_sent[0]
+        self.waypoints_sent = None
+        if self.ui.workLocallyCheckbox.isChecked() or self.waypoints_model is None:
+            return
+        if version == self.waypoints_version:
+            # the patch that got ahead of the own one did not arrive
+            self.reload_wps_keeping_local_changes()
+        else:
+            self.save_waypoints_changes()
+
     def reload_view_windows(self):
         logging.debug("reload_view_windows")
         if self.ui.local_active:
@@ -2056,7 +2229,7 @@ class MSUIMscolab(QtCore.QObject):
                 xml_content = xml_doc.toprettyxml(indent="  ", newl="\n")
             self.waypoints_model.dataChanged.disconnect(self.handle_waypoints_changed)
             self.waypoints_model = model
-            self.handle_waypoints_changed()
+            self.save_waypoints_changes()
             self.waypoints_model.dataChanged.connect(self.handle_waypoints_changed)
             self.reload_view_windows()
             show_popup(self.ui, "Import Success", f"The file - {file_name}, was imported successfully!", 1)
@@ -2099,6 +2272,9 @@ class MSUIMscolab(QtCore.QObject):
     def logout(self):
         if self.mscolab_server_url is None:
             return
+        if self.save_timer.isActive():
+            self.save_waypoints_changes()
+        self.token_workers.cancel("verify_user_token")
         self.ui.local_active = True
         self.ui.menu_handler()
 
@@ -39,6 +39,9 @@ from mslib.utils.qt import get_open_filename, get_save_filename, show_popup
 from mslib.msui.qt5 import ui_mscolab_operation_window as ui
 from mslib.utils.config import config_loader
 
+# number of messages requested at once, older ones are requested on scrolling up
+MESSAGES_PAGE_SIZE = 100
+
 
 # We need to override the KeyPressEvent in QTextEdit to disable the default behaviour of enter key.
 class MessageTextEdit(QtWidgets.QTextEdit):
@@ -99,6 +102,8 @@ class MSColabChatWindow(QtWidgets.QMainWindow, ui.Ui_MscolabOperation):
         self.active_edit_id = None
         self.active_message_reply = None
         self.current_search_index = None
+        self.oldest_message = None
+        self.all_messages_loaded = False
         self.markdown = Markdown(extensions=['nl2br', 'sane_lists', DeregisterSyntax()])
         self.messageText = MessageTextEdit(self.centralwidget)
         self.setup_message_text()
@@ -125,6 +130,7 @@ class MSColabChatWindow(QtWidgets.QMainWindow, ui.Ui_MscolabOperation):
         self.load_users()
         # load messages
         self.load_all_messages()
+        self.messageList.verticalScrollBar().valueChanged.connect(self.handle_message_list_scrolled)
         if access_level == "viewer":
             self.messageText.setEnabled(False)
             self.previewBtn.setEnabled(False)
@@ -345,36 +351,76 @@ class MSColabChatWindow(QtWidgets.QMainWindow, ui.Ui_MscolabOperation):
             show_popup(self, "Error", "Session expired, new login required")
 
     def load_all_messages(self):
-        # empty messages and reload from server
+        # empty messages and reload the latest ones from server
+        # no older messages are loaded on the scrolling caused by clearing
+        self.oldest_message = None
+        self.messageList.clear()
+        self.all_messages_loaded = False
+        messages = self.request_messages()
+        if messages is not None:
+            for message in messages:
+                self.render_new_message(message, scroll=False)
+            self.messageList.scrollToBottom()
+
+    def load_older_messages(self):
+        if self.all_messages_loaded or self.oldest_message is None:
+            return
+        first_item = self.messageList.item(0)
+        messages = self.request_messages(before=self.oldest_message)
+        if messages is not None:
+            for row, message in enumerate(messages):
+                self.render_new_message(message, scroll=False, row=row)
+            # keep the messages in view, which were shown before
+            if first_item is not None:
+                self.messageList.scrollToItem(first_item, QtWidgets.QAbstractItemView.PositionAtTop)
+            # the rows of the found messages have changed
+            self.current_search_index = None
+
+    def request_messages(self, before=None):
+        """
+        before: if provided, the messages before this message are requested
+
+        returns the latest page of messages, or None if the request failed
+        """
         data = {
             "token": self.token,
             "op_id": self.op_id,
             "timestamp": datetime.datetime(1970, 1, 1,
-                                           tzinfo=datetime.timezone.utc).isoformat()
+                                           tzinfo=datetime.timezone.utc).isoformat(),
+            "limit": MESSAGES_PAGE_SIZE
         }
+        if before is not None:
+            data["before"] = before["time"]
+            data["before_id"] = before["id"]
         # returns an array of messages
         url = urljoin(self.mscolab_server_url, "messages")
 
         res = requests.get(url, data=data, timeout=tuple(config_loader(dataset="MSCOLAB_timeout")))
-        if res.text != "False":
-            res = res.json()
-            messages = res["messages"]
-            # clear message box
-            for message in messages:
-                self.render_new_message(message, scroll=False)
-            self.messageList.scrollToBottom()
-        else:
+        if res.text == "False":
             show_popup(self, "Error", "Session expired, new login required")
-
-    def render_new_message(self, message, scroll=True):
+            return None
+        messages = res.json()["messages"]
+        if len(messages) > 0:
+            self.oldest_message = messages[0]
+        self.all_messages_loaded = len(messages) < MESSAGES_PAGE_SIZE
+        return messages
+
+    def render_new_message(self, message, scroll=True, row=None):
         message_item = MessageItem(message, self)
-        list_widget_item = QtWidgets.QListWidgetItem(self.messageList)
+        list_widget_item = QtWidgets.QListWidgetItem()
         list_widget_item.setSizeHint(message_item.sizeHint())
-        self.messageList.addItem(list_widget_item)
+        if row is None:
+            self.messageList.addItem(list_widget_item)
+        else:
+            self.messageList.insertItem(row, list_widget_item)
         self.messageList.setItemWidget(list_widget_item, message_item)
         if scroll:
             self.messageList.scrollToBottom()
 
+    def handle_message_list_scrolled(self, value):
+        if value == self.messageList.verticalScrollBar().minimum():
+            self.load_older_messages()
+
     # SOCKET HANDLERS
     @QtCore.pyqtSlot(int)
     def handle_permissions_updated(self, _):
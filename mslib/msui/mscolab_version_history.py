@@ -39,6 +39,9 @@ from mslib.utils.qt import show_popup
 from mslib.utils.config import config_loader
 from mslib.utils.time import utc_to_local_datetime
 
+# number of changes requested at once, older ones are requested on scrolling down
+CHANGES_PAGE_SIZE = 100
+
 
 class MSColabVersionHistory(QtWidgets.QMainWindow, ui.Ui_MscolabVersionHistory):
     """Derives QMainWindow to provide some common functionality to all
@@ -69,6 +72,8 @@ class MSColabVersionHistory(QtWidgets.QMainWindow, ui.Ui_MscolabVersionHistory):
         self.operation_name = operation_name
         self.conn = conn
         self.mscolab_server_url = mscolab_server_url
+        self.oldest_change = None
+        self.all_changes_loaded = False
 
         # Event handlers
         self.refreshBtn.clicked.connect(self.handle_refresh)
@@ -77,6 +82,7 @@ class MSColabVersionHistory(QtWidgets.QMainWindow, ui.Ui_MscolabVersionHistory):
         self.deleteVersionNameBtn.clicked.connect(self.handle_delete_version_name)
         self.versionFilterCB.currentIndexChanged.connect(lambda: self.load_all_changes())
         self.changes.currentItemChanged.connect(self.preview_change)
+        self.changes.verticalScrollBar().valueChanged.connect(self.handle_changes_scrolled)
         # Setup UI
         self.deleteVersionNameBtn.setVisible(False)
         self.set_label_text()
@@ -126,8 +132,21 @@ class MSColabVersionHistory(QtWidgets.QMainWindow, ui.Ui_MscolabVersionHistory):
 
     def load_all_changes(self):
         """
-        get changes from api, clear listwidget, render them to ui
+        get the latest changes from api, clear listwidget, render them to ui
+        """
+        # no further changes are loaded on the scrolling caused by clearing
+        self.all_changes_loaded = True
+        self.changes.clear()
+        self.oldest_change = None
+        self.all_changes_loaded = False
+        self.load_more_changes()
+
+    def load_more_changes(self):
         """
+        get the changes before the ones in the listwidget from api, render them to ui
+        """
+        if self.all_changes_loaded:
+            return
         if verify_user_token(self.mscolab_server_url, self.token):
             data = {
                 "token": self.token,
@@ -136,13 +155,16 @@ class MSColabVersionHistory(QtWidgets.QMainWindow, ui.Ui_MscolabVersionHistory):
             named_version_only = False
             if self.versionFilterCB.currentIndex() == 0:
                 named_version_only = True
-            query_string = urlencode({"named_version": named_version_only})
+            query = {"named_version": named_version_only, "limit": CHANGES_PAGE_SIZE}
+            if self.oldest_change is not None:
+                query["before"] = self.oldest_change["created_at"]
+                query["before_id"] = self.oldest_change["id"]
+            query_string = urlencode(query)
             url_path = f'get_all_changes?{query_string}'
             url = urljoin(self.mscolab_server_url, url_path)
             r = requests.get(url, data=data, timeout=tuple(config_loader(dataset="MSCOLAB_timeout")))
             if r.text != "False":
                 changes = json.loads(r.text)["changes"]
-                self.changes.clear()
                 for change in changes:
                     created_at = datetime.fromisoformat(change["created_at"])
                     local_time = utc_to_local_datetime(created_at)
@@ -155,6 +177,9 @@ class MSColabVersionHistory(QtWidgets.QMainWindow, ui.Ui_MscolabVersionHistory):
                     item.id = change["id"]
                     item.version_name = change["version_name"]
                     self.changes.addItem(item)
+                if len(changes) > 0:
+                    self.oldest_change = changes[-1]
+                self.all_changes_loaded = len(changes) < CHANGES_PAGE_SIZE
             else:
                 # this triggers disconnect
                 self.conn.signal_reload.emit(self.op_id)
@@ -162,6 +187,10 @@ class MSColabVersionHistory(QtWidgets.QMainWindow, ui.Ui_MscolabVersionHistory):
             # this triggers disconnect
             self.conn.signal_reload.emit(self.op_id)
 
+    def handle_changes_scrolled(self, value):
+        if value == self.changes.verticalScrollBar().maximum():
+            self.load_more_changes()
+
     def preview_change(self, current_item, previous_item):
         if verify_user_token(self.mscolab_server_url, self.token):
             font = QtGui.QFont()
@@ -90,12 +90,16 @@ class MultipleFlightpath:
         self.draw()
 
     def draw(self):
+        # the great circle path is computed outside of the GUI thread
         lat, lon = self.get_lonlat()
-        x, y = self.compute_xy(lon, lat)
-        self.draw_line(x, y)
+        self.map.overlay_workers.submit(self, lambda: self.compute_xy(lon, lat), self.add_line)
+
+    def add_line(self, xy):
+        self.draw_line(*xy)
         self.map.ax.figure.canvas.draw()
 
     def remove(self):
+        self.map.overlay_workers.cancel(self)
         for patch in self.patches:
             for elem in patch:
                 elem.remove()
@@ -35,7 +35,7 @@ import skyfield_data
 from PyQt5 import QtGui, QtWidgets
 from mslib.msui.qt5 import ui_remotesensing_dockwidget as ui
 from mslib.utils.time import jsec_to_datetime, datetime_to_jsec
-from mslib.utils.coordinate import get_distance, rotate_point, fix_angle, normalize_longitude
+from mslib.utils.coordinate import rotate_point, normalize_longitude
 
 
 EARTH_RADIUS = 6371.
@@ -94,17 +94,21 @@ class RemoteSensingControlWidget(QtWidgets.QWidget, ui.Ui_RemoteSensingDockWidge
             (0.65, 1.00, 0.65, 1.0)])
         self.solar_norm = BoundaryNorm(
             [0, 5, 10, 15, 25, 35, 45, 90, 135, 180], self.solar_cmap.N)
+        # fine path points and body angles of the flight path legs, see compute_solar_lines
+        self._solar_legs = {}
 
         self.update_settings()
 
     @staticmethod
     def compute_view_angles(lon0, lat0, h0, lon1, lat1, h1, obs_azi, obs_ele):
         mlat = ((lat0 + lat1) / 2.)
-        lon0 *= np.cos(np.deg2rad(mlat))
-        lon1 *= np.cos(np.deg2rad(mlat))
+        lon0 = lon0 * np.cos(np.deg2rad(mlat))
+        lon1 = lon1 * np.cos(np.deg2rad(mlat))
         dlon = lon1 - lon0
         dlat = lat1 - lat0
-        obs_azi_p = fix_angle(obs_azi + np.rad2deg(np.arctan2(dlon, dlat)))
+        obs_azi_p = obs_azi + np.rad2deg(np.arctan2(dlon, dlat))
+        # same as fix_angle, but for scalars and arrays alike
+        obs_azi_p = np.where(obs_azi_p > 0, 360 - np.mod(-obs_azi_p, 360), np.mod(obs_azi_p, 360))[()]
         return obs_azi_p, obs_ele
 
     def compute_body_angle(self, body, jsec, lon, lat):
@@ -114,10 +118,26 @@ class RemoteSensingControlWidget(QtWidgets.QWidget, ui.Ui_RemoteSensingDockWidge
         alt, az, d = astrometric.apparent().altaz()
         return az.degrees, alt.degrees
 
+    def compute_body_angles(self, body, jsecs, lons, lats):
+        """
+        Array version of compute_body_angle, one position per time.
+        """
+        days, seconds = np.divmod(np.asarray(jsecs, dtype=float), 24 * 3600)
+        t = self.timescale.utc(2000, 1, 1 + days.astype(int), 0, 0, seconds)
+        loc = self.planets["earth"] + Topos(latitude_degrees=np.asarray(lats), longitude_degrees=np.asarray(lons))
+        astrometric = loc.at(t).observe(self.planets[body])
+        alt, az, d = astrometric.apparent().altaz()
+        return az.degrees, alt.degrees
+
     def update_settings(self):
         """
         Updates settings in TopView and triggers a redraw.
         """
+        # the overlays are computed outside of the GUI thread, which must not access the widgets
+        self.tangent_height = self.dsbTangentHeight.value()
+        self.obs_azimuth = self.dsbObsAngleAzimuth.value()
+        self.obs_elevation = self.dsbObsAngleElevation.value()
+        self.tangent_colour = QtGui.QPalette(self.btTangentsColour.palette()).color(QtGui.QPalette.Button).getRgbF()
         settings = {
             "reference": self,
             "draw_tangents": self.cbDrawTangents.isChecked(),
@@ -165,7 +185,7 @@ class RemoteSensingControlWidget(QtWidgets.QWidget, ui.Ui_RemoteSensingDockWidge
         # fine_lines = list of tuples with x-list and y-list for each segment
         tp_lines = [self.tangent_point_coordinates(
             _fine_line[0], _fine_line[1], _line_height,
-            cut_height=self.dsbTangentHeight.value())
+            cut_height=self.tangent_height)
             for _fine_line, _line_height in zip(fine_lines, line_heights)]
         dir_lines = self.direction_coordinates(fine_lines)
         lines = tp_lines + dir_lines
@@ -180,7 +200,7 @@ class RemoteSensingControlWidget(QtWidgets.QWidget, ui.Ui_RemoteSensingDockWidge
             lines[i] = line
         return LineCollection(
             lines,
-            colors=QtGui.QPalette(self.btTangentsColour.palette()).color(QtGui.QPalette.Button).getRgbF(),
+            colors=self.tangent_colour,
             zorder=2, animated=True, linewidth=3, linestyles=[':'] * len(tp_lines) + ['-'] * len(dir_lines))
 
     def compute_solar_lines(self, bmap, wp_vertices, wp_heights, wp_times, solartype):
@@ -198,7 +218,6 @@ class RemoteSensingControlWidget(QtWidgets.QWidget, ui.Ui_RemoteSensingDockWidge
                  angular distance between viewing direction and solar
                  angle
         """
-        # calculate distances and times
         body, difftype = solartype
 
         times = [datetime_to_jsec(_wp_time) for _wp_time in wp_times]
@@ -206,64 +225,54 @@ class RemoteSensingControlWidget(QtWidgets.QWidget, ui.Ui_RemoteSensingDockWidge
         wp_lons, wp_lats = bmap(x, y, inverse=True)
         if bmap.projection == "cyl":  # hack for wraparound
             wp_lons = normalize_longitude(wp_lons, bmap.llcrnrlon, bmap.urcrnrlon)
-        fine_lines = [bmap.gcpoints2(wp_lons[i], wp_lats[i], wp_lons[i + 1], wp_lats[i + 1], map_coords=False) for i in
-                      range(len(wp_lons) - 1)]
-        line_heights = [np.linspace(wp_heights[i], wp_heights[i + 1], num=len(fine_lines[i][0])) for i in
-                        range(len(fine_lines))]
-        line_times = [np.linspace(times[i], times[i + 1], num=len(fine_lines[i][0])) for i in
-                      range(len(fine_lines))]
-        # fine_lines = list of tuples with x-list and y-list for each segment
-        # lines = list of tuples with lon-list and lat-list for each segment
-        heights = []
-        times = []
-        for i in range(len(fine_lines) - 1):
-            heights.extend(line_heights[i][:-1])
-            times.extend(line_times[i][:-1])
-        heights.extend(line_heights[-1])
-        times.extend(line_times[-1])
-        solar_x = []
-        solar_y = []
-        for i in range(len(fine_lines) - 1):
-            solar_x.extend(fine_lines[i][0][:-1])
-            solar_y.extend(fine_lines[i][1][:-1])
-        solar_x.extend(fine_lines[-1][0])
-        solar_y.extend(fine_lines[-1][1])
+        # the body angles of a leg only depend on its end points and times, so legs
+        # unaffected by a change of the flight path are taken from the previous call
+        solar_legs = {}
+        legs = []
+        for i in range(len(wp_lons) - 1):
+            key = (bmap.rmajor, bmap.rminor, body,
+                   wp_lons[i], wp_lats[i], times[i], wp_lons[i + 1], wp_lats[i + 1], times[i + 1])
+            if key not in self._solar_legs:
+                self._solar_legs[key] = self._compute_solar_leg(bmap, *key[2:])
+            solar_legs[key] = self._solar_legs[key]
+            legs.append(solar_legs[key])
+        self._solar_legs = solar_legs
+
+        # legs = tuples with lon-array, lat-array and body azimuth/elevation at all but the last point
+        solar_x = np.concatenate([_leg[0][:-1] for _leg in legs] + [legs[-1][0][-1:]])
+        solar_y = np.concatenate([_leg[1][:-1] for _leg in legs] + [legs[-1][1][-1:]])
+        sol_azi = np.concatenate([_leg[2] for _leg in legs])
+        sol_ele = np.concatenate([_leg[3] for _leg in legs])
+        heights = np.concatenate([np.linspace(wp_heights[i], wp_heights[i + 1], num=len(_leg[0]))[:-1]
+                                  for i, _leg in enumerate(legs)] + [wp_heights[-1:]])
         if bmap.projection == "cyl":  # hack for wraparound
             solar_x = normalize_longitude(solar_x, bmap.llcrnrlon, bmap.urcrnrlon)
-        points = []
-        old_wp = None
-        total_distance = 0
-        for i, (lon, lat) in enumerate(zip(solar_x, solar_y)):
-            points.append([[lon, lat]])  # append double-list for later concatenation
-            if old_wp is not None:
-                wp_dist = get_distance(old_wp[0], old_wp[1], lat, lon) * 1000.
-                total_distance += wp_dist
-            old_wp = (lat, lon)
-        vals = []
-        for i in range(len(points) - 1):
-            p0, p1 = points[i][0], points[i + 1][0]
-
-            sol_azi, sol_ele = self.compute_body_angle(body, times[i], p0[0], p0[1])
-            obs_azi, obs_ele = self.compute_view_angles(
-                p0[0], p0[1], heights[i], p1[0], p1[1], heights[i + 1],
-                self.dsbObsAngleAzimuth.value(), self.dsbObsAngleElevation.value())
-            if sol_azi < 0:
-                sol_azi += 360
-            if obs_azi < 0:
-                obs_azi += 360
-            rating = self.calc_view_rating(obs_azi, obs_ele, sol_azi, sol_ele, heights[i], difftype)
-            vals.append(rating)
+
+        obs_azi, obs_ele = self.compute_view_angles(
+            solar_x[:-1], solar_y[:-1], heights[:-1], solar_x[1:], solar_y[1:], heights[1:],
+            self.obs_azimuth, self.obs_elevation)
+        vals = self.calc_view_rating(obs_azi, obs_ele, sol_azi, sol_ele, heights[:-1], difftype)
 
         # convert lon, lat to map points
-        for i in range(len(points)):
-            points[i][0][0], points[i][0][1] = bmap(points[i][0][0], points[i][0][1])
-        points = np.concatenate([points[:-1], points[1:]], axis=1)
+        points = np.stack(bmap(solar_x, solar_y), axis=-1)
+        points = np.stack([points[:-1], points[1:]], axis=1)
         # plot
         solar_lines = LineCollection(points, cmap=self.solar_cmap, norm=self.solar_norm,
                                      zorder=2, linewidths=3, animated=True)
-        solar_lines.set_array(np.array(vals))
+        solar_lines.set_array(vals)
         return solar_lines
 
+    def _compute_solar_leg(self, bmap, body, lon0, lat0, jsec0, lon1, lat1, jsec1):
+        """
+        Computes the fine path points of a flight path leg and the body angles
+        at all of them but the last.
+        """
+        lons, lats = bmap.gcpoints2(lon0, lat0, lon1, lat1, map_coords=False)
+        lons, lats = np.asarray(lons, dtype=float), np.asarray(lats, dtype=float)
+        jsecs = np.linspace(jsec0, jsec1, num=len(lons))
+        sol_azi, sol_ele = self.compute_body_angles(body, jsecs[:-1], lons[:-1], lats[:-1])
+        return lons, lats, sol_azi, sol_ele
+
     def tangent_point_coordinates(self, lon_lin, lat_lin, flight_alt=14, cut_height=12):
         """
         Computes coordinates of tangent points given coordinates of flight path.
@@ -274,34 +283,29 @@ class RemoteSensingControlWidget(QtWidgets.QWidget, ui.Ui_RemoteSensingDockWidge
             flight_alt: altitude of aircraft (scalar or numpy array)
             cut_height: altitude of tangent points
 
-        Returns: List of tuples of longitude/latitude coordinates
+        Returns: Array of longitude/latitude coordinates, one row per tangent point
 
         """
         med_lon = np.median(lon_lin)
-        lon_lin = normalize_longitude(lon_lin, med_lon - 180, med_lon + 180)
-        lins = list(zip(lon_lin[0:-1], lon_lin[1:], lat_lin[0:-1], lat_lin[1:]))
-        lins = [(x0 * np.cos(np.deg2rad(np.mean([y0, y1]))), x1 * np.cos(np.deg2rad(np.mean([y0, y1]))), y0, y1)
-                for x0, x1, y0, y1 in lins]
+        # coordinates without a partner in the other list are ignored
+        size = min(len(lon_lin), len(lat_lin))
+        lon_lin = normalize_longitude(np.array(lon_lin[:size], dtype=float), med_lon - 180, med_lon + 180)
+        lat_lin = np.asarray(lat_lin[:size], dtype=float)
+        coslat = np.cos(np.deg2rad(0.5 * (lat_lin[:-1] + lat_lin[1:])))
+        x0, x1 = lon_lin[:-1] * coslat, lon_lin[1:] * coslat
 
-        direction = [(x1 - x0, y1 - y0) for x0, x1, y0, y1 in lins]
-        direction = [(_x / np.hypot(_x, _y), _y / np.hypot(_x, _y))
-                     for _x, _y in direction]
-        los = [rotate_point(point, -self.dsbObsAngleAzimuth.value()) for point in direction]
-        los.append(los[-1])
+        direction_x, direction_y = x1 - x0, np.diff(lat_lin)
+        norm = np.hypot(direction_x, direction_y)
+        los_x, los_y = rotate_point((direction_x / norm, direction_y / norm), -self.obs_azimuth)
 
         if isinstance(flight_alt, (collections.abc.Sequence, np.ndarray)):
-            dist = [(np.sqrt(max((EARTH_RADIUS + a) ** 2 - (EARTH_RADIUS + cut_height) ** 2, 0)) / 110.)
-                    for a in flight_alt[:-1]]
-            dist.append(dist[-1])
+            dist = np.sqrt(np.maximum(
+                (EARTH_RADIUS + np.asarray(flight_alt[:-1])) ** 2 - (EARTH_RADIUS + cut_height) ** 2, 0)) / 110.
         else:
             dist = (np.sqrt((EARTH_RADIUS + flight_alt) ** 2 - (EARTH_RADIUS + cut_height) ** 2) / 110.)
 
-        tp_dir = (np.array(los).T * dist).T
-
-        tps = [(x0 + tp_x, y0 + tp_y, y0) for
-               ((x0, x1, y0, y1), (tp_x, tp_y)) in zip(lins, tp_dir)]
-        tps = [(x0 / np.cos(np.deg2rad(yp)), y0) for (x0, y0, yp) in tps]
-        return tps
+        return np.stack([(x0 + los_x * dist) / np.cos(np.deg2rad(lat_lin[:-1])), lat_lin[:-1] + los_y * dist],
+                        axis=-1)
 
     def direction_coordinates(self, gc_lines):
         """
@@ -329,7 +333,7 @@ class RemoteSensingControlWidget(QtWidgets.QWidget, ui.Ui_RemoteSensingDockWidge
         direction = [(0.5 * (x0 + x1), 0.5 * (y0 + y1), x1 - x0, y1 - y0) for x0, x1, y0, y1 in lins]
         direction = [(_u, _v, _x / np.hypot(_x, _y), _y / np.hypot(_x, _y))
                      for _u, _v, _x, _y in direction]
-        los = [rotate_point(point[2:], -self.dsbObsAngleAzimuth.value()) for point in direction]
+        los = [rotate_point(point[2:], -self.obs_azimuth) for point in direction]
 
         dist = 1.
         tp_dir = (np.array(los).T * dist).T
@@ -358,8 +362,7 @@ class RemoteSensingControlWidget(QtWidgets.QWidget, ui.Ui_RemoteSensingDockWidge
         delta_ele = obs_ele - sol_ele
         if "horizon" in difftype:
             thresh = -np.rad2deg(np.arccos(EARTH_RADIUS / (height + EARTH_RADIUS))) - 3
-            if sol_ele < thresh:
-                delta_ele = 180
+            delta_ele = np.where(sol_ele < thresh, 180, delta_ele)[()]
 
         if "azimuth" == difftype:
             return np.abs(obs_azi - sol_azi)
@@ -36,6 +36,9 @@ from mslib.utils.verify_user_token import verify_user_token
 class ConnectionManager(QtCore.QObject):
 
     signal_reload = QtCore.pyqtSignal(int, name="reload_wps")
+    signal_file_patched = QtCore.pyqtSignal(str, name="file patched")
+    signal_file_patch_acknowledged = QtCore.pyqtSignal(int, int, name="file patch acknowledged")
+    signal_file_patch_rejected = QtCore.pyqtSignal(int, name="file patch rejected")
     signal_message_receive = QtCore.pyqtSignal(str, name="message rcv")
     signal_message_reply_receive = QtCore.pyqtSignal(str, name="message reply")
     signal_message_edited = QtCore.pyqtSignal(str, name="message edited")
@@ -59,6 +62,8 @@ class ConnectionManager(QtCore.QObject):
         logging.debug("Transport Layer: %s", self.sio.transport())
 
         self.sio.on('file-changed', handler=self.handle_file_change)
+        # on waypoint changes of other clients
+        self.sio.on('file-patched', handler=self.handle_file_patched)
         # on chat message receive
         self.sio.on('chat-message-client', handler=self.handle_incoming_message)
         self.sio.on('chat-message-reply-client', handler=self.handle_incoming_message_reply)
@@ -133,6 +138,16 @@ class ConnectionManager(QtCore.QObject):
         message = json.loads(message)
         self.signal_reload.emit(message["op_id"])
 
+    def handle_file_patched(self, message):
+        self.signal_file_patched.emit(message)
+
+    def handle_file_patch_ack(self, message):
+        message = json.loads(message)
+        if message["success"]:
+            self.signal_file_patch_acknowledged.emit(int(message["op_id"]), int(message["version"]))
+        else:
+            self.signal_file_patch_rejected.emit(int(message["op_id"]))
+
     def handle_operation_deleted(self, message):
         op_id = int(json.loads(message)["op_id"])
         self.signal_operation_deleted.emit(op_id)
@@ -194,6 +209,19 @@ class ConnectionManager(QtCore.QObject):
             # this triggers disconnect
             self.signal_reload.emit(op_id)
 
+    def patch_file(self, op_id, version, ops):
+        """
+        sends the waypoint operations ops (see mslib.utils.waypoint_patch), which
+        change the flight track of version into the local one
+        """
+        logging.debug("patching file")
+        self.sio.emit('file-patch', {
+                      "op_id": op_id,
+                      "token": self.token,
+                      "version": version,
+                      "ops": ops},
+                      callback=self.handle_file_patch_ack)
+
     def disconnect(self):
         # Get all pyqtSignals defined in this class and disconnect them from all slots
         allSignals = {
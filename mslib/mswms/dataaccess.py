@@ -30,6 +30,10 @@ from abc import ABCMeta, abstractmethod
 import itertools
 import os
 import logging
+import pickle
+import sqlite3
+import threading
+import time
 import netCDF4
 import numpy as np
 import pint
@@ -109,6 +113,19 @@ class NWPDataAccess(metaclass=ABCMeta):
         else:
             return filename
 
+    def update(self):
+        """
+        Brings the knowledge about available data up to date. Called by the
+        server whenever a client requests a current capability document.
+        """
+        self.setup()
+
+    def get_update_sequence(self):
+        """
+        Returns a number that increases whenever the available data changes.
+        """
+        return 0
+
     @abstractmethod
     def is_reload_required(self, filenames):
         """
@@ -193,6 +210,67 @@ class NWPDataAccess(metaclass=ABCMeta):
         return self._mfDatasetArgsDict
 
 
+class MetadataCache:
+    """
+    Persistent cache for the metadata DefaultDataAccess gathers from its
+    NetCDF files, stored in an SQLite database.
+
+    Entries are keyed by full path, modification time and size of a file,
+    so that all server processes using the same database file only need to
+    open files that have been added or modified since any of them saw them.
+    The cache file must only be writable by the server, as its contents are
+    unpickled.
+    """
+
+    VERSION = 1
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._connection = None
+        self._pid = None
+
+    def _connect(self):
+        # sqlite connections must not be shared with forked processes
+        if self._pid != os.getpid():
+            self._connection = sqlite3.connect(self.filename, timeout=60, check_same_thread=False)
+            self._pid = os.getpid()
+            with self._connection as connection:
+                if connection.execute("PRAGMA user_version").fetchone()[0] != self.VERSION:
+                    connection.execute("DROP TABLE IF EXISTS files")
+                    connection.execute(f"PRAGMA user_version = {self.VERSION}")
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS files ("
+                    "path TEXT, options TEXT, mtime REAL, size INTEGER, content BLOB, "
+                    "PRIMARY KEY (path, options))")
+        return self._connection
+
+    def get(self, path, options, mtime, size):
+        """
+        Returns the cached content of the file at <path> read with <options>,
+        or None if the file is unknown or has been modified.
+        """
+        try:
+            row = self._connect().execute(
+                "SELECT content FROM files WHERE path = ? AND options = ? AND mtime = ? AND size = ?",
+                (path, options, mtime, size)).fetchone()
+            return pickle.loads(row[0]) if row is not None else None
+        except (sqlite3.Error, pickle.UnpicklingError, EOFError) as ex:
+            logging.error("Could not read metadata cache '%s' (%s: %s)", self.filename, type(ex), ex)
+            return None
+
+    def put(self, path, options, mtime, size, content):
+        """
+        Stores the content of the file at <path> read with <options>.
+        """
+        try:
+            with self._connect() as connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                    (path, options, mtime, size, pickle.dumps(content, protocol=pickle.HIGHEST_PROTOCOL)))
+        except sqlite3.Error as ex:
+            logging.error("Could not write metadata cache '%s' (%s: %s)", self.filename, type(ex), ex)
+
+
 class DefaultDataAccess(NWPDataAccess):
     """
     Subclass to NWPDataAccess for accessing properly constructed NetCDF files
@@ -202,10 +280,18 @@ class DefaultDataAccess(NWPDataAccess):
     # Workaround for the numerical issue concerning the lon dimension in
     # NetCDF files produced by netcdf-java 4.3..
 
-    def __init__(self, rootpath, domain_id, skip_dim_check=None, **kwargs):
+    def __init__(self, rootpath, domain_id, skip_dim_check=None, scan_interval=None, metadata_cache=None,
+                 **kwargs):
         """
         Constructor takes the path of the data directory and determines whether
         this class employs different init_times or valid_times.
+
+        If scan_interval is given, a background thread rescans the data
+        directory every scan_interval seconds and update() returns
+        immediately. Otherwise, update() rescans the directory itself.
+
+        If metadata_cache is given, the metadata of the files is kept in this
+        SQLite file across restarts and shared by all processes using it.
         """
         if skip_dim_check is None:
             skip_dim_check = []
@@ -215,6 +301,12 @@ class DefaultDataAccess(NWPDataAccess):
         self._filetree = None
         self._mfDatasetArgsDict = {"skip_dim_check": skip_dim_check}
         self._file_cache = {}
+        self._skipped_files = {}
+        self._update_sequence = 0
+        self._scan_interval = scan_interval
+        self._scanner_pid = None
+        self._metadata_cache = MetadataCache(metadata_cache) if metadata_cache is not None else None
+        self._setup_lock = threading.Lock()
 
     def _determine_filename(self, variable, vartype, init_time, valid_time, reload=True):
         """
@@ -309,7 +401,45 @@ class DefaultDataAccess(NWPDataAccess):
             "standard_names": standard_names
         }
 
-    def _add_to_filetree(self, filename, content):
+    def _check_elevations(self, filename, content):
+        """
+        Checks the vertical levels of previously parsed content against the
+        levels of the files read so far, as _parse_file() does.
+        """
+        vert_type = content["vert_type"]
+        if vert_type == "sfc" or vert_type not in self._elevations:
+            return
+        known = self._elevations[vert_type]
+        if len(content["elevations"]["levels"]) != len(known["levels"]):
+            raise IOError(f"Number of vertical levels does not fit to levels of "
+                          f"previous file '{known['filename']}'.")
+        if not np.allclose(content["elevations"]["levels"], known["levels"]):
+            raise IOError(f"vertical levels do not fit to levels of previous "
+                          f"file '{known['filename']}'.")
+        if content["elevations"]["units"] != known["units"]:
+            raise IOError(f"vertical level units do not match previous "
+                          f"file '{known['filename']}'")
+
+    def _read_file(self, filename, mtime):
+        """
+        Returns the parsed content of a file, taken from the persistent
+        metadata cache if possible.
+        """
+        if self._metadata_cache is None:
+            return self._parse_file(filename)
+        path = os.path.join(self._root_path, filename)
+        size = os.path.getsize(path)
+        options = f"{self.uses_inittime_dimension()},{self.uses_validtime_dimension()}"
+        content = self._metadata_cache.get(path, options, mtime, size)
+        if content is not None:
+            logging.info("Using persistently cached candidate '%s'", filename)
+            self._check_elevations(filename, content)
+            return content
+        content = self._parse_file(filename)
+        self._metadata_cache.put(path, options, mtime, size, content)
+        return content
+
+    def _add_to_filetree(self, filetree, filename, content):
         logging.info("File '%s' identified as '%s' type", filename, content["vert_type"])
         logging.info("Found init time '%s', %s valid_times and %s standard_names",
                      content["init_time"], len(content["valid_times"]), len(content["standard_names"]))
@@ -320,7 +450,7 @@ class DefaultDataAccess(NWPDataAccess):
         else:
             logging.debug("valid_times='%s' standard_names='%s'",
                           content["valid_times"], content["standard_names"])
-        leaf = self._filetree.setdefault(content["vert_type"], {}).setdefault(content["init_time"], {})
+        leaf = filetree.setdefault(content["vert_type"], {}).setdefault(content["init_time"], {})
         for standard_name in content["standard_names"]:
             var_leaf = leaf.setdefault(standard_name, {})
             for valid_time in content["valid_times"]:
@@ -333,23 +463,60 @@ class DefaultDataAccess(NWPDataAccess):
                 else:
                     var_leaf[valid_time] = filename
 
+    def _scan_files(self):
+        """
+        Returns the modification times of all files of this domain in the data
+        directory.
+        """
+        with os.scandir(self._root_path) as entries:
+            return {entry.name: entry.stat().st_mtime for entry in entries if self._domain_id in entry.name}
+
+    def _is_unchanged(self, mtimes):
+        """
+        Checks whether the files in <mtimes> are exactly the ones in the
+        current file tree, without any modification since they were read.
+        """
+        if self._filetree is None or len(mtimes) != len(self._available_files):
+            return False
+        for filename in self._available_files:
+            known = self._file_cache.get(filename, self._skipped_files.get(filename))
+            if filename not in mtimes or known is None or known[0] != mtimes[filename]:
+                return False
+        return True
+
     def setup(self):
+        # Only files that were added, removed or modified since the last call
+        # are parsed. The tree is only rebuilt if anything changed and is
+        # swapped in at the end, so that concurrent requests always see a
+        # complete tree.
+        with self._setup_lock:
+            mtimes = self._scan_files()
+            # The update sequence is derived from the data, so that all
+            # processes serving it report the same one, also after a restart.
+            # The directory is modified when files are added or removed.
+            update_sequence = int(max([os.path.getmtime(self._root_path)] + list(mtimes.values())) * 1000)
+            for cache in (self._file_cache, self._skipped_files):
+                for filename in list(cache):
+                    if filename not in mtimes:
+                        del cache[filename]
+            if self._is_unchanged(mtimes):
+                logging.debug("No changed files for domain '%s'", self._domain_id)
+            else:
+                self._setup(mtimes)
+            self._update_sequence = update_sequence
+
+    def _setup(self, mtimes):
         # Get a list of the available data files.
-        self._available_files = [
-            _filename for _filename in sorted(os.listdir(self._root_path)) if self._domain_id in _filename]
+        available_files = sorted(mtimes)
         logging.info("Files identified for domain '%s': %s",
-                     self._domain_id, self._available_files)
+                     self._domain_id, available_files)
 
-        for filename in list(self._file_cache):
-            if filename not in self._available_files:
-                del self._file_cache[filename]
-
-        self._filetree = {}
+        filetree = {}
         self._elevations = {"sfc": {"filename": None, "levels": [], "units": None}}
 
         # Build the tree structure.
-        for filename in self._available_files:
-            mtime = os.path.getmtime(os.path.join(self._root_path, filename))
+        for filename in available_files:
+            mtime = mtimes[filename]
             if (filename in self._file_cache) and (mtime == self._file_cache[filename][0]):
                 logging.info("Using cached candidate '%s'", filename)
                 content = self._file_cache[filename][1]
@@ -363,19 +530,61 @@ class DefaultDataAccess(NWPDataAccess):
                          content["elevations"]["levels"]))):
                         logging.error("Skipping file '%s' due to elevation mismatch", filename)
                         continue
+            elif (filename in self._skipped_files) and (mtime == self._skipped_files[filename][0]):
+                logging.info("Skipping unchanged file '%s' (%s)", filename, self._skipped_files[filename][1])
+                continue
             else:
                 if filename in self._file_cache:
                     del self._file_cache[filename]
                 logging.info("Opening candidate '%s'", filename)
                 try:
-                    content = self._parse_file(filename)
+                    content = self._read_file(filename, mtime)
                 except IOError as ex:
                     logging.error("Skipping file '%s' (%s: %s)", filename, type(ex), ex)
+                    self._skipped_files[filename] = (mtime, f"{type(ex)}: {ex}")
                     continue
+                self._skipped_files.pop(filename, None)
                 self._file_cache[filename] = (mtime, content)
                 if content["vert_type"] not in self._elevations:
                     self._elevations[content["vert_type"]] = content["elevations"]
-            self._add_to_filetree(filename, content)
+            self._add_to_filetree(filetree, filename, content)
+        self._available_files = available_files
+        self._filetree = filetree
+
+    def update(self):
+        """
+        Brings the file tree up to date. Returns immediately if a background
+        thread rescans the data directory (see scan_interval).
+        """
+        if self._scan_interval is None or self._filetree is None:
+            self.setup()
+        if self._scan_interval is not None:
+            self._start_scanner()
+
+    def _start_scanner(self):
+        # A thread does not survive a fork, so each (uwsgi) worker process
+        # needs to start its own.
+        with self._setup_lock:
+            if self._scanner_pid == os.getpid():
+                return
+            self._scanner_pid = os.getpid()
+        logging.info("Scanning for files of domain '%s' every %s seconds", self._domain_id, self._scan_interval)
+        threading.Thread(target=self._scan_periodically, name=f"scanner_{self._domain_id}", daemon=True).start()
+
+    def _scan_periodically(self):
+        while True:
+            time.sleep(self._scan_interval)
+            try:
+                self.setup()
+            except OSError as ex:
+                logging.error("Scanning '%s' failed (%s: %s)", self._root_path, type(ex), ex)
+
+    def get_update_sequence(self):
+        """
+        Returns the latest modification time of the data directory and the
+        files of this domain in milliseconds, as of the last scan.
+        """
+        return self._update_sequence
 
     def get_init_times(self):
         """
@@ -455,7 +664,7 @@ class WatchModificationDataAccess(DefaultDataAccess):
         except (KeyError, OSError) as ex:
             if reload:
                 self.setup()
-                self._determine_filename(self, variable, vartype, init_time, valid_time, reload=False)
+                return self._determine_filename(variable, vartype, init_time, valid_time, reload=False)
             else:
                 logging.error("Could not identify filename. %s %s %s %s %s %s",
                               variable, vartype, init_time, valid_time, type(ex), ex)
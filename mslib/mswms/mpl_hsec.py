@@ -44,7 +44,7 @@ import PIL.Image
 from mslib.mswms import mss_2D_sections
 from mslib.utils.coordinate import get_projection_params
 from mslib.utils.units import convert_to
-from mslib.mswms.utils import make_cbar_labels_readable
+from mslib.mswms.utils import make_cbar_labels_readable, get_rgba_image, RGBA_MIME_TYPE
 from mslib.utils.loggerdef import configure_mpl_logger
 
 
@@ -68,6 +68,15 @@ class AbstractHorizontalSectionStyle(mss_2D_sections.Abstract2DSectionStyle):
         """
         pass
 
+    def get_lonlat_extent(self, bbox, crs):
+        """
+        Re-implement this function to return the region (lon_min, lon_max,
+        lat_min, lat_max) that is visible in a plot of <bbox> in <crs>, such
+        that the driver only needs to load the data of that region.
+        None requests the complete data.
+        """
+        return None
+
     def add_colorbar(self, contour, label=None, tick_levels=None, width="3%", height="30%", cb_format=None,
                      fraction=0.05, pad=0.08, shrink=0.7, loc=4, extend="both", tick_position="left"):
         if not self.noframe:
@@ -228,9 +237,11 @@ class MPLBasemapHorizontalSectionStyle(AbstractHorizontalSectionStyle):
                       proj_params=None,
                       valid_time=None, init_time=None, style=None,
                       resolution=-1, noframe=False, show=False,
-                      transparent=False):
+                      transparent=False, mime_type="image/png"):
         """
         EPSG overrides proj_params!
+
+        Returns a PNG image or, for RGBA_MIME_TYPE, the unencoded RGBA image.
         """
         if proj_params is None:
             proj_params = {"projection": "cyl"}
@@ -304,27 +315,8 @@ class MPLBasemapHorizontalSectionStyle(AbstractHorizontalSectionStyle):
         basemap_use_cache = getattr(mswms_settings, "basemap_use_cache", False)
         basemap_request_size = getattr(mswms_settings, "basemap_request_size ", 200)
         basemap_cache_size = getattr(mswms_settings, "basemap_cache_size", 20)
-        bm_params = {"area_thresh": 1000., "ax": ax, "fix_aspect": (not noframe)}
-        bm_params.update(proj_params)
-        if bbox_units == "degree":
-            bm_params.update({"llcrnrlon": bbox[0], "llcrnrlat": bbox[1],
-                              "urcrnrlon": bbox[2], "urcrnrlat": bbox[3]})
-        elif bbox_units.startswith("meter"):
-            # convert meters to degrees
-            try:
-                bm_p = basemap.Basemap(resolution=None, **bm_params)
-            except ValueError:  # projection requires some extent
-                bm_p = basemap.Basemap(resolution=None, width=1e7, height=1e7, **bm_params)
-            bm_center = [float(_x) for _x in bbox_units[6:-1].split(",")]
-            center_x, center_y = bm_p(*bm_center)
-            bbox_0, bbox_1 = bm_p(bbox[0] + center_x, bbox[1] + center_y, inverse=True)
-            bbox_2, bbox_3 = bm_p(bbox[2] + center_x, bbox[3] + center_y, inverse=True)
-            bm_params.update({"llcrnrlon": bbox_0, "llcrnrlat": bbox_1,
-                              "urcrnrlon": bbox_2, "urcrnrlat": bbox_3})
-        elif bbox_units == "no":
-            pass
-        else:
-            raise ValueError(f"bbox_units '{bbox_units}' not known.")
+        bm_params = self._get_basemap_params(bbox, proj_params, bbox_units)
+        bm_params.update({"ax": ax, "fix_aspect": (not noframe)})
         if basemap_use_cache and key in BASEMAP_CACHE:
             bm = basemap.Basemap(resolution=None, **bm_params)
             (bm.resolution, bm.coastsegs, bm.coastpolygontypes, bm.coastpolygons,
@@ -380,8 +372,12 @@ class MPLBasemapHorizontalSectionStyle(AbstractHorizontalSectionStyle):
         if transparent:
             fig.patch.set_alpha(0.)
 
-        # Return the image as png embedded in a StringIO stream.
         canvas = FigureCanvas(fig)
+        if mime_type == RGBA_MIME_TYPE:
+            logging.debug("returning figure as RGBA image..")
+            return get_rgba_image(canvas)
+
+        # Return the image as png embedded in a StringIO stream.
         output = io.BytesIO()
         canvas.print_png(output)
 
@@ -433,6 +429,82 @@ class MPLBasemapHorizontalSectionStyle(AbstractHorizontalSectionStyle):
         logging.debug("returning figure..")
         return output.getvalue()
 
+    @staticmethod
+    def _get_basemap_params(bbox, proj_params, bbox_units):
+        """
+        Returns the parameters of a basemap instance covering <bbox>.
+        """
+        bm_params = {"area_thresh": 1000.}
+        bm_params.update(proj_params)
+        if bbox_units == "degree":
+            bm_params.update({"llcrnrlon": bbox[0], "llcrnrlat": bbox[1],
+                              "urcrnrlon": bbox[2], "urcrnrlat": bbox[3]})
+        elif bbox_units.startswith("meter"):
+            # convert meters to degrees
+            try:
+                bm_p = basemap.Basemap(resolution=None, **bm_params)
+            except ValueError:  # projection requires some extent
+                bm_p = basemap.Basemap(resolution=None, width=1e7, height=1e7, **bm_params)
+            bm_center = [float(_x) for _x in bbox_units[6:-1].split(",")]
+            center_x, center_y = bm_p(*bm_center)
+            bbox_0, bbox_1 = bm_p(bbox[0] + center_x, bbox[1] + center_y, inverse=True)
+            bbox_2, bbox_3 = bm_p(bbox[2] + center_x, bbox[3] + center_y, inverse=True)
+            bm_params.update({"llcrnrlon": bbox_0, "llcrnrlat": bbox_1,
+                              "urcrnrlon": bbox_2, "urcrnrlat": bbox_3})
+        elif bbox_units == "no":
+            pass
+        else:
+            raise ValueError(f"bbox_units '{bbox_units}' not known.")
+        return bm_params
+
+    def get_lonlat_extent(self, bbox, crs, num=101):
+        """
+        Returns the region (lon_min, lon_max, lat_min, lat_max) covered by the
+        map of <bbox> in <crs>. The longitudes are not normalised, but
+        lon_max - lon_min is at most 360.
+
+        The region is determined from <num> points along each edge of the map.
+        A map containing a pole covers all longitudes.
+        """
+        proj_params, bbox_units = [get_projection_params(crs)[_x] for _x in ("basemap", "bbox")]
+        if bbox_units == "no":
+            return None
+        try:
+            bm = basemap.Basemap(resolution=None, **self._get_basemap_params(bbox, proj_params, bbox_units))
+        except ValueError as ex:
+            logging.debug("Could not determine map region: %s", ex)
+            return None
+
+        edge_x = np.linspace(bm.xmin, bm.xmax, num)
+        edge_y = np.linspace(bm.ymin, bm.ymax, num)
+        lons, lats = bm(np.concatenate([edge_x, np.full(num, bm.xmax), edge_x[::-1], np.full(num, bm.xmin)]),
+                        np.concatenate([np.full(num, bm.ymin), edge_y, np.full(num, bm.ymax), edge_y[::-1]]),
+                        inverse=True)
+        lons, lats = np.asarray(lons), np.asarray(lats)
+        if not (np.isfinite(lons).all() and np.isfinite(lats).all() and (np.abs(lats) <= 90).all()):
+            return None
+        lat_min, lat_max = lats.min(), lats.max()
+
+        contains_pole = False
+        for pole in (-90, 90):
+            pole_x, pole_y = bm(0., pole)
+            if bm.xmin < pole_x < bm.xmax and bm.ymin < pole_y < bm.ymax:
+                contains_pole = True
+                lat_min, lat_max = min(lat_min, pole), max(lat_max, pole)
+        if contains_pole:
+            return -180., 180., lat_min, lat_max
+
+        # The covered longitudes are the complement of the largest gap between
+        # the edge points, extended by the spacing of the edge points.
+        lons = np.sort(lons % 360)
+        gaps = np.diff(lons, append=lons[0] + 360)
+        gap = gaps.argmax()
+        spacing = np.delete(gaps, gap).max()
+        if gaps[gap] <= 2 * spacing:
+            return -180., 180., lat_min, lat_max
+        lon_min = lons[(gap + 1) % len(lons)] - spacing
+        return lon_min, lon_min + 360 - gaps[gap] + 2 * spacing, lat_min, lat_max
+
     def shift_data(self):
         """Shift the data fields such that the longitudes are in the range
         left_longitude .. left_longitude+360, where left_longitude is the
@@ -32,6 +32,7 @@ import matplotlib as mpl
 from pint import Quantity
 
 from mslib.mswms import mss_2D_sections
+from mslib.mswms.utils import get_netcdf_section, NETCDF_MIME_TYPE
 from mslib.utils.units import convert_to
 from mslib.utils.loggerdef import configure_mpl_logger
 
@@ -67,7 +68,7 @@ class AbstractLinearSectionStyle(mss_2D_sections.Abstract2DSectionStyle):
         """
         return ["LINE:1"]
 
-    def plot_lsection(self, data, lats, lons, valid_time, init_time):
+    def plot_lsection(self, data, lats, lons, valid_time, init_time, mime_type="text/xml"):
         """
         """
         # Check if required data is available.
@@ -92,6 +93,10 @@ class AbstractLinearSectionStyle(mss_2D_sections.Abstract2DSectionStyle):
         # Derive additional data fields and make the plot.
         self._prepare_datafields()
 
+        if mime_type == NETCDF_MIME_TYPE:
+            return get_netcdf_section(self.title, self.valid_time, self.init_time, self.lats, self.lons,
+                                      {self.variable: self.y_values}, {self.variable: self.unit})
+
         impl = getDOMImplementation()
         xmldoc = impl.createDocument(None, "MSS_LinearSection_Data", None)
 
@@ -40,7 +40,8 @@ import mpl_toolkits.axes_grid1
 
 from mslib.mswms import mss_2D_sections
 from mslib.utils.units import convert_to, units
-from mslib.mswms.utils import make_cbar_labels_readable
+from mslib.mswms.utils import make_cbar_labels_readable, get_rgba_image, get_netcdf_section, \
+    RGBA_MIME_TYPE, NETCDF_MIME_TYPE
 from mslib.utils.loggerdef import configure_mpl_logger
 
 
@@ -205,7 +206,7 @@ class AbstractVerticalSectionStyle(mss_2D_sections.Abstract2DSectionStyle):
 
         # Code for producing a png image with Matplotlib.
         # ===============================================
-        if mime_type == "image/png":
+        if mime_type in ("image/png", RGBA_MIME_TYPE):
 
             logging.debug("creating figure..")
             dpi = 80
@@ -229,8 +230,12 @@ class AbstractVerticalSectionStyle(mss_2D_sections.Abstract2DSectionStyle):
             if transparent:
                 self.fig.patch.set_alpha(0.)
 
-            # Return the image as png embedded in a StringIO stream.
             canvas = FigureCanvas(self.fig)
+            if mime_type == RGBA_MIME_TYPE:
+                logging.debug("returning figure as RGBA image..")
+                return get_rgba_image(canvas)
+
+            # Return the image as png embedded in a StringIO stream.
             output = io.BytesIO()
             canvas.print_png(output)
 
@@ -308,10 +313,7 @@ class AbstractVerticalSectionStyle(mss_2D_sections.Abstract2DSectionStyle):
             node = xmldoc.createElement("Longitude")
             node.setAttribute("num_waypoints", f"{len(self.lons)}")
 
-            data_str = ""
-            for value in self.lons:
-                data_str += str(value) + ","
-            data_str = data_str[:-1]
+            data_str = ",".join(map(str, self.lons))
 
             node.appendChild(xmldoc.createTextNode(data_str))
             xmldoc.documentElement.appendChild(node)
@@ -320,10 +322,7 @@ class AbstractVerticalSectionStyle(mss_2D_sections.Abstract2DSectionStyle):
             node = xmldoc.createElement("Latitude")
             node.setAttribute("num_waypoints", f"{len(self.lats)}")
 
-            data_str = ""
-            for value in self.lats:
-                data_str += str(value) + ","
-            data_str = data_str[:-1]
+            data_str = ",".join(map(str, self.lats))
 
             node.appendChild(xmldoc.createTextNode(data_str))
             xmldoc.documentElement.appendChild(node)
@@ -337,12 +336,7 @@ class AbstractVerticalSectionStyle(mss_2D_sections.Abstract2DSectionStyle):
                 node.setAttribute("num_levels", f"{data_shape[0]}")
                 node.setAttribute("num_waypoints", f"{data_shape[1]}")
 
-                data_str = ""
-                for data_row in self.data[var]:
-                    for value in data_row:
-                        data_str += str(value) + ","
-                    data_str = data_str[:-1] + "\n"
-                data_str = data_str[:-1]
+                data_str = "\n".join(",".join(map(str, data_row)) for data_row in self.data[var])
 
                 node.appendChild(xmldoc.createTextNode(data_str))
                 data_node.appendChild(node)
@@ -351,5 +345,11 @@ class AbstractVerticalSectionStyle(mss_2D_sections.Abstract2DSectionStyle):
 
             # Return the XML document as formatted string.
             return xmldoc.toprettyxml(indent="  ")
+
+        # Code for generating a NetCDF file with the data values in binary format.
+        # =======================================================================
+        elif mime_type == NETCDF_MIME_TYPE:
+            return get_netcdf_section(self.title, self.valid_time, self.init_time, self.lats, self.lons,
+                                      self.data, self.data_units)
         else:
             raise RuntimeError
@@ -28,15 +28,56 @@
 
 from datetime import datetime
 
+import copy
 import logging
 import os
+import threading
 from abc import ABCMeta, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
 
 import numpy as np
 
 from mslib.utils import netCDF4tools
 import mslib.utils.coordinate as coordinate
 from mslib.utils.units import convert_to, units
+from mslib.mswms.utils import get_animated_png, stack_netcdf_sections, RGBA_MIME_TYPE, NETCDF_MIME_TYPE
+
+
+class LRUCache:
+    """
+    Keeps the results of expensive computations for the <size> most
+    recently used keys. The cache may be shared between threads; the cached
+    values must not be modified.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, compute):
+        """
+        Returns the value cached for <key> or computes and caches it by
+        calling <compute>.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        value = compute()
+        with self._lock:
+            self._entries[key] = value
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return value
 
 
 class MSSPlotDriver(metaclass=ABCMeta):
@@ -59,22 +100,25 @@ class MSSPlotDriver(metaclass=ABCMeta):
     set_plot_parameters() and plot().
     """
 
-    def __init__(self, data_access_object):
+    def __init__(self, data_access_object, dataset_pool_size=4):
         """
         Requires an instance of a data access object from the MSS
         configuration (i.e. an NWPDataAccess instance).
+
+        Up to <dataset_pool_size> sets of input files are kept open, such
+        that switching between layers does not reopen the files.
         """
         self.data_access = data_access_object
+        self.dataset_pool = DatasetPool(data_access_object, dataset_pool_size)
         self.dataset = None
         self.plot_object = None
         self.filenames = []
 
     def __del__(self):
         """
-        Closes the open NetCDF dataset, if existing.
+        Closes the open NetCDF datasets, if existing.
         """
-        if self.dataset is not None:
-            self.dataset.close()
+        self.dataset_pool.close()
 
     def _set_time(self, init_time, fc_time):
         """
@@ -85,7 +129,7 @@ class MSSPlotDriver(metaclass=ABCMeta):
           determines the files that correspond to an init time and forecast step
           checks if an open NetCDF dataset exists
             if yes, checks whether it contains the requested valid time
-              if not, closes the dataset and opens the corresponding one
+              if not, takes the corresponding one from the dataset pool
           loads dimension data if required.
         """
         if len(self.plot_object.required_datafields) == 0:
@@ -118,76 +162,63 @@ class MSSPlotDriver(metaclass=ABCMeta):
         # i.e. the required variables have not changed as well).
         if (self.dataset is not None) and (self.init_time == init_time) and (fc_time in self.times):
             logging.debug("\tinit time correct and forecast valid time contained (%s).", fc_time)
-            if not self.data_access.is_reload_required(self.filenames):
+            if self.dataset_pool.get(self.filenames).dataset is self.dataset:
                 return
-            logging.debug("need to re-open input files.")
-            self.dataset.close()
+            # the pool has re-opened the modified input files
             self.dataset = None
 
         # Determine the input files from the required variables and the
         # requested time:
 
         # Create the names of the files containing the required parameters.
-        self.filenames = []
-        for vartype, var, _ in self.plot_object.required_datafields:
-            filename = self.data_access.get_filename(
-                var, vartype, init_time, fc_time, fullpath=True)
-            if filename not in self.filenames:
-                self.filenames.append(filename)
-            logging.debug("\tvariable '%s' requires input file '%s'",
-                          var, os.path.basename(filename))
+        self.filenames = self._get_filenames(init_time, fc_time)
 
         if len(self.filenames) == 0:
             raise ValueError("no files found that correspond to the specified "
                              "datafields. Aborting..")
 
         self.init_time = init_time
+        self.dataset = None
 
-        # Open NetCDF files as one dataset with common dimensions.
-        logging.debug("opening datasets.")
-        dsKWargs = self.data_access.mfDatasetArgs()
-        dataset = netCDF4tools.MFDatasetCommonDims(self.filenames, **dsKWargs)
-
-        # Load and check time dimension. self.dataset will remain None
-        # if an Exception is raised here.
-        timename, timevar = netCDF4tools.identify_CF_time(dataset)
-
-        times = netCDF4tools.num2date(timevar[:], timevar.units)
-        # removed after discussion, see
-        # https://mss-devel.slack.com/archives/emerge/p1486658769000007
-        # if init_time != netCDF4tools.num2date(0, timevar.units):
-        #     dataset.close()
-        #     raise ValueError("wrong initialisation time in input")
+        # Open NetCDF files as one dataset with common dimensions (or reuse
+        # the one opened for a previous layer on the same files).
+        entry = self.dataset_pool.get(self.filenames)
 
-        if fc_time not in times:
+        if fc_time not in entry.times:
             msg = f"Forecast valid time '{fc_time}' is not available."
             logging.error(msg)
-            dataset.close()
             raise ValueError(msg)
 
-        # Load lat/lon dimensions.
-        try:
-            lat_data, lon_data, lat_order = netCDF4tools.get_latlon_data(dataset)
-        except Exception as ex:
-            logging.error("ERROR: %s %s", type(ex), ex)
-            dataset.close()
-            raise
-
-        _, vert_data, vert_orientation, vert_units, _ = netCDF4tools.identify_vertical_axis(dataset)
-        self.vert_data = vert_data[:] if vert_data is not None else None
-        self.vert_order = vert_orientation
-        self.vert_units = vert_units
-
-        self.dataset = dataset
-        self.times = times
-        self.lat_data = lat_data
-        self.lon_data = lon_data
-        self.lat_order = lat_order
+        self.dataset = entry.dataset
+        self.times = entry.times
+        self.lat_data = entry.lat_data
+        self.lon_data = entry.lon_data
+        self.lat_order = entry.lat_order
+        self.vert_data = entry.vert_data
+        self.vert_order = entry.vert_order
+        self.vert_units = entry.vert_units
 
         # Identify the variable objects from the NetCDF file that correspond
         # to the data fields required by the plot object.
         self._find_data_vars()
 
+    def _get_filenames(self, init_time, fc_time):
+        """
+        Determines the input files that contain the required data fields at
+        the given times, without opening them.
+        """
+        vartypes = {}
+        for vartype, var, _ in self.plot_object.required_datafields:
+            filename = self.data_access.get_filename(
+                var, vartype, init_time, fc_time, fullpath=True)
+            vartypes.setdefault(filename, vartype)
+            logging.debug("\tvariable '%s' requires input file '%s'",
+                          var, os.path.basename(filename))
+        # The first file is the master of the combined dataset, whose
+        # dimensions the other files have to share, so files with vertical
+        # levels go before the surface files.
+        return sorted(vartypes, key=lambda _x: vartypes[_x] == "sfc")
+
     def _find_data_vars(self):
         """
         Find NetCDF variables of required data fields.
@@ -240,8 +271,7 @@ class MSSPlotDriver(metaclass=ABCMeta):
         # (the required variables could have changed).
         if self.plot_object is not None:
             require_reload = require_reload or (self.plot_object != plot_object)
-        if require_reload and self.dataset is not None:
-            self.dataset.close()
+        if require_reload:
             self.dataset = None
 
         self.plot_object = plot_object
@@ -353,15 +383,26 @@ class VerticalSectionDriver(MSSPlotDriver):
     to be registered).
     """
 
+    # Clients request the same flight path for many layers and times, so the
+    # path points and their interpolation weights on the data grids are
+    # shared by all vertical and linear section drivers.
+    path_cache = LRUCache(128)
+
     def set_plot_parameters(self, plot_object=None, vsec_path=None,
                             vsec_numpoints=101, vsec_path_connection='linear',
                             vsec_numlabels=10,
                             init_time=None, valid_time=None, style=None,
                             bbox=None, figsize=(800, 600), noframe=False, draw_verticals=False,
                             show=False, transparent=False,
-                            mime_type="image/png"):
+                            mime_type="image/png", valid_times=None):
         """
+        If <valid_times> lists several valid times, plot() returns the
+        section at all of them (see _plot_valid_times()).
         """
+        if valid_times is not None and len(valid_times) > 1:
+            valid_time = valid_times[0]
+        else:
+            valid_times = None
         MSSPlotDriver.set_plot_parameters(self, plot_object,
                                           init_time=init_time,
                                           valid_time=valid_time,
@@ -375,13 +416,14 @@ class VerticalSectionDriver(MSSPlotDriver):
         self.show = show
         self.vsec_numlabels = vsec_numlabels
         self.draw_verticals = draw_verticals
+        self.valid_times = valid_times
 
     def update_plot_parameters(self, plot_object=None, vsec_path=None,
                                vsec_numpoints=None, vsec_path_connection=None,
                                vsec_numlabels=None,
                                init_time=None, valid_time=None, style=None,
                                bbox=None, figsize=None, noframe=None, draw_verticals=None, show=None,
-                               transparent=None, mime_type=None):
+                               transparent=None, mime_type=None, valid_times=None):
         """
         """
         plot_object = plot_object if plot_object is not None else self.plot_object
@@ -389,6 +431,8 @@ class VerticalSectionDriver(MSSPlotDriver):
         noframe = noframe if noframe is not None else self.noframe
         draw_verticals = draw_verticals if draw_verticals else self.draw_verticals
         init_time = init_time if init_time is not None else self.init_time
+        if valid_times is None and valid_time is None:
+            valid_times = self.valid_times
         valid_time = valid_time if valid_time is not None else self.fc_time
         style = style if style is not None else self.style
         bbox = bbox if bbox is not None else self.bbox
@@ -414,7 +458,8 @@ class VerticalSectionDriver(MSSPlotDriver):
                                  draw_verticals=draw_verticals,
                                  show=show,
                                  transparent=transparent,
-                                 mime_type=mime_type)
+                                 mime_type=mime_type,
+                                 valid_times=valid_times)
 
     def _set_vertical_section_path(self, vsec_path, vsec_numpoints=101,
                                    vsec_path_connection='linear'):
@@ -422,11 +467,12 @@ class VerticalSectionDriver(MSSPlotDriver):
         """
         logging.debug("computing %i interpolation points, connection: %s",
                       vsec_numpoints, vsec_path_connection)
-        self.lats, self.lons = coordinate.path_points(
-            [_x[0] for _x in vsec_path],
-            [_x[1] for _x in vsec_path],
-            numpoints=vsec_numpoints, connection=vsec_path_connection)
-        self.lats, self.lons = np.asarray(self.lats), np.asarray(self.lons)
+        self.lats, self.lons = self.path_cache.get(
+            ("path", tuple(tuple(_x[:2]) for _x in vsec_path), vsec_numpoints, vsec_path_connection),
+            lambda: [np.asarray(_x) for _x in coordinate.path_points(
+                [_x[0] for _x in vsec_path],
+                [_x[1] for _x in vsec_path],
+                numpoints=vsec_numpoints, connection=vsec_path_connection)])
         self.vsec_path = vsec_path
         self.vsec_numpoints = vsec_numpoints
         self.vsec_path_connection = vsec_path_connection
@@ -445,13 +491,88 @@ class VerticalSectionDriver(MSSPlotDriver):
         cross section crosses the data longitude boundaries (e.g. data is
         stored on a 0..360 grid, but the path is in the range -10..+20).
         """
+        return self._load_interpolate_timesteps([self.fc_time])[0]
+
+    def _load_interpolate_timesteps(self, fc_times):
+        """
+        Same as _load_interpolate_timestep() for several valid times
+        <fc_times> contained in the open dataset. The time steps of each
+        variable are read in as few evenly strided hyperslabs as possible,
+        such that no other time steps are read, and interpolated with the same
+        weights. Returns one dictionary of curtains per valid time.
+        """
         if self.dataset is None:
-            return {}
-        data = {}
+            return [{} for _ in fc_times]
+        data = [{} for _ in fc_times]
 
-        timestep = self.times.searchsorted(self.fc_time)
-        logging.debug("loading data for time step %s (%s)", timestep, self.fc_time)
+        timesteps = self.times.searchsorted(fc_times)
+        unique_steps, step_indices = np.unique(timesteps, return_inverse=True)
+        runs = self._get_timestep_runs(unique_steps)
+        logging.debug("loading data for time steps %s (%s)", timesteps, fc_times)
+
+        lats, lons, weights, windows = self._get_path_windows()
 
+        for name, var in self.data_vars.items():
+            var_data = np.concatenate(
+                [self._load_path_windows(var, steps, windows) for steps in runs])[step_indices]
+            logging.debug("\tLoaded %.2f Mbytes from data field <%s> at time steps %s.",
+                          var_data.nbytes / 1048576., name, timesteps)
+            logging.debug("\tVertical dimension direction is %s.",
+                          "up" if self.vert_order == 1 else "down")
+            logging.debug("\tInterpolating to cross-section path.")
+            curtains = coordinate.interpolate_vertsec(
+                var_data.reshape(-1, *var_data.shape[2:]), lats, lons, self.lats, self.lons, weights=weights)
+            for index, curtain in enumerate(curtains.reshape(len(fc_times), -1, curtains.shape[-1])):
+                data[index][name] = curtain
+            # Free memory.
+            del var_data
+
+        return data
+
+    @staticmethod
+    def _get_timestep_runs(timesteps):
+        """
+        Splits the sorted, unique <timesteps> into runs of evenly spaced time
+        steps and returns a slice for each run.
+        """
+        runs = []
+        start = 0
+        while start < len(timesteps):
+            stop = start + 1
+            stride = 1
+            if stop < len(timesteps):
+                stride = timesteps[stop] - timesteps[start]
+                while stop < len(timesteps) and timesteps[stop] - timesteps[stop - 1] == stride:
+                    stop += 1
+            runs.append(slice(int(timesteps[start]), int(timesteps[stop - 1]) + 1, int(stride)))
+            start = stop
+        return runs
+
+    def _get_path_windows(self, max_gap=8, max_width=64):
+        """
+        Returns the result of _compute_path_windows(), cached for the path
+        points and the data grid.
+        """
+        key = ("windows", self.lats.tobytes(), self.lons.tobytes(),
+               self.lat_data.tobytes(), self.lon_data.tobytes(), max_gap, max_width)
+        return self.path_cache.get(key, lambda: self._compute_path_windows(max_gap, max_width))
+
+    def _compute_path_windows(self, max_gap=8, max_width=64):
+        """
+        Determines the parts of the grid that the interpolation to the path
+        points needs, such that only those need to be read.
+
+        The longitudes are shifted to the range left_longitude ..
+        left_longitude+360 (see _load_interpolate_timestep) and sorted. The
+        columns required by the path are joined, if less than <max_gap>
+        columns apart, and split into windows of at most <max_width>
+        columns, each with its own latitude range. This keeps the windows
+        small also for long or dateline-crossing paths.
+
+        Returns the latitudes and longitudes of the sub-grid composed of the
+        windows, the interpolation weights of the path points on this
+        sub-grid and the windows to be passed to _load_path_windows().
+        """
         # Determine the westmost longitude in the cross-section path. Subtract
         # one gridbox size to obtain "left_longitude".
         dlon = self.lon_data[1] - self.lon_data[0]
@@ -473,28 +594,83 @@ class VerticalSectionDriver(MSSPlotDriver):
         jump = np.where(dlon_data > 2 * dlon)[0]
 
         lons = ((self.lons - left_longitude) % 360) + left_longitude
+        (lat_indices, col_indices), factors, valid = coordinate.get_interpolation_weights(
+            self.lat_data, lon_data, self.lats, lons)
 
-        for name, var in self.data_vars.items():
-            if len(var.shape) == 4:
-                var_data = var[timestep, ::-self.vert_order, ::self.lat_order, :]
-            else:
-                var_data = var[:][timestep, np.newaxis, ::self.lat_order, :]
-            logging.debug("\tLoaded %.2f Mbytes from data field <%s> at timestep %s.",
-                          var_data.nbytes / 1048576., name, timestep)
-            logging.debug("\tVertical dimension direction is %s.",
-                          "up" if self.vert_order == 1 else "down")
-            logging.debug("\tInterpolating to cross-section path.")
-            # Re-arange longitude dimension in the data field.
-            var_data = var_data[:, :, lon_indices]
-            if jump:
-                logging.debug("\tsetting jump data to NaN at %s", jump)
-                var_data = var_data.copy()
-                var_data[:, :, jump] = np.nan
-            data[name] = coordinate.interpolate_vertsec(var_data, self.lat_data, lon_data, self.lats, lons)
-            # Free memory.
-            del var_data
+        # Columns (of the sorted grid) required by the path, joined into runs and split into windows.
+        if valid.any():
+            required = np.unique(np.concatenate([col_indices[0][valid], col_indices[1][valid]]))
+        else:
+            required = np.arange(len(lon_data))
+        runs = np.split(required, np.nonzero(np.diff(required) > max_gap)[0] + 1)
+        columns = np.concatenate([np.arange(run[0], run[-1] + 1) for run in runs])
+        window_columns, offset = [], 0
+        for run in runs:
+            width = run[-1] + 1 - run[0]
+            window_columns.extend((start, min(start + max_width, offset + width))
+                                  for start in range(offset, offset + width, max_width))
+            offset += width
+
+        # Latitude range of each window.
+        num_lats = len(self.lat_data)
+        lat_start, lat_stop = np.full(len(window_columns), num_lats), np.zeros(len(window_columns), dtype=int)
+        if valid.any():
+            window_starts = columns[[start for start, _ in window_columns]]
+            for col_index in col_indices:
+                window = window_starts.searchsorted(col_index[valid], side="right") - 1
+                np.minimum.at(lat_start, window, lat_indices[0][valid])
+                np.maximum.at(lat_stop, window, lat_indices[1][valid] + 1)
+        else:
+            lat_start[:], lat_stop[:] = 0, num_lats
+        lat_range = lat_start.min(), lat_stop.max()
+
+        # Interpolation weights on the sub-grid.
+        weights = ((np.clip(lat_indices[0] - lat_range[0], 0, lat_range[1] - lat_range[0] - 1),
+                    np.clip(lat_indices[1] - lat_range[0], 0, lat_range[1] - lat_range[0] - 1)),
+                   (np.clip(columns.searchsorted(col_indices[0]), 0, len(columns) - 1),
+                    np.clip(columns.searchsorted(col_indices[1]), 0, len(columns) - 1))), factors, valid
+
+        windows = (lat_range, lon_indices[columns], np.nonzero(np.isin(columns, jump))[0],
+                   [(lat_start[index], lat_stop[index], start, stop)
+                    for index, (start, stop) in enumerate(window_columns) if lat_start[index] < lat_stop[index]])
+        logging.debug("reading %s windows with %s of %sx%s grid points", len(windows[3]),
+                      sum((_x[1] - _x[0]) * (_x[3] - _x[2]) for _x in windows[3]), num_lats, len(lon_data))
+        return self.lat_data[lat_range[0]:lat_range[1]], lon_data[columns], weights, windows
+
+    def _load_path_windows(self, var, timestep, windows):
+        """
+        Reads the windows determined by _get_path_windows() of the variable
+        <var> at <timestep>. Grid points outside of the windows and missing
+        values are NaN.
 
-        return data
+        <timestep> may also be a slice of time steps, which adds a leading
+        time dimension to the returned array.
+        """
+        (lat_offset, lat_end), file_columns, jump, lat_lon_windows = windows
+        steps = timestep if isinstance(timestep, slice) else slice(timestep, timestep + 1)
+        num_steps = len(range(*steps.indices(var.shape[0])))
+        num_lats = len(self.lat_data)
+        num_levels = var.shape[1] if len(var.shape) == 4 else 1
+        var_data = np.full((num_steps, num_levels, lat_end - lat_offset, len(file_columns)), np.nan)
+        for lat_start, lat_stop, col_start, col_stop in lat_lon_windows:
+            if self.lat_order == 1:
+                lat_slice = slice(lat_start, lat_stop)
+            else:
+                lat_slice = slice(num_lats - lat_stop, num_lats - lat_start)
+            # a window may wrap around the longitude boundary of the file
+            breaks = np.nonzero(np.diff(file_columns[col_start:col_stop]) != 1)[0] + 1
+            for cols in np.split(np.arange(col_start, col_stop), breaks):
+                lon_slice = slice(file_columns[cols[0]], file_columns[cols[-1]] + 1)
+                if len(var.shape) == 4:
+                    window = var[steps, ::-self.vert_order, lat_slice, lon_slice]
+                else:
+                    window = var[steps, lat_slice, lon_slice][:, np.newaxis]
+                var_data[:, :, lat_start - lat_offset:lat_stop - lat_offset, cols[0]:cols[-1] + 1] = \
+                    np.ma.filled(window[:, :, ::self.lat_order, :], np.nan)
+        if len(jump) > 0:
+            logging.debug("\tsetting jump data to NaN at %s", jump)
+            var_data[..., jump] = np.nan
+        return var_data if isinstance(timestep, slice) else var_data[0]
 
     def shift_data(self):
         """
@@ -525,6 +701,9 @@ class VerticalSectionDriver(MSSPlotDriver):
     def plot(self):
         """
         """
+        if self.valid_times is not None:
+            return self._plot_valid_times()
+
         d1 = datetime.now()
 
         # Load and interpolate the data fields as required by the vertical
@@ -537,30 +716,10 @@ class VerticalSectionDriver(MSSPlotDriver):
         logging.debug("Loaded and interpolated data (required time %s).", d2 - d1)
         logging.debug("Plotting interpolated curtain.")
 
-        if len(self.lat_data) > 1 and len(self.lon_data) > 1:
-            resolution = (self.lon_data[1] - self.lon_data[0],
-                          self.lat_data[1] - self.lat_data[0])
-        else:
-            resolution = (-1, -1)
-
-        if self.mime_type not in ("image/png", "text/xml"):
+        if self.mime_type not in ("image/png", RGBA_MIME_TYPE, "text/xml", NETCDF_MIME_TYPE):
             raise RuntimeError(f"Unexpected format for vertical sections '{self.mime_type}'.")
 
-        # Call the plotting method of the vertical section style instance.
-        image = self.plot_object.plot_vsection(data, self.lats, self.lons,
-                                               valid_time=self.fc_time,
-                                               init_time=self.init_time,
-                                               resolution=resolution,
-                                               bbox=self.bbox,
-                                               style=self.style,
-                                               show=self.show,
-                                               highlight=self.vsec_path,
-                                               noframe=self.noframe,
-                                               figsize=self.figsize,
-                                               draw_verticals=self.draw_verticals,
-                                               transparent=self.transparent,
-                                               numlabels=self.vsec_numlabels,
-                                               mime_type=self.mime_type)
+        image = self._plot_curtains(data, self.fc_time, self.mime_type)
         # Free memory.
         del data
 
@@ -570,6 +729,73 @@ class VerticalSectionDriver(MSSPlotDriver):
 
         return image
 
+    def _plot_curtains(self, data, valid_time, mime_type):
+        """
+        Calls the plotting method of the vertical section style instance.
+        """
+        if len(self.lat_data) > 1 and len(self.lon_data) > 1:
+            resolution = (self.lon_data[1] - self.lon_data[0],
+                          self.lat_data[1] - self.lat_data[0])
+        else:
+            resolution = (-1, -1)
+
+        return self.plot_object.plot_vsection(data, self.lats, self.lons,
+                                              valid_time=valid_time,
+                                              init_time=self.init_time,
+                                              resolution=resolution,
+                                              bbox=self.bbox,
+                                              style=self.style,
+                                              show=self.show,
+                                              highlight=self.vsec_path,
+                                              noframe=self.noframe,
+                                              figsize=self.figsize,
+                                              draw_verticals=self.draw_verticals,
+                                              transparent=self.transparent,
+                                              numlabels=self.vsec_numlabels,
+                                              mime_type=mime_type)
+
+    def _plot_valid_times(self):
+        """
+        Plots the section at all of <self.valid_times>. Consecutive valid
+        times contained in the same files are loaded together, all of them
+        share the path and its interpolation weights.
+
+        Returns an animated PNG with one frame per valid time or a NetCDF
+        file with an additional time dimension.
+        """
+        d1 = datetime.now()
+        if self.mime_type not in ("image/png", NETCDF_MIME_TYPE):
+            raise RuntimeError(f"Unexpected format for vertical sections of several times '{self.mime_type}'.")
+
+        # Group the valid times by their files before opening any of them,
+        # so that each set of files is only opened once even if the pool
+        # cannot hold all of them.
+        groups, filenames = [], []
+        for valid_time in self.valid_times:
+            group_filenames = self._get_filenames(self.init_time, valid_time)
+            filenames.extend(_x for _x in group_filenames if _x not in filenames)
+            if groups and groups[-1][0] == group_filenames:
+                groups[-1][1].append(valid_time)
+            else:
+                groups.append((group_filenames, [valid_time]))
+
+        images = []
+        for _, valid_times in groups:
+            self._set_time(self.init_time, valid_times[0])
+            for valid_time, data in zip(valid_times, self._load_interpolate_timesteps(valid_times)):
+                images.append(self._plot_curtains(data, valid_time, self.mime_type))
+
+        # The driver state refers to the last files only, so let the next
+        # request pick its dataset from the pool again.
+        self.dataset = None
+        self.filenames = filenames
+
+        logging.debug("Finished plotting %s valid times (required time %s).",
+                      len(images), datetime.now() - d1)
+        if self.mime_type == NETCDF_MIME_TYPE:
+            return stack_netcdf_sections(images)
+        return get_animated_png(images)
+
 
 class HorizontalSectionDriver(MSSPlotDriver):
     """
@@ -616,13 +842,61 @@ class HorizontalSectionDriver(MSSPlotDriver):
                                  valid_time=valid_time, style=style, figsize=figsize, noframe=noframe, show=show,
                                  transparent=transparent, mime_type=mime_type)
 
+    def _get_hyperslab(self, halo=2):
+        """
+        Determines the part of the horizontal grid that is visible in the
+        requested map, extended by <halo> grid cells.
+
+        Returns the latitude slice (in the order of the file), a list of
+        longitude slices (two, if the region crosses the longitude boundary
+        of a global grid) and the corresponding latitudes and longitudes.
+        The longitudes are shifted to be increasing across the slices.
+        """
+        full = slice(None), [slice(None)], self.lat_data, self.lon_data
+        if self.crs is None or len(self.lat_data) < 2 or len(self.lon_data) < 2:
+            return full
+        extent = self.plot_object.get_lonlat_extent(self.bbox, self.crs)
+        if extent is None:
+            return full
+        lon_min, lon_max, lat_min, lat_max = extent
+
+        num_lats = len(self.lat_data)
+        lat_start = max(0, self.lat_data.searchsorted(lat_min) - 1 - halo)
+        lat_stop = min(num_lats, self.lat_data.searchsorted(lat_max, side="right") + 1 + halo)
+        if lat_stop <= lat_start:
+            return full
+        if self.lat_order == 1:
+            lat_slice = slice(lat_start, lat_stop)
+        else:
+            lat_slice = slice(num_lats - lat_stop, num_lats - lat_start)
+        lat_data = self.lat_data[lat_start:lat_stop]
+
+        dlon = np.median(np.abs(np.diff(self.lon_data)))
+        lon_start = lon_min - (halo + 1) * dlon
+        lon_width = lon_max - lon_min + 2 * (halo + 1) * dlon
+        if lon_width >= 360:
+            return lat_slice, [slice(None)], lat_data, self.lon_data
+        offsets = (self.lon_data - lon_start) % 360
+        indices = np.nonzero(offsets <= lon_width)[0]
+        if len(indices) == 0:
+            return full
+        runs = np.split(indices, np.nonzero(np.diff(indices) != 1)[0] + 1)
+        runs.sort(key=lambda run: offsets[run[0]])
+        lon_data = lon_start + offsets[np.concatenate(runs)]
+        if len(runs) > 2 or (np.diff(lon_data) <= 0).any():
+            return lat_slice, [slice(None)], lat_data, self.lon_data
+        return lat_slice, [slice(run[0], run[-1] + 1) for run in runs], lat_data, lon_data
+
     def _load_timestep(self):
         """
         Load the data fields as required by the horizontal section style
         instance at the current timestep.
+
+        Only the part of the fields visible in the requested map is read.
+        Returns the data fields and their latitudes and longitudes.
         """
         if self.dataset is None:
-            return {}
+            return {}, self.lat_data, self.lon_data
         data = {}
         timestep = self.times.searchsorted(self.fc_time)
         level = None
@@ -634,20 +908,24 @@ class HorizontalSectionDriver(MSSPlotDriver):
             self.actual_level = self.vert_data[level]
         logging.debug("loading data for time step %s (%s), level index %s (level %s)",
                       timestep, self.fc_time, level, self.actual_level)
+        lat_slice, lon_slices, lat_data, lon_data = self._get_hyperslab()
+        logging.debug("loading %sx%s of %sx%s grid points", len(lat_data), len(lon_data),
+                      len(self.lat_data), len(self.lon_data))
         for name, var in self.data_vars.items():
             if level is None or len(var.shape) == 3:
                 # 2D fields: time, lat, lon.
-                var_data = var[timestep, ::self.lat_order, :]
+                var_data = [var[timestep, lat_slice, lon_slice] for lon_slice in lon_slices]
             else:
                 # 3D fields: time, level, lat, lon.
-                var_data = var[timestep, level, ::self.lat_order, :]
+                var_data = [var[timestep, level, lat_slice, lon_slice] for lon_slice in lon_slices]
+            var_data = (var_data[0] if len(var_data) == 1 else np.ma.concatenate(var_data, axis=-1))[::self.lat_order]
             logging.debug("\tLoaded %.2f Mbytes from data field <%s>.",
                           var_data.nbytes / 1048576., name)
             data[name] = var_data
             # Free memory.
             del var_data
 
-        return data
+        return data, lat_data, lon_data
 
     def plot(self):
         """
@@ -658,7 +936,7 @@ class HorizontalSectionDriver(MSSPlotDriver):
         # section style instance. <data> is a dictionary containing the
         # horizontal sections of the variables identified through CF
         # standard names as specified by <self.hsec_style_instance>.
-        data = self._load_timestep()
+        data, lat_data, lon_data = self._load_timestep()
 
         d2 = datetime.now()
         logging.debug("Loaded data (required time %s).", (d2 - d1))
@@ -669,13 +947,13 @@ class HorizontalSectionDriver(MSSPlotDriver):
         else:
             resolution = 0
 
-        if self.mime_type != "image/png":
+        if self.mime_type not in ("image/png", RGBA_MIME_TYPE):
             raise RuntimeError(f"Unexpected format for horizontal sections '{self.mime_type}'.")
 
         # Call the plotting method of the horizontal section style instance.
         image = self.plot_object.plot_hsection(data,
-                                               self.lat_data,
-                                               self.lon_data,
+                                               lat_data,
+                                               lon_data,
                                                self.bbox,
                                                level=self.actual_level,
                                                valid_time=self.fc_time,
@@ -686,7 +964,8 @@ class HorizontalSectionDriver(MSSPlotDriver):
                                                style=self.style,
                                                noframe=self.noframe,
                                                figsize=self.figsize,
-                                               transparent=self.transparent)
+                                               transparent=self.transparent,
+                                               mime_type=self.mime_type)
         # Free memory.
         del data
 
@@ -743,13 +1022,13 @@ class LinearSectionDriver(VerticalSectionDriver):
         """
         logging.debug("computing %i interpolation points, connection: %s",
                       lsec_numpoints, lsec_path_connection)
-        self.lats, self.lons, self.alts = coordinate.path_points(
-            [_x[0] for _x in lsec_path],
-            [_x[1] for _x in lsec_path],
-            alts=[_x[2] for _x in lsec_path],
-            numpoints=lsec_numpoints, connection=lsec_path_connection)
-        self.lats, self.lons, self.alts = [
-            np.asarray(_x) for _x in (self.lats, self.lons, self.alts)]
+        self.lats, self.lons, self.alts = self.path_cache.get(
+            ("path", tuple(tuple(_x[:3]) for _x in lsec_path), lsec_numpoints, lsec_path_connection),
+            lambda: [np.asarray(_x) for _x in coordinate.path_points(
+                [_x[0] for _x in lsec_path],
+                [_x[1] for _x in lsec_path],
+                alts=[_x[2] for _x in lsec_path],
+                numpoints=lsec_numpoints, connection=lsec_path_connection)])
         self.lsec_path = lsec_path
         self.lsec_numpoints = lsec_numpoints
         self.lsec_path_connection = lsec_path_connection
@@ -775,28 +1054,8 @@ class LinearSectionDriver(VerticalSectionDriver):
         timestep = self.times.searchsorted(self.fc_time)
         logging.debug("loading data for time step %s (%s)", timestep, self.fc_time)
 
-        # Determine the westmost longitude in the cross-section path. Subtract
-        # one gridbox size to obtain "left_longitude".
-        dlon = self.lon_data[1] - self.lon_data[0]
-        left_longitude = np.unwrap(self.lons, period=360).min() - dlon
-        logging.debug("shifting data grid to gridpoint west of westmost "
-                      "longitude in path: %.2f (path %.2f).",
-                      left_longitude, self.lons.min())
-
-        # Shift the longitude field such that the data is in the range
-        # left_longitude .. left_longitude+360.
-        # NOTE: This does not overwrite self.lon_data (which is required
-        # in its original form in case other data is loaded while this
-        # file is open).
-        lon_data = ((self.lon_data - left_longitude) % 360) + left_longitude
-        lon_indices = lon_data.argsort()
-        lon_data = lon_data[lon_indices]
-        # Identify jump in longitudes due to non-global dataset
-        dlon_data = np.diff(lon_data)
-        jump = np.where(dlon_data > 2 * dlon)[0]
-
-        lons = ((self.lons - left_longitude) % 360) + left_longitude
-        factors = []
+        lats, lons, weights, windows = self._get_path_windows()
+        factors = None
 
         pressures = None
         if "air_pressure" not in self.data_vars:
@@ -817,58 +1076,53 @@ class LinearSectionDriver(VerticalSectionDriver):
 
         for name in variables:
             var = self.data_vars[name]
-            data[name] = []
-            if len(var.shape) == 4:
-                var_data = var[:][timestep, ::-self.vert_order, ::self.lat_order, :]
-            else:
-                var_data = var[:][timestep, np.newaxis, ::self.lat_order, :]
+            var_data = self._load_path_windows(var, timestep, windows)
             logging.debug("\tLoaded %.2f Mbytes from data field <%s> at timestep %s.",
                           var_data.nbytes / 1048576., name, timestep)
             logging.debug("\tVertical dimension direction is %s.",
                           "up" if self.vert_order == 1 else "down")
             logging.debug("\tInterpolating to cross-section path.")
-            # Re-arange longitude dimension in the data field.
-            var_data = var_data[:, :, lon_indices]
-            if jump:
-                logging.debug("\tsetting jump data to NaN at %s", jump)
-                var_data = var_data.copy()
-                var_data[:, :, jump] = np.nan
-
-            cross_section = coordinate.interpolate_vertsec(var_data, self.lat_data, lon_data, self.lats, lons)
+            cross_section = np.ma.filled(coordinate.interpolate_vertsec(
+                var_data, lats, lons, self.lats, self.lons, weights=weights), np.nan)
             # Create vertical interpolation factors and indices for subsequent variables
-            # TODO: Improve performance for this interpolation in general
-            if len(factors) == 0:
+            if factors is None:
                 if name == "air_pressure":
                     pressures = np.log(convert_to(cross_section, self.data_units[name], "Pa"))
-                for index_lonlat, alt in enumerate(np.log(self.alts)):
-                    pressure = pressures[:, index_lonlat]
-                    idx0 = None
-                    for index_altitude in range(len(pressures) - 1):
-                        if (pressure[index_altitude] <= alt <= pressure[index_altitude + 1]) or \
-                           (pressure[index_altitude] >= alt >= pressure[index_altitude + 1]):
-                            idx0 = index_altitude
-                            break
-                    if idx0 is None:
-                        factors.append(((0, np.nan), (0, np.nan)))
-                        continue
-
-                    idx1 = idx0 + 1
-                    fac1 = (pressure[idx0] - alt) / (pressure[idx0] - pressure[idx1])
-                    fac0 = 1 - fac1
-                    assert 0 <= fac0 <= 1, fac0
-                    factors.append(((idx0, fac0), (idx1, fac1)))
+                factors = self._get_vertical_interpolation_factors(pressures, np.log(self.alts))
 
             # Interpolate with the previously calculated pressure indices and factors
-            for index, ((idx0, w0), (idx1, w1)) in enumerate(factors):
-                value = cross_section[idx0, index] * w0 + cross_section[idx1, index] * w1
-                data[name].append(value)
+            (idx0, w0), (idx1, w1) = factors
+            data[name] = (np.take_along_axis(cross_section, idx0[np.newaxis], axis=0)[0] * w0 +
+                          np.take_along_axis(cross_section, idx1[np.newaxis], axis=0)[0] * w1)
 
             # Free memory.
             del var_data
-            data[name] = np.array(data[name])
 
         return data
 
+    @staticmethod
+    def _get_vertical_interpolation_factors(pressures, alts):
+        """
+        Determines for each column of <pressures> the first pair of adjacent
+        levels that brackets the corresponding value of <alts> and the
+        weights for linearly interpolating between them.
+
+        Returns ((idx0, fac0), (idx1, fac1)) with one entry per column. The
+        weights are NaN for columns not containing their altitude.
+        """
+        lower, upper = pressures[:-1], pressures[1:]
+        with np.errstate(invalid="ignore"):
+            brackets = ((lower <= alts) & (alts <= upper)) | ((lower >= alts) & (alts >= upper))
+        found = brackets.any(axis=0)
+        idx0 = np.where(found, brackets.argmax(axis=0), 0)
+        idx1 = np.where(found, idx0 + 1, 0)
+        pressure0 = np.take_along_axis(pressures, idx0[np.newaxis], axis=0)[0]
+        pressure1 = np.take_along_axis(pressures, idx1[np.newaxis], axis=0)[0]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            fac1 = np.where(found, (pressure0 - alts) / (pressure0 - pressure1), np.nan)
+        fac0 = 1 - fac1
+        return (idx0, fac0), (idx1, fac1)
+
     def plot(self):
         """
         """
@@ -881,13 +1135,14 @@ class LinearSectionDriver(VerticalSectionDriver):
         data = self._load_interpolate_timestep()
         d2 = datetime.now()
 
-        if self.mime_type != "text/xml":
+        if self.mime_type not in ("text/xml", NETCDF_MIME_TYPE):
             raise RuntimeError(f"Unexpected format for linear sections '{self.mime_type}'.")
 
         # Call the plotting method of the linear section style instance.
         image = self.plot_object.plot_lsection(data, self.lats, self.lons,
                                                valid_time=self.fc_time,
-                                               init_time=self.init_time)
+                                               init_time=self.init_time,
+                                               mime_type=self.mime_type)
         # Free memory.
         del data
 
@@ -896,3 +1151,183 @@ class LinearSectionDriver(VerticalSectionDriver):
                       "time %s).\n", d3 - d2, d3 - d1)
 
         return image
+
+
+class PooledDataset:
+    """
+    An open set of NetCDF files together with its decoded coordinates and
+    the modification times of the files when they were opened.
+    """
+
+    def __init__(self, filenames, dataset_kwargs):
+        self.mtimes = self._get_mtimes(filenames)
+        dataset = netCDF4tools.MFDatasetCommonDims(filenames, **dataset_kwargs)
+        try:
+            _, timevar = netCDF4tools.identify_CF_time(dataset)
+            self.times = netCDF4tools.num2date(timevar[:], timevar.units)
+            self.lat_data, self.lon_data, self.lat_order = netCDF4tools.get_latlon_data(dataset)
+            _, vert_data, self.vert_order, self.vert_units, _ = netCDF4tools.identify_vertical_axis(dataset)
+            self.vert_data = vert_data[:] if vert_data is not None else None
+        except Exception as ex:
+            logging.error("ERROR: %s %s", type(ex), ex)
+            dataset.close()
+            raise
+        self.dataset = dataset
+
+    @staticmethod
+    def _get_mtimes(filenames):
+        return {filename: os.path.getmtime(filename) for filename in filenames}
+
+    def is_modified(self):
+        """
+        Checks whether any of the files was modified or removed since it was opened.
+        """
+        try:
+            return self._get_mtimes(self.mtimes) != self.mtimes
+        except OSError:
+            return True
+
+    def close(self):
+        self.dataset.close()
+
+
+class DatasetPool:
+    """
+    Keeps the most recently used sets of input files of a plot driver open.
+
+    Layers often share their input files, so a request for another layer or
+    another time step of the same files reuses the open dataset and its
+    coordinates instead of reopening and decoding the files. Pooled datasets
+    are reopened as soon as their files were modified after they were opened,
+    or the data access object reports a modification. The modification times
+    are kept per dataset, as the data access object is shared between pools
+    and reports a modification only to its first caller. The least recently
+    used dataset is closed once more than <size> datasets are open.
+
+    A pool belongs to a single plot driver, which serves one request at a
+    time, so the pool needs no locking.
+    """
+
+    def __init__(self, data_access, size=4):
+        self.data_access = data_access
+        self.size = max(1, size)
+        self._datasets = OrderedDict()
+
+    def __len__(self):
+        return len(self._datasets)
+
+    def get(self, filenames):
+        """
+        Returns the PooledDataset of the given files, opening them if required.
+        """
+        key = frozenset(filenames)
+        entry = self._datasets.get(key)
+        if entry is not None:
+            # asked first, so that the data access object updates its file tree
+            reload_required = self.data_access.is_reload_required(filenames)
+            if not reload_required and not entry.is_modified():
+                self._datasets.move_to_end(key)
+                return entry
+            logging.debug("need to re-open input files.")
+            self.discard(filenames)
+
+        logging.debug("opening datasets.")
+        entry = PooledDataset(filenames, self.data_access.mfDatasetArgs())
+        self._datasets[key] = entry
+        while len(self._datasets) > self.size:
+            _, evicted = self._datasets.popitem(last=False)
+            evicted.close()
+        return entry
+
+    def discard(self, filenames):
+        """
+        Closes the dataset of the given files, if open.
+        """
+        entry = self._datasets.pop(frozenset(filenames), None)
+        if entry is not None:
+            entry.close()
+
+    def close(self):
+        """
+        Closes all open datasets.
+        """
+        while self._datasets:
+            _, entry = self._datasets.popitem()
+            entry.close()
+
+
+class PlotDriverPool:
+    """
+    Hands out the plot drivers of one dataset to concurrent requests.
+
+    A plot driver keeps the state of the plot it currently produces (plot
+    object, open files, section path, ...) and can thus serve only one
+    request at a time. The pool creates further drivers of the same type on
+    the same data access object on demand, up to <size> drivers. Idle drivers
+    are kept for reuse, such that a driver can keep its files open across
+    requests.
+
+    Layers are bound to a driver (see Abstract2DSectionStyle.set_driver()),
+    so the pool keeps a copy of each requested layer for every driver.
+    """
+
+    def __init__(self, driver, size=None):
+        """
+        Takes the driver the layers of the dataset have been registered with
+        and the maximum number of drivers (defaults to the number of CPUs).
+        """
+        self.driver_class = type(driver)
+        self.data_access = driver.data_access
+        self.dataset_pool_size = driver.dataset_pool.size
+        self.size = max(1, size if size is not None else (os.cpu_count() or 1))
+        self._idle = [driver]
+        self._layers = {driver: {}}
+        self._condition = threading.Condition()
+
+    def __len__(self):
+        """
+        Returns the number of drivers created so far.
+        """
+        return len(self._layers)
+
+    def _acquire(self):
+        with self._condition:
+            while not self._idle and len(self._layers) >= self.size:
+                self._condition.wait()
+            if self._idle:
+                return self._idle.pop()
+            logging.debug("creating additional %s (%s in use)", self.driver_class.__name__, len(self._layers))
+            driver = self.driver_class(self.data_access, self.dataset_pool_size)
+            self._layers[driver] = {}
+            return driver
+
+    def _release(self, driver):
+        with self._condition:
+            self._idle.append(driver)
+            self._condition.notify()
+
+    def _bind_layer(self, driver, layer):
+        if layer.driver is driver:
+            return layer
+        layers = self._layers[driver]
+        if layer not in layers:
+            bound_layer = copy.copy(layer)
+            bound_layer.set_driver(driver)
+            layers[layer] = bound_layer
+        return layers[layer]
+
+    @contextmanager
+    def checkout(self, layer):
+        """
+        Context manager providing an idle driver together with the instance
+        of <layer> bound to it. Blocks while all <size> drivers are busy.
+
+        with pool.checkout(layer) as (driver, plot_object):
+            driver.set_plot_parameters(plot_object, ...)
+            image = driver.plot()
+        """
+        driver = self._acquire()
+        try:
+            yield driver, self._bind_layer(driver, layer)
+        finally:
+            self._release(driver)
@@ -25,7 +25,20 @@
     limitations under the License.
 """
 
+import datetime
+import io
+
 import matplotlib
+import netCDF4
+import numpy as np
+import PIL.Image
+
+
+# Internal format for plots that are composited before being returned
+RGBA_MIME_TYPE = "image/x-rgba"
+
+# Binary format for the data of vertical and linear sections
+NETCDF_MIME_TYPE = "application/x-netcdf"
 
 
 def make_cbar_labels_readable(fig, axs):
@@ -37,3 +50,109 @@ def make_cbar_labels_readable(fig, axs):
     for x in axs.yaxis.majorTicks:
         x.label1.set_path_effects([matplotlib.patheffects.withStroke(linewidth=4, foreground='w')])
         x.label1.set_fontsize(fontsize)
+
+
+def get_rgba_image(canvas):
+    """
+    Renders the figure of a matplotlib canvas and returns it as RGBA image
+    without encoding it.
+    """
+    canvas.draw()
+    return PIL.Image.fromarray(np.array(canvas.buffer_rgba()))
+
+
+def get_netcdf_section(title, valid_time, init_time, lats, lons, data, data_units):
+    """
+    Writes the data of a vertical or linear section into an in-memory NetCDF
+    file and returns its content.
+
+    <data> maps variable names to either curtains (levels x waypoints) or
+    values along the path (waypoints). Curtains of a single level, as surface
+    fields are returned by the vertical section driver, are stored as values
+    along the path. Curtains with another number of levels than the first one
+    get a dimension "level_<number of levels>" of their own. The values are
+    stored as float32 in the classic format, i.e. a small header followed by
+    the raw arrays, which is much more compact and faster to produce and parse
+    than the XML format.
+    """
+    ncfile = netCDF4.Dataset("section.nc", "w", format="NETCDF3_64BIT_OFFSET", memory=1024)
+    ncfile.title = title
+    if valid_time is not None:
+        ncfile.valid_time = valid_time.strftime("%Y-%m-%dT%H:%M:%SZ")
+    if init_time is not None:
+        ncfile.init_time = init_time.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    ncfile.createDimension("waypoint", len(lats))
+    for name, values, standard_name, unit in [("lat", lats, "latitude", "degrees_north"),
+                                              ("lon", lons, "longitude", "degrees_east")]:
+        var = ncfile.createVariable(name, "f8", ("waypoint",))
+        var.standard_name = standard_name
+        var.units = unit
+        var[:] = values
+
+    for name, values in data.items():
+        values = np.ma.filled(np.ma.asarray(getattr(values, "magnitude", values)).astype(np.float32), np.nan)
+        if values.ndim == 2 and values.shape[0] == 1:
+            values = values[0]
+        dimensions = ("waypoint",)
+        if values.ndim == 2:
+            num_levels = values.shape[0]
+            level = next((_x for _x, _dim in ncfile.dimensions.items()
+                          if _x.startswith("level") and len(_dim) == num_levels), None)
+            if level is None:
+                level = "level" if "level" not in ncfile.dimensions else f"level_{num_levels}"
+                ncfile.createDimension(level, num_levels)
+            dimensions = (level, "waypoint")
+        var = ncfile.createVariable(name, "f4", dimensions)
+        if data_units.get(name) is not None:
+            var.units = data_units[name]
+        var[:] = values
+    return bytes(ncfile.close())
+
+
+def stack_netcdf_sections(sections):
+    """
+    Combines the NetCDF files of a section at several valid times, as returned
+    by get_netcdf_section(), into one file with an additional time dimension.
+    """
+    inputs = [netCDF4.Dataset("section.nc", memory=section) for section in sections]
+    try:
+        first = inputs[0]
+        ncfile = netCDF4.Dataset("sections.nc", "w", format="NETCDF3_64BIT_OFFSET", memory=1024)
+        ncfile.title = first.title
+        if "init_time" in first.ncattrs():
+            ncfile.init_time = first.init_time
+        valid_times = [datetime.datetime.strptime(_x.valid_time, "%Y-%m-%dT%H:%M:%SZ") for _x in inputs]
+
+        ncfile.createDimension("time", len(inputs))
+        for name, dimension in first.dimensions.items():
+            ncfile.createDimension(name, len(dimension))
+        time = ncfile.createVariable("time", "f8", ("time",))
+        time.standard_name = "time"
+        time.units = f"hours since {valid_times[0].strftime('%Y-%m-%dT%H:%M:%SZ')}"
+        time[:] = netCDF4.date2num(valid_times, time.units)
+
+        for name, variable in first.variables.items():
+            if name in ("lat", "lon"):
+                var = ncfile.createVariable(name, variable.dtype, variable.dimensions)
+                var[:] = variable[:]
+            else:
+                var = ncfile.createVariable(name, variable.dtype, ("time",) + variable.dimensions)
+                var[:] = np.stack([np.ma.filled(_x[name][:], np.nan) for _x in inputs])
+            var.setncatts({_x: variable.getncattr(_x) for _x in variable.ncattrs()})
+        return bytes(ncfile.close())
+    finally:
+        for section in inputs:
+            section.close()
+
+
+def get_animated_png(images, duration=1000):
+    """
+    Combines PNG images into an animated PNG showing each image for
+    <duration> milliseconds. Viewers without animation support display the
+    first image.
+    """
+    frames = [PIL.Image.open(io.BytesIO(image)).convert("RGBA") for image in images]
+    output = io.BytesIO()
+    frames[0].save(output, format="PNG", save_all=True, append_images=frames[1:], duration=duration, loop=0)
+    return output.getvalue()
@@ -41,6 +41,7 @@
     limitations under the License.
 """
 
+import collections
 import glob
 import os
 import io
@@ -48,9 +49,11 @@ import inspect
 import logging
 import shutil
 import tempfile
+import threading
 import traceback
 import werkzeug
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 
 from xml.etree import ElementTree
 from chameleon import PageTemplateLoader
@@ -62,8 +65,9 @@ from flask_httpauth import HTTPBasicAuth
 from multidict import CIMultiDict
 from mslib.utils import conditional_decorator
 from mslib.utils.get_content import get_content
-from mslib.utils.time import parse_iso_datetime
+from mslib.utils.time import parse_iso_datetime, parse_iso_time_list
 from mslib.index import create_app
+from mslib.mswms.utils import RGBA_MIME_TYPE, NETCDF_MIME_TYPE
 from mslib.mswms.gallery_builder import add_image, write_html, add_levels, add_times, \
     write_doc_index, write_code_pages, STATIC_LOCATION, DOCS_LOCATION
 
@@ -96,6 +100,14 @@ class default_mswms_settings:
     gdpr = ""
     data = {}
     enable_basic_http_authentication = False
+    # maximum number of plots rendered concurrently per dataset and section type, None uses the number of CPUs
+    plot_driver_pool_size = None
+    # number of sets of input files each plot driver keeps open for reuse across layers and requests
+    dataset_pool_size = 4
+    # maximum total size in bytes of rendered responses kept for identical requests, 0 disables the cache
+    response_cache_size = 0
+    # maximum number of valid times of a vertical section requested with a TIME list or range
+    max_section_times = 24
     __file__ = None
 
 
@@ -155,16 +167,19 @@ templates = PageTemplateLoader(mswms_settings.xml_template_location)
 
 
 def squash_multiple_images(imgs):
-    with Image.open(io.BytesIO(imgs[0])) as background:
-        background = background.convert("RGBA")
-        if len(imgs) > 1:
-            for img in imgs[1:]:
-                with Image.open(io.BytesIO(img)) as foreground:
-                    background.paste(foreground, (0, 0), foreground.convert("RGBA"))
+    """
+    Composites the RGBA images <imgs> on top of each other and returns the result as PNG.
+    """
+    background = imgs[0]
+    for img in imgs[1:]:
+        background = Image.alpha_composite(background, img)
 
-        output = io.BytesIO()
-        background.save(output, format="PNG")
-        return output.getvalue()
+    # Opaque images are stored with an adaptive palette, as the single layer plots are.
+    if background.getextrema()[3] == (255, 255):
+        background = background.convert(mode="RGB").convert("P", palette=Image.Palette.ADAPTIVE)
+    output = io.BytesIO()
+    background.save(output, format="PNG")
+    return output.getvalue()
 
 
 def squash_multiple_xml(xml_strings):
@@ -175,6 +190,91 @@ def squash_multiple_xml(xml_strings):
     return ElementTree.tostring(base)
 
 
+class ResponseCache:
+    """
+    Keeps rendered GetMap/GetVSec/GetLSec responses for repeated identical
+    requests. The cache is bounded by the total size of the responses in
+    bytes and evicts the least recently used ones first.
+
+    Each response is stored together with a validator (the update sequences
+    of the data access objects) and the modification times of the data files
+    it was rendered from. An entry is dropped as soon as either changed.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(query, mode):
+        """
+        Normalises a request to be independent of parameter order and case
+        of the parameter names.
+        """
+        return mode.lower(), tuple(sorted((key.upper(), value.strip()) for key, value in query.items()))
+
+    @staticmethod
+    def _get_mtimes(filenames):
+        try:
+            return {filename: os.path.getmtime(filename) for filename in filenames}
+        except OSError:
+            return None
+
+    def get(self, key, validator):
+        """
+        Returns the cached response for <key> or None, if there is none or it is outdated.
+        """
+        if self.size <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            response, entry_validator, mtimes = entry
+            if entry_validator == validator and self._get_mtimes(mtimes) == mtimes:
+                with self._lock:
+                    if key in self._entries:
+                        self._entries.move_to_end(key)
+                    self.hits += 1
+                logging.debug("Serving response from cache (%s hits, %s misses)", self.hits, self.misses)
+                return response
+            logging.debug("Dropping outdated response from cache")
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    self._remove(key)
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, response, validator, filenames):
+        """
+        Stores the <response> rendered from the data files <filenames>.
+        """
+        nbytes = len(response[0])
+        if nbytes > self.size:
+            return
+        mtimes = self._get_mtimes(filenames)
+        if mtimes is None:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (response, validator, mtimes)
+            self._nbytes += nbytes
+            while self._nbytes > self.size:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        response, _, _ = self._entries.pop(key)
+        self._nbytes -= len(response[0])
+
+
 class WMSServer:
 
     def __init__(self):
@@ -189,17 +289,28 @@ class WMSServer:
         self.hsec_drivers = {}
         for key in data_access_dict:
             self.hsec_drivers[key] = mss_plot_driver.HorizontalSectionDriver(
-                data_access_dict[key])
+                data_access_dict[key], mswms_settings.dataset_pool_size)
 
         self.vsec_drivers = {}
         for key in data_access_dict:
             self.vsec_drivers[key] = mss_plot_driver.VerticalSectionDriver(
-                data_access_dict[key])
+                data_access_dict[key], mswms_settings.dataset_pool_size)
 
         self.lsec_drivers = {}
         for key in data_access_dict:
             self.lsec_drivers[key] = mss_plot_driver.LinearSectionDriver(
-                data_access_dict[key])
+                data_access_dict[key], mswms_settings.dataset_pool_size)
+
+        # Concurrent requests are served by further drivers on the same data
+        # access objects, as a driver can only produce one plot at a time.
+        self.hsec_driver_pools, self.vsec_driver_pools, self.lsec_driver_pools = [
+            {key: mss_plot_driver.PlotDriverPool(drivers[key], mswms_settings.plot_driver_pool_size)
+             for key in drivers}
+            for drivers in (self.hsec_drivers, self.vsec_drivers, self.lsec_drivers)]
+
+        self.response_cache = ResponseCache(mswms_settings.response_cache_size)
+        # Renders the further layers of multi-layer requests.
+        self.layer_executor = ThreadPoolExecutor(max_workers=mswms_settings.plot_driver_pool_size)
 
         self.hsec_layer_registry = {}
         for layer, datasets in mswms_settings.register_horizontal_layers:
@@ -565,18 +676,21 @@ class WMSServer:
         data_access_dict = mswms_settings.data
 
         for key in data_access_dict:
-            data_access_dict[key].setup()
+            data_access_dict[key].update()
+        # Each data access object derives its update sequence from the modification times of its data.
+        update_sequence = max((data_access.get_update_sequence() for data_access in data_access_dict.values()),
+                              default=0)
 
         version = query.get("VERSION", "1.1.1")
 
         # Handle update sequence exceptions
         sequence = query.get("UPDATESEQUENCE")
-        if sequence and int(sequence) == 0:
+        if sequence and int(sequence) == update_sequence:
             return self.create_service_exception(
                 code="CurrentUpdateSequence",
                 text="Requested update sequence is the current",
                 version=version)
-        elif sequence and int(sequence) > 0:
+        elif sequence and int(sequence) > update_sequence:
             return self.create_service_exception(
                 code="InvalidUpdateSequence",
                 text="Requested update sequence is higher than current",
@@ -623,6 +737,7 @@ class WMSServer:
 
         return_data = template(hsec_layers=hsec_layers, vsec_layers=vsec_layers, lsec_layers=lsec_layers,
                                server_url=server_url,
+                               update_sequence=update_sequence,
                                service_name=mswms_settings.service_name,
                                service_title=mswms_settings.service_title,
                                service_abstract=mswms_settings.service_abstract,
@@ -640,6 +755,16 @@ class WMSServer:
                                service_access_constraints=mswms_settings.service_access_constraints)
         return return_data.encode("utf-8"), "text/xml"
 
+    @staticmethod
+    def _plot(job, mime_type):
+        """
+        Produces the plot of a layer with a driver of the pool given in <job>.
+        """
+        pool, layer, parameters, _ = job
+        with pool.checkout(layer) as (plot_driver, plot_object):
+            plot_driver.set_plot_parameters(plot_object=plot_object, mime_type=mime_type, **parameters)
+            return plot_driver.plot(), plot_driver.filenames
+
     def produce_plot(self, query, mode):
         """
         Handler for a GetMap and GetVSec requests. Produces a plot with
@@ -653,6 +778,14 @@ class WMSServer:
 
         version = query.get("VERSION", "1.1.1")
 
+        # Identical requests are answered from the cache as long as the data is unchanged.
+        cache_key = ResponseCache.make_key(query, mode)
+        cache_validator = tuple(data_access.get_update_sequence() for data_access in mswms_settings.data.values())
+        response = self.response_cache.get(cache_key, cache_validator)
+        if response is not None:
+            return response
+        filenames = set()
+
         # Image size.
         width = query.get('WIDTH', 900)
         height = query.get('HEIGHT', 600)
@@ -661,7 +794,7 @@ class WMSServer:
 
         # Requested layers.
         layers = [layer for layer in query.get('LAYERS', '').strip().split(',') if layer]
-        images = []
+        jobs = []
         for index, layer in enumerate(layers):
             if layer.find(".") > 0:
                 dataset, layer = layer.split(".")
@@ -687,23 +820,26 @@ class WMSServer:
             logging.debug("  requested initialisation time = '%s'", init_time)
 
             # Forecast valid time.
-            valid_time = query.get('TIME')
+            # Vertical sections may be requested for a list or range of times.
+            valid_time, valid_times = query.get('TIME'), None
             if valid_time is not None:
                 try:
-                    valid_time = parse_iso_datetime(valid_time)
+                    valid_times = parse_iso_time_list(valid_time, mswms_settings.max_section_times)
                 except ValueError:
                     return self.create_service_exception(
                         code="InvalidDimensionValue",
-                        text="TIME has wrong format (needs to be 2005-08-29T13:00:00Z)",
+                        text="TIME has wrong format (needs to be 2005-08-29T13:00:00Z, a comma-separated list "
+                             "or start/end/period with at most "
+                             f"{mswms_settings.max_section_times} times)",
                         version=version)
-            logging.debug("  requested (valid) time = '%s'", valid_time)
+                valid_time = valid_times[0]
+            logging.debug("  requested (valid) time = '%s'", valid_times)
 
             # Coordinate reference system.
             crs = query.get("CRS" if version == "1.3.0" else "SRS", 'EPSG:4326').lower()
             is_yx = version == "1.3.0" and crs.startswith("epsg") and int(crs[5:]) in axisorder_yx
 
             # Allow to request vertical sections via GetMap, if the specified CRS is of type "VERT:??".
-            msg = None
             if crs.startswith('vert:logp'):
                 mode = "getvsec"
             elif crs.startswith("line:1"):
@@ -730,11 +866,23 @@ class WMSServer:
             # Return format (image/png, text/xml, etc.).
             mime_type = query.get('FORMAT', 'image/png').lower()
             logging.debug("  requested return format = '%s'", mime_type)
-            if mime_type not in ["image/png", "text/xml"]:
+            if mime_type not in ["image/png", "text/xml", NETCDF_MIME_TYPE]:
                 return self.create_service_exception(
                     code="InvalidFORMAT",
                     text=f"unsupported FORMAT: '{mime_type}'",
                     version=version)
+            if mime_type == NETCDF_MIME_TYPE and (mode == "getmap" or len(layers) > 1):
+                return self.create_service_exception(
+                    code="InvalidFORMAT",
+                    text=f"FORMAT '{mime_type}' is only supported for single vertical or linear section layers",
+                    version=version)
+            if valid_times is not None and len(valid_times) > 1 and (
+                    mode != "getvsec" or len(layers) > 1 or mime_type not in ["image/png", NETCDF_MIME_TYPE]):
+                return self.create_service_exception(
+                    code="InvalidDimensionValue",
+                    text="Several TIME values are only supported for single vertical section layers "
+                         f"in the formats image/png and {NETCDF_MIME_TYPE}",
+                    version=version)
 
             # 3) Check GetMap/GetVSec-specific parameters and produce
             #    the image with the corresponding section driver.
@@ -792,20 +940,12 @@ class WMSServer:
                         text=f"ELEVATION argument not applicable for layer '{layer}'. Please omit this argument.",
                         version=version)
 
-                plot_driver = self.hsec_drivers[dataset]
-                try:
-                    plot_driver.set_plot_parameters(self.hsec_layer_registry[dataset][layer], bbox=bbox, level=level,
-                                                    crs=crs, init_time=init_time, valid_time=valid_time, style=style,
-                                                    figsize=figsize, noframe=noframe, transparent=transparent,
-                                                    mime_type=mime_type)
-                    images.append(plot_driver.plot())
-                except (IOError, ValueError) as ex:
-                    logging.error("ERROR: %s %s", type(ex), ex)
-                    logging.debug("%s", traceback.format_exc())
-                    msg = "The data corresponding to your request is not available. Please check the " \
-                          "times and/or levels you have specified.\n\n" \
-                          f"Error message: '{ex}'"
-                    return self.create_service_exception(text=msg, version=version)
+                jobs.append((self.hsec_driver_pools[dataset], self.hsec_layer_registry[dataset][layer],
+                             dict(bbox=bbox, level=level, crs=crs, init_time=init_time, valid_time=valid_time,
+                                  style=style, figsize=figsize, noframe=noframe, transparent=transparent),
+                             "The data corresponding to your request is not available. Please check the "
+                             "times and/or levels you have specified.\n\n"
+                             "Error message: '{}'"))
 
             elif mode == "getvsec":
                 # Vertical section path.
@@ -846,33 +986,27 @@ class WMSServer:
 
                 draw_verticals = query.get("DRAWVERTICALS", "false").lower() == "true"
 
-                plot_driver = self.vsec_drivers[dataset]
-                try:
-                    plot_driver.set_plot_parameters(plot_object=self.vsec_layer_registry[dataset][layer],
-                                                    vsec_path=path,
-                                                    vsec_numpoints=bbox[0],
-                                                    vsec_path_connection="greatcircle",
-                                                    vsec_numlabels=bbox[2],
-                                                    init_time=init_time,
-                                                    valid_time=valid_time,
-                                                    style=style,
-                                                    bbox=bbox,
-                                                    figsize=figsize,
-                                                    noframe=noframe,
-                                                    draw_verticals=draw_verticals,
-                                                    transparent=transparent,
-                                                    mime_type=mime_type)
-                    images.append(plot_driver.plot())
-                except (IOError, ValueError) as ex:
-                    logging.error("ERROR: %s %s", type(ex), ex)
-                    msg = "The data corresponding to your request is not available. Please check the " \
-                          "times and/or path you have specified.\n\n" \
-                          f"Error message: {ex}.\n" \
-                          "Hint: Check used waypoints."
-                    return self.create_service_exception(text=msg, version=version)
+                jobs.append((self.vsec_driver_pools[dataset], self.vsec_layer_registry[dataset][layer],
+                             dict(vsec_path=path,
+                                  vsec_numpoints=bbox[0],
+                                  vsec_path_connection="greatcircle",
+                                  vsec_numlabels=bbox[2],
+                                  init_time=init_time,
+                                  valid_time=valid_time,
+                                  valid_times=valid_times,
+                                  style=style,
+                                  bbox=bbox,
+                                  figsize=figsize,
+                                  noframe=noframe,
+                                  draw_verticals=draw_verticals,
+                                  transparent=transparent),
+                             "The data corresponding to your request is not available. Please check the "
+                             "times and/or path you have specified.\n\n"
+                             "Error message: {}.\n"
+                             "Hint: Check used waypoints."))
 
             elif mode == "getlsec":
-                if mime_type != "text/xml":
+                if mime_type not in ("text/xml", NETCDF_MIME_TYPE):
                     return self.create_service_exception(
                         code="InvalidFORMAT",
                         text=f"unsupported FORMAT: '{mime_type}'",
@@ -914,36 +1048,53 @@ class WMSServer:
                 except ValueError:
                     return self.create_service_exception(text=f"Invalid BBOX: {query.get('BBOX')}", version=version)
 
-                plot_driver = self.lsec_drivers[dataset]
-                try:
-                    plot_driver.set_plot_parameters(plot_object=self.lsec_layer_registry[dataset][layer],
-                                                    lsec_path=path,
-                                                    lsec_numpoints=bbox,
-                                                    lsec_path_connection="greatcircle",
-                                                    init_time=init_time,
-                                                    valid_time=valid_time,
-                                                    bbox=bbox,
-                                                    mime_type=mime_type)
-                    images.append(plot_driver.plot())
-                except (IOError, ValueError) as ex:
-                    logging.error("ERROR: %s %s", type(ex), ex)
-                    msg = "The data corresponding to your request is not available. Please check the " \
-                          "times and/or path you have specified.\n\n" \
-                          f"Error message: {ex}.\n" \
-                          "Hint: Check used waypoints."
-                    return self.create_service_exception(text=msg, version=version)
-
-        # 4) Return the produced image.
+                jobs.append((self.lsec_driver_pools[dataset], self.lsec_layer_registry[dataset][layer],
+                             dict(lsec_path=path,
+                                  lsec_numpoints=bbox,
+                                  lsec_path_connection="greatcircle",
+                                  init_time=init_time,
+                                  valid_time=valid_time,
+                                  bbox=bbox),
+                             "The data corresponding to your request is not available. Please check the "
+                             "times and/or path you have specified.\n\n"
+                             "Error message: {}.\n"
+                             "Hint: Check used waypoints."))
+
+        # 4) Produce the images. Further layers are rendered concurrently
+        #    and composited without intermediate PNG encoding.
+        # ================================================================
+        plot_mime_type = RGBA_MIME_TYPE if len(jobs) > 1 and mime_type == "image/png" else mime_type
+        futures = [self.layer_executor.submit(self._plot, job, plot_mime_type) for job in jobs[1:]]
+        images = []
+        for index, job in enumerate(jobs):
+            try:
+                if index == 0:
+                    image, plot_filenames = self._plot(job, plot_mime_type)
+                else:
+                    image, plot_filenames = futures[index - 1].result()
+            except (IOError, ValueError) as ex:
+                logging.error("ERROR: %s %s", type(ex), ex)
+                logging.debug("%s", traceback.format_exc())
+                # layers that did not start yet are not rendered in vain
+                for future in futures:
+                    future.cancel()
+                return self.create_service_exception(text=job[3].format(ex), version=version)
+            images.append(image)
+            filenames.update(plot_filenames)
+
+        # 5) Return the produced image.
         # =============================
         if len(layers) > 1:
             if "image" in mime_type:
-                return squash_multiple_images(images), mime_type
+                response = squash_multiple_images(images), mime_type
             elif "xml" in mime_type:
-                return squash_multiple_xml(images), mime_type
+                response = squash_multiple_xml(images), mime_type
             else:
                 raise RuntimeError(f"Unexpected format error: {mime_type}")
         else:
-            return images[0], mime_type
+            response = images[0], mime_type
+        self.response_cache.put(cache_key, response, cache_validator, filenames)
+        return response
 
 
 server = WMSServer()
@@ -37,6 +37,7 @@ import logging
 import time
 
 import defusedxml.ElementTree as etree
+import numpy as np
 from mslib.msui.constants import MSUI_CONFIG_PATH
 
 OSDIR = fs.open_fs(MSUI_CONFIG_PATH).root_path
@@ -126,8 +127,9 @@ def get_airports(force_download=False, url=None):
 
     if os.path.exists(os.path.join(OSDIR, "downloads", "aip", "airports.csv")):
         with open(os.path.join(OSDIR, "downloads", "aip", "airports.csv"), "r", encoding="utf8") as file:
-            _airports_mtime = os.path.getmtime(os.path.join(OSDIR, "downloads", "aip", "airports.csv"))
-            return list(csv.DictReader(file, delimiter=","))
+            Airspace.airports_mtime = os.path.getmtime(os.path.join(OSDIR, "downloads", "aip", "airports.csv"))
+            Airspace.airports = list(csv.DictReader(file, delimiter=","))
+            return Airspace.airports
 
     else:
         return []
@@ -156,26 +158,29 @@ def update_airspace(force_download=False, countries=None):
     if countries is None:
         countries = ["de"]
 
+    available = None
     for country in countries:
         location = os.path.join(OSDIR, "downloads", "aip", f"{country}_asp.xml")
+        file_exists = os.path.exists(location)
+        is_outdated = file_exists and (time.time() - os.path.getmtime(location)) > 60 * 60 * 24 * 30
+        if not (force_download or is_outdated or not file_exists):
+            continue
+
         url = Airspace.data_download_url.format(country)
-        available = get_available_airspaces()
+        if available is None:
+            available = get_available_airspaces()
         try:
             data = [airspace for airspace in available if airspace[0].startswith(country)][0]
         except IndexError:
             logging.info("countries: %s not exists", ' '.join(countries))
             continue
-        file_exists = os.path.exists(location)
-
-        is_outdated = file_exists and (time.time() - os.path.getmtime(location)) > 60 * 60 * 24 * 30
 
-        if (force_download or is_outdated or not file_exists) \
-                and QtWidgets.QMessageBox.question(
-                    None, "Allow download",
-                    f"The selected {country} airspace needs to be downloaded "
-                    f"({humanfriendly.format_size(int(data[-1]))})\nIs now a good time?",
-                    QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No,
-                    QtWidgets.QMessageBox.Yes) \
+        if QtWidgets.QMessageBox.question(
+                None, "Allow download",
+                f"The selected {country} airspace needs to be downloaded "
+                f"({humanfriendly.format_size(int(data[-1]))})\nIs now a good time?",
+                QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No,
+                QtWidgets.QMessageBox.Yes) \
                 == QtWidgets.QMessageBox.Yes:
             download_progress(location, url)
 
@@ -248,11 +253,80 @@ def get_airspaces(countries=None):
                 airspace_data.pop("top_unit")
                 airspace_data.pop("bottom_unit")
 
-                airspace_data["polygon"] = [(float(data.split()[0]), float(data.split()[-1]))
-                                            for data in airspace_data["polygon"].split(",")]
+                airspace_data["polygon"] = [(float(point[0]), float(point[-1])) for point in
+                                            (data.split() for data in airspace_data["polygon"].split(","))]
                 _airspaces.append(airspace_data)
                 _airspaces_mtime[file] = os.path.getmtime(os.path.join(OSDIR, "downloads", "aip", file))
         else:
             QtWidgets.QMessageBox.information(None, "No Airspaces data in file:", f"{file}")
 
+    Airspace.data = _airspaces
+    Airspace.data_mtime = _airspaces_mtime
     return _airspaces
+
+
+class BoundingBoxIndex:
+    """
+    Index of the longitude/latitude bounding boxes of a number of features
+    (points or polygons), telling which of them may intersect a region of
+    the globe without projecting them.
+    """
+
+    def __init__(self, lon_min, lon_max, lat_min, lat_max):
+        self.lon_min, self.lat_min, self.lat_max = [np.asarray(_x, dtype=float) for _x in (lon_min, lat_min, lat_max)]
+        self.lon_width = np.asarray(lon_max, dtype=float) - self.lon_min
+        # boxes spanning more than half of the globe may cross the date line
+        self.lon_width[self.lon_width > 180] = 360
+
+    def query(self, lat_min, lat_max, lon_start, lon_width):
+        """
+        Returns a boolean mask of the features whose bounding box intersects
+        the region between the given latitudes and on the longitude arc of
+        lon_width degrees eastwards from lon_start.
+        """
+        mask = (self.lat_max >= lat_min) & (self.lat_min <= lat_max)
+        if lon_width < 360:
+            mask &= (((self.lon_min - lon_start) % 360 <= lon_width) |
+                     ((lon_start - self.lon_min) % 360 <= self.lon_width))
+        return mask
+
+
+_indices = {}
+
+
+def _get_index(name, features, build):
+    """
+    Returns build(features), cached for as long as the same list is passed,
+    i.e. until get_airports or get_airspaces reload their file.
+    """
+    if name not in _indices or _indices[name][0] is not features:
+        _indices[name] = (features, build(features))
+    return _indices[name][1]
+
+
+def get_airports_index(airports):
+    """
+    Returns longitudes, latitudes and types of the given airports (as returned
+    by get_airports) as arrays, and a BoundingBoxIndex of them.
+    """
+    def build(airports):
+        lons = np.asarray([float(airport["longitude_deg"]) for airport in airports])
+        lats = np.asarray([float(airport["latitude_deg"]) for airport in airports])
+        types = np.asarray([airport["type"] for airport in airports])
+        return lons, lats, types, BoundingBoxIndex(lons, lons, lats, lats)
+    return _get_index("airports", airports, build)
+
+
+def get_airspaces_index(airspaces):
+    """
+    Returns the polygons of the given airspaces (as returned by get_airspaces)
+    as arrays of lon/lat pairs, their bottoms as array, and a BoundingBoxIndex
+    of them.
+    """
+    def build(airspaces):
+        polygons = [np.asarray(airspace["polygon"], dtype=float).reshape(-1, 2) for airspace in airspaces]
+        bottoms = np.asarray([airspace["bottom"] for airspace in airspaces], dtype=float)
+        index = BoundingBoxIndex(*np.asarray(
+            [(*polygon.min(axis=0), *polygon.max(axis=0)) for polygon in polygons]).reshape(-1, 4)[:, [0, 2, 1, 3]].T)
+        return polygons, bottoms, index
+    return _get_index("airspaces", airspaces, build)
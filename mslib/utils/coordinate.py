@@ -31,12 +31,16 @@ import netCDF4 as nc
 import numpy as np
 from pyproj import Geod
 from scipy.interpolate import interp1d
-from scipy.ndimage import map_coordinates
+from scipy.spatial import cKDTree
 
 from mslib.utils.config import config_loader
 
 
 __PR = Geod(ellps='WGS84')
+# smallest radius of curvature of the WGS84 ellipsoid in km (meridional, at the equator), rounded down
+__MIN_RADIUS_OF_CURVATURE = 6300.
+# the locations the index has been built for, their names and the KD-tree
+__LOCATION_INDEX = (None, [], None)
 
 
 def get_distance(lat0, lon0, lat1, lon1):
@@ -54,6 +58,31 @@ def get_distance(lat0, lon0, lat1, lon1):
     return __PR.inv(lon0, lat0, lon1, lat1)[-1] / 1000.
 
 
+def _unit_vectors(lats, lons):
+    """
+    Converts latitudes and longitudes in degree to unit vectors in 3-D space.
+    """
+    lats, lons = np.radians(lats), np.radians(lons)
+    return np.stack([np.cos(lats) * np.cos(lons), np.cos(lats) * np.sin(lons), np.sin(lats)], axis=-1)
+
+
+def _get_location_index(locations):
+    """
+    Returns the names of the given locations and a KD-tree of their unit
+    vectors (or None if there are none). The index is cached and only rebuilt
+    if the locations of the configuration are replaced, e.g. on reloading it.
+    """
+    global __LOCATION_INDEX
+    if __LOCATION_INDEX[0] is not locations:
+        names = list(locations)
+        tree = None
+        if len(names) > 0:
+            lats, lons = np.asarray([locations[name] for name in names], dtype=float).T
+            tree = cKDTree(_unit_vectors(lats, lons))
+        __LOCATION_INDEX = (locations, names, tree)
+    return __LOCATION_INDEX[1:]
+
+
 def find_location(lat, lon, tolerance=5):
     """
     Checks if a location is present at given coordinates
@@ -63,8 +92,15 @@ def find_location(lat, lon, tolerance=5):
     :return: None or lat/lon, name
     """
     locations = config_loader(dataset='locations')
-    distances = sorted([(get_distance(lat, lon, loc_lat, loc_lon), loc)
-                        for loc, (loc_lat, loc_lon) in locations.items()])
+    names, tree = _get_location_index(locations)
+    if tree is None:
+        return None
+    # Only locations within the chord spanning the tolerance on the surface
+    # can be closer than the tolerance; the geodesic distance decides.
+    angle = min(tolerance / __MIN_RADIUS_OF_CURVATURE, np.pi)
+    candidates = tree.query_ball_point(_unit_vectors(lat, lon), 2 * np.sin(angle / 2))
+    distances = sorted([(get_distance(lat, lon, *locations[names[index]]), names[index])
+                        for index in candidates])
     if len(distances) > 0 and distances[0][0] <= tolerance:
         return locations[distances[0][1]], distances[0][1]
     else:
@@ -228,34 +264,67 @@ def get_projection_params(proj):
     return proj_params
 
 
-def interpolate_vertsec(data3D, data3D_lats, data3D_lons, lats, lons):
+def get_interpolation_weights(data3D_lats, data3D_lons, lats, lons):
     """
-    Interpolate curtain[z,pos] (curtain[level,pos]) from data3D[z,y,x]
-    (data3D[level,lat,lon]).
+    Computes the indices and weights for a bilinear interpolation from a
+    field on the lat/lon grid given by data3D_lats, data3D_lons to the
+    points given by lats, lons. The grid can be IRREGULAR, but the
+    coordinates need to be sorted.
 
-    This method is based on scipy.ndimage.map_coordinates().
+    Points outside of the grid are marked as invalid.
 
-    data3D can be on an IRREGULAR lat/lon grid, coordinates given by lats, lons.
-    The lats, lons arrays can have arbitrary order, they do not have to be uniform.
+    Returns indices, weights, valid to be passed to interpolate_vertsec(),
+    such that the weights need to be computed only once for a path.
     """
-    # Create an empty field to accommodate the curtain.
-    curtain = np.zeros([data3D.shape[0], len(lats)])
-
-    # Transform lat/lon values to array index space. This is necessary to use
-    # scipy.ndimage.map_coordinates().
+    # Transform lat/lon values to array index space.
     interp_lat = interp1d(data3D_lats, np.arange(len(data3D_lats)), bounds_error=False)
     ind_lats = interp_lat(lats)
     interp_lon = interp1d(data3D_lons, np.arange(len(data3D_lons)), bounds_error=False)
     ind_lons = interp_lon(lons)
-    ind_coords = np.array([ind_lats, ind_lons])
+    valid = ~(np.isnan(ind_lats) | np.isnan(ind_lons))
+
+    # Each point is interpolated from the grid points at the floor of its
+    # index and the one after (which has zero weight on the last grid point).
+    indices, weights = [], []
+    for ind, size in ((ind_lats, len(data3D_lats)), (ind_lons, len(data3D_lons))):
+        ind = np.where(valid, ind, 0)
+        ind0 = np.floor(ind).astype(int)
+        frac = ind - ind0
+        indices.append((ind0, np.minimum(ind0 + 1, size - 1)))
+        weights.append((1 - frac, frac))
+    return indices, weights, valid
+
+
+def interpolate_vertsec(data3D, data3D_lats, data3D_lons, lats, lons, weights=None):
+    """
+    Interpolate curtain[z,pos] (curtain[level,pos]) from data3D[z,y,x]
+    (data3D[level,lat,lon]).
+
+    The horizontal bilinear interpolation is applied to all levels at once.
+    Missing values of data3D propagate to all points they contribute to, and
+    points outside of the grid are masked.
 
-    # One horizontal interpolation for each model level. The order
-    # parameter controls the degree of the splines used, i.e. order=1
-    # stands for linear interpolation.
-    for ml in range(data3D.shape[0]):
-        curtain[ml, :] = map_coordinates(data3D[ml, :, :].filled(np.nan), ind_coords, order=1)
+    data3D can be on an IRREGULAR lat/lon grid, coordinates given by lats, lons.
+    The lats, lons arrays can have arbitrary order, they do not have to be uniform.
 
-    curtain[:, np.isnan(ind_lats) | np.isnan(ind_lons)] = np.nan
+    weights can be given as returned by get_interpolation_weights() for the
+    same coordinates to interpolate several fields along the same path.
+    """
+    if weights is None:
+        weights = get_interpolation_weights(data3D_lats, data3D_lons, lats, lons)
+    (lat_indices, lon_indices), (lat_weights, lon_weights), valid = weights
+
+    # Gather the four surrounding grid points of each point on all levels.
+    values, mask = np.ma.getdata(data3D), np.ma.getmask(data3D)
+    curtain = np.zeros([data3D.shape[0], len(valid)])
+    for ind_lat, weight_lat in zip(lat_indices, lat_weights):
+        for ind_lon, weight_lon in zip(lon_indices, lon_weights):
+            corner = values[:, ind_lat, ind_lon]
+            if mask is not np.ma.nomask:
+                corner = np.where(mask[:, ind_lat, ind_lon], np.nan, corner)
+            curtain += corner * (weight_lat * weight_lon)
+
+    curtain[:, ~valid] = np.nan
     return np.ma.masked_invalid(curtain)
 
 
@@ -431,6 +431,97 @@ class Worker(QtCore.QThread):
             window.requestUpdate()
 
 
+class _PoolTask(QtCore.QRunnable):
+    """
+    Runs a function of a WorkerPool in one of its threads.
+    """
+
+    def __init__(self, callback, key, generation, function):
+        super().__init__()
+        self.callback = callback
+        self.key = key
+        self.generation = generation
+        self.function = function
+
+    def run(self):
+        try:
+            result, error = self.function(), None
+        except Exception as ex:
+            result, error = None, ex
+        self.callback(self.key, self.generation, result, error)
+
+
+class WorkerPool(QtCore.QObject):
+    """
+    Runs functions in a pool of threads and hands their results back to the GUI thread.
+
+    Every function is submitted under a key, e.g. the object that displays its result.
+    Only the most recently submitted function of a key is of interest: it is started
+    as soon as the previous function of the same key has finished, functions submitted
+    in between are never run, and the results of superseded or cancelled functions
+    are discarded.
+    """
+    finished = QtCore.pyqtSignal(object, object, object, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QtCore.QThreadPool(self)
+        self.generation = 0
+        # key -> (generation, function, on_success, on_failure) of the latest submission
+        self.tasks = {}
+        self.running = set()
+        self.finished.connect(self._finished)
+
+    def submit(self, key, function, on_success, on_failure=None):
+        """
+        Runs function in a thread and calls on_success with its result, or on_failure
+        with the raised exception, in the GUI thread. Supersedes earlier submissions of key.
+        """
+        self.generation += 1
+        self.tasks[key] = (self.generation, function, on_success, on_failure)
+        if key not in self.running:
+            self._start(key)
+
+    def cancel(self, key):
+        """
+        Discards the latest submission of key.
+        """
+        self.tasks.pop(key, None)
+
+    def wait(self):
+        """
+        Blocks until all submitted functions have finished and their results were handed over.
+        """
+        while self.running:
+            self.pool.waitForDone()
+            QtCore.QCoreApplication.sendPostedEvents()
+
+    def _start(self, key):
+        generation, function = self.tasks[key][:2]
+        self.running.add(key)
+        if QtCore.QCoreApplication.instance() is None:
+            # without an application there is no GUI thread to hand the result to
+            _PoolTask(self._finished, key, generation, function).run()
+        else:
+            self.pool.start(_PoolTask(self.finished.emit, key, generation, function))
+
+    @QtCore.pyqtSlot(object, object, object, object)
+    def _finished(self, key, generation, result, error):
+        self.running.discard(key)
+        if key not in self.tasks:
+            return
+        if self.tasks[key][0] != generation:
+            self._start(key)
+            return
+        _, _, on_success, on_failure = self.tasks.pop(key)
+        if error is None:
+            on_success(result)
+        elif on_failure is not None:
+            on_failure(error)
+        else:
+            logging.error("Background computation failed: %s", error)
+
+
 class Updater(QtCore.QObject):
     """
     Checks for a newer versions of MSS and provide functions to install it asynchronously.
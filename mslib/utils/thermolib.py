@@ -137,6 +137,74 @@ _STANDARD_ATMOSPHERE = [
 ]
 _HEIGHT, _TEMPERATURE, _PRESSURE, _TEMPERATURE_GRADIENT = 0, 1, 2, 3
 
+# The same profile as plain arrays in SI units for the unit-free conversions.
+# Both hydrostatic formulas are written as a sum of a term for layers with and
+# one for layers without temperature gradient, whose coefficients are zero for
+# the other kind of layer. The coefficients of the topmost layer are NaN.
+_ISA_HEIGHT, _ISA_TEMPERATURE, _ISA_PRESSURE, _ISA_GRADIENT = [
+    np.array([_x[_i].to_base_units().magnitude for _x in _STANDARD_ATMOSPHERE])
+    for _i in (_HEIGHT, _TEMPERATURE, _PRESSURE, _TEMPERATURE_GRADIENT)]
+_G_RD = (g / Rd).to_base_units().magnitude
+with np.errstate(divide="ignore", invalid="ignore"):
+    _ISOTHERMAL = _ISA_GRADIENT == 0
+    # p = p0 * exp(_P_EXPONENT * log1p(_P_GRADIENT * dz) + _P_ISOTHERMAL * dz)
+    _P_EXPONENT = np.where(_ISOTHERMAL, 0, _G_RD / _ISA_GRADIENT)
+    _P_GRADIENT = -_ISA_GRADIENT / _ISA_TEMPERATURE
+    _P_ISOTHERMAL = np.where(_ISOTHERMAL, -_G_RD / _ISA_TEMPERATURE, 0)
+    # z = z0 - _Z_SCALE * expm1(_Z_EXPONENT * log(p / p0)) + _Z_ISOTHERMAL * log(p / p0)
+    _Z_SCALE = np.where(_ISOTHERMAL, 0, _ISA_TEMPERATURE / _ISA_GRADIENT)
+    _Z_EXPONENT = _ISA_GRADIENT / _G_RD
+    _Z_ISOTHERMAL = np.where(_ISOTHERMAL, -_ISA_TEMPERATURE / _G_RD, 0)
+for _coefficients in (_P_EXPONENT, _P_ISOTHERMAL, _Z_SCALE, _Z_ISOTHERMAL):
+    _coefficients[-1] = np.nan
+
+
+def _isa_layer(values, boundaries):
+    """
+    Returns the index of the standard atmosphere layer of each value, given
+    the increasing boundaries between the layers.
+
+    With only a handful of layers, counting the boundaries below each value
+    is several times faster than a binary search with np.searchsorted.
+    """
+    layer = np.zeros(values.shape, dtype=np.uint8)
+    for boundary in boundaries:
+        layer += values >= boundary
+    return layer
+
+
+def height2pressure(height):
+    """
+    Unit-free version of flightlevel2pressure() for heights in m, returning
+    pressures in Pa. Works on scalars and arrays of any shape.
+    """
+    height = np.asarray(height, dtype=float)
+    layer = _isa_layer(height, _ISA_HEIGHT[1:])
+    dz = height - _ISA_HEIGHT[layer]
+    with np.errstate(invalid="ignore"):
+        p = _ISA_PRESSURE[layer] * np.exp(
+            _P_EXPONENT[layer] * np.log1p(_P_GRADIENT[layer] * dz) + _P_ISOTHERMAL[layer] * dz)
+    if np.isnan(p).any():
+        raise ValueError("flight level to pressure conversion not "
+                         "implemented for z > 71km")
+    return p if p.ndim > 0 else p[()]
+
+
+def pressure2height(pressure):
+    """
+    Unit-free version of pressure2flightlevel() for pressures in Pa,
+    returning heights in m. Works on scalars and arrays of any shape.
+    """
+    pressure = np.asarray(pressure, dtype=float)
+    layer = _isa_layer(-pressure, -_ISA_PRESSURE[1:])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_p = np.log(pressure / _ISA_PRESSURE[layer])
+        z = _ISA_HEIGHT[layer] - _Z_SCALE[layer] * np.expm1(_Z_EXPONENT[layer] * log_p) + _Z_ISOTHERMAL[layer] * log_p
+    if np.isnan(z).any():
+        raise ValueError("flight level to pressure conversion not "
+                         "implemented for z > 71km")
+    return z if z.ndim > 0 else z[()]
+
 
 @preprocess_and_wrap(wrap_like='height')
 @check_units('[length]')
@@ -164,29 +232,10 @@ def flightlevel2pressure(height):
               &\Gamma \neq 0\\
               p_0 \cdot \exp\left(\frac{-g \cdot (Z - Z_0)}{R \cdot T_0}\right) &\text{else}
               \end{cases}
-    """
-    is_array = hasattr(height.magnitude, "__len__")
-    if not is_array:
-        height = [height.magnitude] * height.units
 
-    # Initialize the return array.
-    p = np.full_like(height, np.nan) * units.Pa
-
-    for i, ((z0, t0, p0, gamma), (z1, t1, p1, _)) in enumerate(zip(_STANDARD_ATMOSPHERE[:-1],
-                                                                   _STANDARD_ATMOSPHERE[1:])):
-        indices = (height >= z0) & (height < z1)
-        if i == 0:
-            indices |= height < z0
-        if gamma != 0:
-            p[indices] = p0 * ((t0 - gamma * (height[indices] - z0)) / t0) ** (g / (gamma * Rd))
-        else:
-            p[indices] = p0 * np.exp(-g * (height[indices] - z0) / (Rd * t0))
-
-    if np.isnan(p).any():
-        raise ValueError("flight level to pressure conversion not "
-                         "implemented for z > 71km")
-
-    return p if is_array else p[0]
+    See height2pressure() for a faster version without units.
+    """
+    return height2pressure(height.m_as(units.m)) * units.Pa
 
 
 @preprocess_and_wrap(wrap_like='pressure')
@@ -215,30 +264,10 @@ def pressure2flightlevel(pressure):
               &\Gamma \neq 0\\
               Z_0 - \frac{R \cdot T_0}{g \cdot \log(\frac{p}{p_0})} &\text{else}
               \end{cases}
-    """
-    is_array = hasattr(pressure.magnitude, "__len__")
-    if not is_array:
-        pressure = [pressure.magnitude] * pressure.units
 
-    # Initialize the return array.
-    z = np.full_like(pressure, np.nan) * units.hft
-
-    for i, ((z0, t0, p0, gamma), (z1, t1, p1, _)) in enumerate(zip(_STANDARD_ATMOSPHERE[:-1],
-                                                                   _STANDARD_ATMOSPHERE[1:])):
-        p1 = _STANDARD_ATMOSPHERE[i + 1][_PRESSURE]
-        indices = (pressure > p1) & (pressure <= p0)
-        if i == 0:
-            indices |= (pressure >= p0)
-        if gamma != 0:
-            z[indices] = z0 + 1. / gamma * (t0 - t0 * np.exp(gamma * Rd / g * np.log(pressure[indices] / p0)))
-        else:
-            z[indices] = z0 - (Rd * t0) / g * np.log(pressure[indices] / p0)
-
-    if np.isnan(z).any():
-        raise ValueError("flight level to pressure conversion not "
-                         "implemented for z > 71km")
-
-    return z if is_array else z[0]
+    See pressure2height() for a faster version without units.
+    """
+    return (pressure2height(pressure.m_as(units.Pa)) * units.m).to(units.hft)
 
 
 @preprocess_and_wrap(wrap_like='height')
@@ -49,6 +49,32 @@ def parse_iso_duration(string):
         return datetime.timedelta(weeks=4)
 
 
+def parse_iso_time_list(string, max_length=None):
+    """
+    Parses a WMS time dimension value, i.e. a single time, a comma-separated
+    list of times, or a range "start/end/period" of regularly spaced times.
+
+    Raises a ValueError for malformed values and for more than <max_length>
+    times.
+    """
+    if "/" in string:
+        start, end, period = string.split("/")
+        start, end, period = parse_iso_datetime(start), parse_iso_datetime(end), isodate.parse_duration(period)
+        if not isinstance(period, datetime.timedelta) or period <= datetime.timedelta(0):
+            raise ValueError(f"invalid period '{string}'")
+        times = []
+        while start <= end:
+            if max_length is not None and len(times) >= max_length:
+                raise ValueError(f"more than {max_length} times requested")
+            times.append(start)
+            start += period
+    else:
+        times = [parse_iso_datetime(_x) for _x in string.split(",")]
+    if max_length is not None and len(times) > max_length:
+        raise ValueError(f"more than {max_length} times requested")
+    return times
+
+
 JSEC_START = datetime.datetime(2000, 1, 1)
 
 
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+
+    mslib.utils.waypoint_patch
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Waypoint level patches of flight tracks, used to synchronise flight
+    tracks between MSColab and its clients without sending whole documents.
+
+    A waypoint is represented by a dictionary with the keys "location",
+    "lat", "lon", "flightlevel" and "comments". A patch is a list of
+    operations, which are applied one after the other:
+
+    - {"op": "insert", "index": i, "waypoint": waypoint}
+    - {"op": "delete", "index": i}
+    - {"op": "edit", "index": i, "waypoint": waypoint}
+    - {"op": "move", "index": i, "to": j}, j being the index after the move
+
+    This file is part of MSS.
+
+    :copyright: Copyright 2024 by the MSS team, see AUTHORS.
+    :license: APACHE-2.0, see LICENSE for details.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+import difflib
+import xml.dom.minidom
+import xml.parsers.expat
+
+from mslib import __version__
+
+
+def waypoint_dict(location="", lat=0., lon=0., flightlevel=0., comments=""):
+    return {"location": str(location), "lat": float(lat), "lon": float(lon),
+            "flightlevel": float(flightlevel), "comments": str(comments)}
+
+
+def _checked_waypoint(waypoint):
+    try:
+        return waypoint_dict(**{key: waypoint[key] for key in ("location", "lat", "lon", "flightlevel", "comments")})
+    except (KeyError, TypeError) as ex:
+        raise ValueError(f"invalid waypoint {waypoint!r}") from ex
+
+
+def _checked_index(index, length):
+    if not isinstance(index, int) or not 0 <= index < length:
+        raise ValueError(f"waypoint index {index!r} out of range")
+    return index
+
+
+def read_waypoints(xml_content):
+    """
+    Returns the waypoint dictionaries of the flight track in the FTML document xml_content.
+    """
+    try:
+        doc = xml.dom.minidom.parseString(xml_content)
+    except xml.parsers.expat.ExpatError as ex:
+        raise ValueError(str(ex)) from ex
+
+    waypoints = []
+    for wp_el in doc.getElementsByTagName("FlightTrack")[0].getElementsByTagName("Waypoint"):
+        comments = wp_el.getElementsByTagName("Comments")[0]
+        comments = comments.childNodes[0].data.strip() if len(comments.childNodes) else ""
+        waypoints.append(waypoint_dict(wp_el.getAttribute("location"), wp_el.getAttribute("lat"),
+                                       wp_el.getAttribute("lon"), wp_el.getAttribute("flightlevel"), comments))
+    return waypoints
+
+
+def write_waypoints(waypoints):
+    """
+    Returns the FTML document of a flight track given by its waypoint dictionaries.
+
+    The document is formatted like WaypointsTableModel.get_xml_content, so that
+    the diffs of documents written by clients and by the server stay small.
+    """
+    doc = xml.dom.minidom.Document()
+    ft_el = doc.createElement("FlightTrack")
+    ft_el.setAttribute("version", __version__)
+    doc.appendChild(ft_el)
+    wp_el = doc.createElement("ListOfWaypoints")
+    ft_el.appendChild(wp_el)
+    for wp in waypoints:
+        element = doc.createElement("Waypoint")
+        wp_el.appendChild(element)
+        # set in sorted order, as mslib.utils.writexml writes them
+        element.setAttribute("flightlevel", str(wp["flightlevel"]))
+        element.setAttribute("lat", str(wp["lat"]))
+        element.setAttribute("location", str(wp["location"]))
+        element.setAttribute("lon", str(wp["lon"]))
+        comments = doc.createElement("Comments")
+        comments.appendChild(doc.createTextNode(str(wp["comments"])))
+        element.appendChild(comments)
+    return doc.toprettyxml(indent="  ", newl="\n")
+
+
+def apply_waypoint_patch(waypoints, ops):
+    """
+    Returns a new list of waypoint dictionaries with the operations ops applied
+    to waypoints. Raises ValueError if an operation is invalid.
+    """
+    waypoints = list(waypoints)
+    for op in ops:
+        try:
+            kind, index = op["op"], op["index"]
+        except (KeyError, TypeError) as ex:
+            raise ValueError(f"invalid operation {op!r}") from ex
+        if kind == "insert":
+            _checked_index(index, len(waypoints) + 1)
+            waypoints.insert(index, _checked_waypoint(op.get("waypoint")))
+        elif kind == "delete":
+            del waypoints[_checked_index(index, len(waypoints))]
+        elif kind == "edit":
+            waypoints[_checked_index(index, len(waypoints))] = _checked_waypoint(op.get("waypoint"))
+        elif kind == "move":
+            waypoint = waypoints.pop(_checked_index(index, len(waypoints)))
+            waypoints.insert(_checked_index(op.get("to"), len(waypoints) + 1), waypoint)
+        else:
+            raise ValueError(f"unknown operation {kind!r}")
+    return waypoints
+
+
+def diff_waypoints(old, new):
+    """
+    Returns the operations which turn the waypoint dictionaries old into new.
+    """
+    keys = ("location", "lat", "lon", "flightlevel", "comments")
+    matcher = difflib.SequenceMatcher(a=[tuple(wp[key] for key in keys) for wp in old],
+                                      b=[tuple(wp[key] for key in keys) for wp in new], autojunk=False)
+    ops = []
+    # shift of the indices of old by the operations so far
+    offset = 0
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        common = min(i2 - i1, j2 - j1)
+        for k in range(common):
+            ops.append({"op": "edit", "index": i1 + offset + k, "waypoint": new[j1 + k]})
+        for _ in range(i2 - i1 - common):
+            ops.append({"op": "delete", "index": i1 + offset + common})
+        for k in range(common, j2 - j1):
+            ops.append({"op": "insert", "index": i1 + offset + k, "waypoint": new[j1 + k]})
+        offset += (j2 - j1) - (i2 - i1)
+
+    # a waypoint taken out at one place and put in at another is a move
+    if len(ops) == 2 and {op["op"] for op in ops} == {"delete", "insert"}:
+        if ops[0]["op"] == "delete":
+            index, to = ops[0]["index"], ops[1]["index"]
+            moved = ops[1]["waypoint"]
+        else:
+            to, deleted = ops[0]["index"], ops[1]["index"]
+            index, to = (deleted - 1, to) if deleted > to else (deleted, to - 1)
+            moved = ops[0]["waypoint"]
+        if old[index] == moved:
+            ops = [{"op": "move", "index": index, "to": to}]
+    return ops
@@ -26,7 +26,7 @@
 """
 import pytest
 
-from mslib.mscolab.models import Message, MessageType
+from mslib.mscolab.models import Message, MessageType, Operation
 from mslib.mscolab.seed import add_user, get_user, add_operation, add_user_to_operation
 
 
@@ -52,6 +52,23 @@ class Test_Chat_Manager:
                                           reply_id=None)
             assert message.text == 'some message'
 
+    def test_get_messages_paginated(self):
+        with self.app.test_client():
+            op_id = Operation.query.filter_by(path=self.operation_name).first().id
+            messages = [self.cm.add_message(self.user, f'message {i}', op_id) for i in range(5)]
+            reply = self.cm.add_message(self.user, 'reply', op_id, reply_id=messages[3].id)
+            all_messages = self.cm.get_messages(op_id)
+            assert [message["text"] for message in all_messages] == [f'message {i}' for i in range(5)]
+            # the latest messages
+            page = self.cm.get_messages(op_id, limit=2)
+            assert page == all_messages[3:]
+            assert page[0]["replies"][0]["id"] == reply.id
+            # the messages before the first one of the page
+            page = self.cm.get_messages(op_id, before=page[0]["time"], before_id=page[0]["id"], limit=2)
+            assert page == all_messages[1:3]
+            page = self.cm.get_messages(op_id, before=page[0]["time"], before_id=page[0]["id"], limit=2)
+            assert page == all_messages[:1]
+
     def test_edit_messages(self):
         with self.app.test_client():
             message = self.cm.add_message(self.user, 'some test message',
@@ -25,13 +25,18 @@
     limitations under the License.
 """
 import datetime
+import logging
+import time
+import git
 import pytest
 import os
 
 from werkzeug.datastructures import FileStorage
 
-from mslib.mscolab.models import Operation, User
+from mslib.mscolab.conf import mscolab_settings
+from mslib.mscolab.models import db, Change, Operation, User
 from mslib.mscolab.seed import add_user, get_user, add_operation
+from mslib.utils.waypoint_patch import read_waypoints
 
 
 class Test_FileManager:
@@ -249,6 +254,105 @@ class Test_FileManager:
             assert self.fm.save_file(operation.id, self.content1, self.user) is False
             assert self.fm.save_file(operation.id, self.content2, self.user)
 
+    def test_save_file_batched(self, monkeypatch):
+        monkeypatch.setattr(mscolab_settings, "SAVE_BATCH_SECONDS", 60)
+        content3 = self.content1 + "\n<!-- batched -->"
+        with self.app.test_client():
+            flight_path, operation = self._create_operation(flight_path="operation6", content=self.content1)
+            self.fm.add_bulk_permission(operation.id, self.user, [self.collaboratoruser.id], "collaborator")
+            assert self.fm.save_file(operation.id, self.content2, self.user)
+            assert self.fm.save_file(operation.id, content3, self.user)
+            assert len(self.fm.get_all_changes(operation.id, self.user)) == 1
+            # the save of another user starts a new change
+            assert self.fm.save_file(operation.id, self.content2, self.collaboratoruser)
+            changes = self.fm.get_all_changes(operation.id, self.user)
+            assert len(changes) == 2
+            assert self.fm.get_change_content(changes[1]["id"], self.user) == content3
+            # the content of the open change is kept in the database as well
+            assert self.fm.get_change_content(changes[0]["id"], self.user) == self.content2
+            # a save after an undo does not overwrite the undo
+            assert self.fm.undo_changes(changes[1]["id"], self.user)
+            assert self.fm.save_file(operation.id, self.content1, self.user)
+            changes = self.fm.get_all_changes(operation.id, self.user)
+            assert len(changes) == 4
+            assert self.fm.get_change_content(changes[1]["id"], self.user) == content3
+            assert self.fm.get_change_content(changes[0]["id"], self.user) == self.content1
+
+    def test_snapshot_operations(self):
+        with self.app.test_client():
+            flight_path, operation = self._create_operation(flight_path="operation6", content=self.content1)
+            repo = git.Repo(os.path.join(self.fm.data_dir, flight_path))
+            assert self.fm.save_file(operation.id, self.content2, self.user)
+            # a save does not commit
+            assert repo.git.show("HEAD:main.ftml") == self.content1
+            change = Change.query.filter_by(op_id=operation.id).first()
+            assert change.commit_hash is None
+            assert self.fm.snapshot_operations() == 1
+            assert repo.git.show("HEAD:main.ftml") == self.content2
+            assert change.commit_hash == repo.head.commit.hexsha
+            # nothing changed since the snapshot
+            assert self.fm.snapshot_operations() == 0
+
+    def test_import_git_changes(self):
+        with self.app.test_client():
+            flight_path, operation = self._create_operation(flight_path="operation6", content=self.content1)
+            assert self.fm.save_file(operation.id, self.content2, self.user)
+            assert self.fm.snapshot_operations() == 1
+            # a change recorded before the contents were stored in the database
+            change = Change.query.filter_by(op_id=operation.id).first()
+            change.content = None
+            db.session.commit()
+            assert self.fm.get_change_content(change.id, self.user) == self.content2
+            assert self.fm.import_git_changes() == 1
+            assert change.content is not None
+            assert self.fm.get_change_content(change.id, self.user) == self.content2
+            assert self.fm.import_git_changes() == 0
+
+    def test_save_and_fetch_timing(self):
+        n_saves = 20
+        with self.app.test_client():
+            flight_path, operation = self._create_operation(flight_path="operation6", content=self.content1)
+            contents = [f"{self.content1}\n<!-- {i} -->" for i in range(n_saves)]
+            start = time.perf_counter()
+            for content in contents:
+                assert self.fm.save_file(operation.id, content, self.user)
+            save_time = time.perf_counter() - start
+            start = time.perf_counter()
+            assert self.fm.snapshot_operations() == 1
+            snapshot_time = time.perf_counter() - start
+            changes = self.fm.get_all_changes(operation.id, self.user)
+            start = time.perf_counter()
+            fetched = [self.fm.get_change_content(change["id"], self.user) for change in changes]
+            fetch_time = time.perf_counter() - start
+            repo = git.Repo(os.path.join(self.fm.data_dir, flight_path))
+            start = time.perf_counter()
+            for _ in range(n_saves):
+                repo.git.show("HEAD:main.ftml")
+            git_fetch_time = time.perf_counter() - start
+            logging.info("%s saves: %.3fs, snapshot: %.3fs, %s version fetches: %.3fs, from git: %.3fs",
+                         n_saves, save_time, snapshot_time, n_saves, fetch_time, git_fetch_time)
+            assert fetched == contents[::-1]
+
+    def test_patch_file(self):
+        with self.app.test_client():
+            flight_path, operation = self._create_operation(flight_path="operation6", content=self.content1)
+            content, version = self.fm.get_file_and_version(operation.id, self.user)
+            assert version == 0
+            waypoints = read_waypoints(content)
+            ops = [{"op": "delete", "index": 1}, {"op": "move", "index": 0, "to": 3}]
+            assert self.fm.patch_file(operation.id, ops, version, self.user) == 1
+            content, version = self.fm.get_file_and_version(operation.id, self.user)
+            assert version == 1
+            assert read_waypoints(content) == [waypoints[2], waypoints[3], waypoints[4], waypoints[0]]
+            assert len(self.fm.get_all_changes(operation.id, self.user)) == 1
+            # outdated version
+            assert self.fm.patch_file(operation.id, ops, 0, self.user) is False
+            # invalid operation
+            assert self.fm.patch_file(operation.id, [{"op": "delete", "index": 4}], 1, self.user) is False
+            # a full save counts up the version as well
+            assert self.fm.save_file(operation.id, self.content2, self.user)
+            assert self.fm.get_file_and_version(operation.id, self.user)[1] == 2
+
     def test_upload_chat_attachment(self):
         '''
         Tests the chat feature to upload files.
@@ -282,6 +386,26 @@ class Test_FileManager:
             changes = self.fm.get_all_changes(operation.id, self.user)
             assert len(changes) == 2
 
+    def test_get_all_changes_paginated(self):
+        with self.app.test_client():
+            flight_path, operation = self._create_operation(flight_path="operation8")
+            for i in range(5):
+                assert self.fm.save_file(operation.id, f"{self.content1}\n<!-- {i} -->", self.user)
+            all_changes = self.fm.get_all_changes(operation.id, self.user)
+            changes = self.fm.get_all_changes(operation.id, self.user, limit=2)
+            assert changes == all_changes[:2]
+            changes = self.fm.get_all_changes(operation.id, self.user, before=changes[-1]["created_at"],
+                                              before_id=changes[-1]["id"], limit=2)
+            assert changes == all_changes[2:4]
+            # changes at the same time are ordered by their id
+            created_at = datetime.datetime.now(tz=datetime.timezone.utc)
+            Change.query.filter_by(op_id=operation.id).update({Change.created_at: created_at})
+            db.session.commit()
+            all_changes = self.fm.get_all_changes(operation.id, self.user)
+            changes = self.fm.get_all_changes(operation.id, self.user, before=all_changes[1]["created_at"],
+                                              before_id=all_changes[1]["id"])
+            assert changes == all_changes[2:]
+
     def test_get_change_content(self):
         with self.app.test_client():
             flight_path, operation = self._create_operation(flight_path="operation8")
@@ -148,6 +148,10 @@ class Test_Server:
             assert response.status_code == 200
             data = json.loads(response.data.decode('utf-8'))
             assert data["messages"] == []
+            # malformed cursors
+            for arguments in [{"before": "yesterday"}, {"before_id": "last"}, {"limit": "all"}, {"timestamp": "now"}]:
+                response = test_client.get('/messages', data={"token": token, "op_id": operation.id, **arguments})
+                assert response.status_code == 400
 
     def test_message_attachment(self):
         assert add_user(self.userdata[0], self.userdata[1], self.userdata[2])
@@ -202,6 +206,7 @@ class Test_Server:
                                                                      "op_id": operation.id})
             assert response.status_code == 200
             assert "<ListOfWaypoints>" in response.data.decode('utf-8')
+            assert json.loads(response.data.decode('utf-8'))["version"] == 0
 
     def test_get_operations(self):
         assert add_user(self.userdata[0], self.userdata[1], self.userdata[2])
@@ -244,6 +249,25 @@ class Test_Server:
             assert all_changes[0]["id"] == 2
             assert all_changes[0]["id"] > all_changes[1]["id"]
             assert all_changes[0]["created_at"] > all_changes[1]["created_at"]
+            # the changes before the newest one
+            response = test_client.get('/get_all_changes', data={"token": token,
+                                                                 "op_id": operation.id,
+                                                                 "before": all_changes[0]["created_at"],
+                                                                 "before_id": all_changes[0]["id"],
+                                                                 "limit": 1})
+            assert response.status_code == 200
+            data = json.loads(response.data.decode('utf-8'))
+            assert data["changes"] == all_changes[1:]
+            # the limit is at least 1
+            response = test_client.get('/get_all_changes', data={"token": token, "op_id": operation.id,
+                                                                 "limit": -1})
+            assert response.status_code == 200
+            assert json.loads(response.data.decode('utf-8'))["changes"] == all_changes[:1]
+            # malformed cursors
+            for arguments in [{"before": "yesterday"}, {"before_id": "last"}, {"limit": "all"}]:
+                response = test_client.get('/get_all_changes', data={"token": token, "op_id": operation.id,
+                                                                     **arguments})
+                assert response.status_code == 400
 
     def test_get_change_content(self):
         assert add_user(self.userdata[0], self.userdata[1], self.userdata[2])
@@ -25,6 +25,9 @@
     limitations under the License.
 """
 import os
+import json
+import time
+import logging
 import pytest
 import socket
 import socketio
@@ -168,6 +171,73 @@ class Test_Socket_Manager:
             message = Message.query.filter_by(text="® non ascii").first()
             assert message is not None
 
+    @pytest.mark.parametrize("n_clients", [4, 16])
+    def test_message_fan_out(self, n_clients):
+        """
+        a chat message reaches only the clients of its operation, half of the
+        connected clients are members of another operation
+        """
+        other_operation = self._new_operation('other_operation', "example description")
+        received = {}
+        for i in range(n_clients):
+            emailid = f'fanout{i}@fanout'
+            assert add_user(emailid, f'fanout{i}', f'fanout{i}')
+            assert add_user_to_operation(path=self.operation_name if i % 2 == 0 else other_operation.path,
+                                         access_level='collaborator', emailid=emailid)
+            sio = self._connect()
+            received[i] = []
+            sio.on('chat-message-client', handler=lambda message, i=i: received[i].append(time.perf_counter()))
+            sio.emit('start', {'token': get_user(emailid).generate_auth_token()})
+        sio.sleep(1)
+
+        sender = self._connect()
+        sender.emit('start', {'token': self.token})
+        sender.sleep(1)
+        start = time.perf_counter()
+        sender.emit("chat-message", {
+            "op_id": self.operation.id,
+            "token": self.token,
+            "message_text": "fan out",
+            "reply_id": -1
+        })
+        sender.sleep(2)
+
+        members = [i for i in range(n_clients) if i % 2 == 0]
+        assert all(len(received[i]) == 1 for i in members)
+        assert all(len(received[i]) == 0 for i in range(n_clients) if i % 2 == 1)
+        fan_out = max(received[i][0] for i in members) - start
+        logging.info("fan-out of one chat message to %d of %d clients: %.1f ms",
+                     len(members), n_clients, 1000 * fan_out)
+
+    def test_file_patch(self):
+        assert add_user_to_operation(path=self.operation_name, access_level='collaborator',
+                                     emailid=self.anotheruserdata[0])
+        receiver = self._connect()
+        patches = []
+        receiver.on('file-patched', handler=lambda message: patches.append(json.loads(message)))
+        receiver.emit('start', {'token': self.anotheruser.generate_auth_token()})
+        sender = self._connect()
+        acks = []
+        sender.on('file-patched', handler=lambda message: patches.append(json.loads(message)))
+        sender.emit('start', {'token': self.token})
+        sender.sleep(1)
+
+        ops = [{"op": "delete", "index": 0}]
+        sender.emit('file-patch', {"op_id": self.operation.id, "token": self.token, "version": 0, "ops": ops},
+                    callback=lambda message: acks.append(json.loads(message)))
+        sender.sleep(1)
+        assert acks == [{"success": True, "op_id": self.operation.id, "version": 1}]
+        # only the other client receives the patch
+        assert patches == [{"op_id": self.operation.id, "u_id": self.user.id, "base_version": 0,
+                            "version": 1, "ops": ops}]
+
+        # the patch was applied to version 0 already
+        sender.emit('file-patch', {"op_id": self.operation.id, "token": self.token, "version": 0, "ops": ops},
+                    callback=lambda message: acks.append(json.loads(message)))
+        sender.sleep(1)
+        assert acks[-1] == {"success": False, "op_id": self.operation.id}
+        assert len(patches) == 1
+
     def test_get_messages(self):
         sio = self._connect()
         sio.emit('start', {'token': self.token})
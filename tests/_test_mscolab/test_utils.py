@@ -32,8 +32,8 @@ from fs.tempfs import TempFS
 from mslib.mscolab.conf import mscolab_settings
 from mslib.mscolab.models import Operation, Message, MessageType, User
 from mslib.mscolab.seed import add_user, get_user
-from mslib.mscolab.utils import (get_recent_op_id, get_session_id,
-                                 get_message_dict, create_files,
+from mslib.mscolab.utils import (get_recent_op_id, get_session_id, get_session_ids,
+                                 get_user_room, get_message_dict, create_files,
                                  os_fs_create_dir)
 
 
@@ -63,6 +63,15 @@ class Test_Utils:
         sockets = [{"u_id": 5, "s_id": 100}]
         assert get_session_id(sockets, 5) == 100
 
+    def test_get_session_ids(self):
+        sockets = [{"u_id": 5, "s_id": 100}, {"u_id": 6, "s_id": 101}, {"u_id": 5, "s_id": 102}]
+        assert get_session_ids(sockets, 5) == [100, 102]
+        assert get_session_ids(sockets, 7) == []
+
+    def test_get_user_room(self):
+        assert get_user_room(5) == "user-5"
+        assert get_user_room(5) != str(5)
+
     def test_get_message_dict(self):
         message = Message(0, 0, "Moin")
         message.user = User(*self.userdata)
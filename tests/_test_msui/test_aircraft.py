@@ -25,6 +25,7 @@
     limitations under the License.
 """
 
+import numpy as np
 import pytest
 
 from mslib.msui.aircraft import SimpleAircraft, AIRCRAFT_DUMMY
@@ -77,6 +78,12 @@ class Test_SimpleAircraft:
         assert self.simple_aircraft.get_ceiling_altitude(0) == 410
         assert self.simple_aircraft.get_ceiling_altitude(85000) == 410
 
+    def test_depends_on_weight(self):
+        assert not self.simple_aircraft.depends_on_weight()
+        data = dict(AIRCRAFT_DUMMY)
+        data["cruise"] = [[60000., 0., 400, 2000.], [90000., 0., 400, 3000.]]
+        assert SimpleAircraft(data).depends_on_weight()
+
 
 class Test_SimpleAircraft2:
     def setup_method(self):
@@ -104,3 +111,21 @@ class Test_SimpleAircraft2:
         check(360, 0, 600, 1500)
         check(410, 0, 700, 1000)
         check(500, 0, 700, 1000)
+
+    def test_performance_array(self):
+        data = dict(AIRCRAFT_DUMMY2)
+        data["climb"] = [[weight, altitude, altitude / 1000., altitude / 200., altitude / 50. + weight / 1000.]
+                         for weight in (60000., 90000.) for altitude in range(0, 45000, 5000)]
+        data["cruise"] = data["cruise"] + [[60000., 260., 450., 2500.], [60000., 410., 600., 1500.]]
+        aircraft = SimpleAircraft(data)
+        altitudes = np.linspace(-1000, 50000, 53)
+        grossweights = np.linspace(40000, 100000, 53)[::-1]
+        for name in ("climb", "cruise", "descent"):
+            scalar = getattr(aircraft, f"get_{name}_performance")
+            array = getattr(aircraft, f"get_{name}_performance_array")
+            expected = np.asarray([scalar(alt, weight) for alt, weight in zip(altitudes, grossweights)]).T
+            assert array(altitudes, grossweights) == pytest.approx(expected)
+            assert array(altitudes[10], grossweights[10]) == pytest.approx(expected[:, 10])
+            assert array(altitudes.reshape(1, -1), grossweights.reshape(-1, 1)).shape == (len(expected), 53, 53)
+        assert aircraft.get_ceiling_altitude_array(grossweights).tolist() == [
+            aircraft.get_ceiling_altitude(weight) for weight in grossweights]
@@ -32,6 +32,7 @@ import pytest
 from PyQt5 import QtCore, QtTest, QtGui
 from tests.constants import ROOT_DIR
 import mslib.msui.kmloverlay_dockwidget as kd
+from mslib.utils.qt import WorkerPool
 
 sample_path = os.path.join(os.path.dirname(__file__), "..", "data")
 save_kml = os.path.join(ROOT_DIR, "merged_file123.kml")
@@ -47,6 +48,7 @@ class Test_KmlOverlayDockWidget:
         self.view.map = mock.Mock(side_effect=lambda x, y: (x, y))
         self.view.map.plot = mock.Mock(return_value=[mock.Mock()])
         self.view.map.gcpoints_path = mock.Mock(side_effect=lambda x, y: (x, y))
+        self.view.map.overlay_workers = WorkerPool()
 
         self.window = kd.KMLOverlayControlWidget(view=self.view)
         self.window.show()
@@ -60,6 +62,7 @@ class Test_KmlOverlayDockWidget:
             os.remove(save_kml)
 
     def count_patches(self):
+        self.view.map.overlay_workers.wait()
         return sum([len(_x["patch"].patches) for _x in self.window.dict_files.values() if _x["patch"] is not None])
 
     def select_file(self, file):  # Utility function for single file
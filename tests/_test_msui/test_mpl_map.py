@@ -24,6 +24,8 @@
     See the License for the specific language governing permissions and
     limitations under the License.
 """
+import mock
+import numpy as np
 import pytest
 
 from matplotlib import pyplot as plt
@@ -51,3 +53,32 @@ class Test_MapCanvas:
         self.map.ax.set_xlim([1, 2])
         self.map.ax.set_ylim([62, 63])
         self.map.update_with_coordinate_change()
+
+    def test_view_extent(self):
+        lat_min, lat_max, lon_start, lon_width = self.map._get_view_extent()
+        assert lat_min <= 35 and lat_max >= 65
+        assert (-15 - lon_start) % 360 + 45 <= lon_width < 90
+        polar_map = MapCanvas(resolution="l", area_thresh=1000.0, ax=plt.gca(), projection="stere", lat_0=90.,
+                              lon_0=0., llcrnrlon=-45., llcrnrlat=30., urcrnrlon=135., urcrnrlat=30.)
+        lat_min, lat_max, lon_start, lon_width = polar_map._get_view_extent()
+        assert lat_min <= 30 and lat_max >= 90 and lon_width == 360
+
+    def test_draw_airports_airspaces(self):
+        rng = np.random.default_rng(0)
+        lats, lons = rng.uniform(-90, 90, 1000), rng.uniform(-180, 180, 1000)
+        airports = [{"type": "small_airport", "name": str(i), "latitude_deg": lat, "longitude_deg": lon}
+                    for i, (lat, lon) in enumerate(zip(lats, lons))]
+        airspaces = [{"name": str(i), "top": 2, "bottom": 1, "country": "DE",
+                      "polygon": [(lon, lat), (lon + 1, lat), (lon + 1, lat + 1), (lon, lat)]}
+                     for i, (lat, lon) in enumerate(zip(lats, lons))]
+        with mock.patch("mslib.msui.mpl_map.get_airports", return_value=airports), \
+                mock.patch("mslib.msui.mpl_map.get_airspaces", return_value=airspaces):
+            self.map.set_draw_airports(True)
+            self.map.set_draw_airspaces(True, ["Germany de"])
+        assert self.map.airports is None
+        self.map.overlay_workers.wait()
+        visible = (-15 <= lons) & (lons <= 30) & (35 <= lats) & (lats <= 65)
+        assert sorted(map(tuple, self.map.airports.get_offsets())) == sorted(zip(lons[visible], lats[visible]))
+        visible = (-16 <= lons) & (lons <= 30) & (34 <= lats) & (lats <= 65)
+        assert len(self.map.airspaces.get_paths()) == visible.sum()
+        assert airports[0]["longitude_deg"] == lons[0]
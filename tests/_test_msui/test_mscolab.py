@@ -24,6 +24,7 @@
     See the License for the specific language governing permissions and
     limitations under the License.
 """
+import json
 import os
 import sys
 import fs
@@ -36,7 +37,7 @@ import pytest
 import mslib.utils.auth
 from mslib.mscolab.conf import mscolab_settings
 from mslib.mscolab.models import Permission, User
-from mslib.msui.flighttrack import WaypointsTableModel
+from mslib.msui.flighttrack import WaypointsTableModel, LAT
 from PyQt5 import QtCore, QtTest, QtWidgets
 from mslib.utils.config import read_config_file, config_loader, modify_config_file
 from tests.utils import create_msui_settings_file, ExceptionMock
@@ -608,6 +609,63 @@ class Test_Mscolab:
         wpdata_server = self.window.mscolab.waypoints_model.waypoint_data(0)
         assert wpdata_local.lat != wpdata_server.lat
 
+    def test_waypoints_changes_debounced(self, qtbot):
+        self._connect_to_mscolab(qtbot)
+        modify_config_file({"MSS_auth": {self.url: self.userdata[0]}})
+        self._login(qtbot, emailid=self.userdata[0], password=self.userdata[2])
+        self._activate_operation_at_index(0)
+        model = self.window.mscolab.waypoints_model
+        with mock.patch.object(self.window.mscolab.conn, "patch_file") as patch_file:
+            model.setData(model.index(0, LAT), "1.5")
+            model.setData(model.index(1, LAT), "2.5")
+            assert patch_file.call_count == 0
+            qtbot.wait_until(lambda: patch_file.call_count == 1)
+        # both changes are sent as one patch
+        assert len(patch_file.call_args.args[2]) == 2
+
+    def test_file_patched_keeps_local_changes(self, qtbot):
+        self._connect_to_mscolab(qtbot)
+        modify_config_file({"MSS_auth": {self.url: self.userdata[0]}})
+        self._login(qtbot, emailid=self.userdata[0], password=self.userdata[2])
+        self._activate_operation_at_index(0)
+        msc = self.window.mscolab
+        model = msc.waypoints_model
+        version, synced = msc.waypoints_version, msc.waypoints_synced
+
+        def remote_patch(base_version, comments):
+            waypoint = dict(msc.waypoints_synced[-1], comments=comments)
+            return json.dumps({"op_id": msc.active_op_id, "u_id": 0, "base_version": base_version,
+                               "version": base_version + 1,
+                               "ops": [{"op": "edit", "index": len(synced) - 1, "waypoint": waypoint}]})
+
+        with mock.patch.object(msc.conn, "patch_file") as patch_file:
+            # a local change still waiting to be saved
+            model.setData(model.index(0, LAT), "1.5")
+            assert msc.save_timer.isActive()
+            msc.handle_file_patched(remote_patch(version, "remote"))
+            assert msc.waypoints_version == version + 1
+            assert model.waypoint_dicts()[0]["lat"] == 1.5
+            assert model.waypoint_dicts()[-1]["comments"] == "remote"
+            msc.save_waypoints_changes()
+            assert patch_file.call_args.args[1:] == (
+                version + 1, [{"op": "edit", "index": 0, "waypoint": model.waypoint_dicts()[0]}])
+            # the version is raised by the acknowledgement only
+            assert msc.waypoints_version == version + 1
+            msc.handle_file_patch_acknowledged(msc.active_op_id, version + 2)
+            assert msc.waypoints_version == version + 2
+            assert msc.waypoints_synced == model.waypoint_dicts()
+
+            # another client gets ahead of a patch, which the server rejects
+            model.setData(model.index(0, LAT), "2.5")
+            msc.save_waypoints_changes()
+            assert patch_file.call_args.args[1] == version + 2
+            msc.handle_file_patched(remote_patch(version + 2, "remote again"))
+            msc.handle_file_patch_rejected(msc.active_op_id)
+            assert patch_file.call_args.args[1:] == (
+                version + 3, [{"op": "edit", "index": 0, "waypoint": model.waypoint_dicts()[0]}])
+            assert model.waypoint_dicts()[0]["lat"] == 2.5
+            assert model.waypoint_dicts()[-1]["comments"] == "remote again"
+
     @mock.patch("mslib.msui.mscolab.get_open_filename", return_value=os.path.join(sample_path, u"example.ftml"))
     def test_browse_add_operation(self, mockopen, qtbot):
         self._connect_to_mscolab(qtbot)
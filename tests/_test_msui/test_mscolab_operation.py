@@ -31,6 +31,7 @@ from mslib.mscolab.conf import mscolab_settings
 from mslib.mscolab.models import Message, MessageType
 from PyQt5 import QtCore, QtTest, QtWidgets
 from mslib.msui import mscolab
+from mslib.msui import mscolab_chat
 from mslib.msui import msui
 from mslib.mscolab.seed import add_user, get_user, add_operation, add_user_to_operation
 from mslib.utils.config import modify_config_file
@@ -99,6 +100,20 @@ class Test_MscolabOperation:
         QtTest.QTest.mouseClick(self.chat_window.searchNextBtn, QtCore.Qt.LeftButton)
         assert self.chat_window.messageList.item(message_index).isSelected() is True
 
+    def test_load_older_messages(self, qtbot, monkeypatch):
+        monkeypatch.setattr(mscolab_chat, "MESSAGES_PAGE_SIZE", 2)
+        for i in range(3):
+            self._send_message(qtbot, f"message {i}")
+        self.chat_window.load_all_messages()
+        assert self.chat_window.messageList.count() == 2
+        assert self.chat_window.all_messages_loaded is False
+        self.chat_window.load_older_messages()
+        assert self.chat_window.messageList.count() == 3
+        assert self.chat_window.all_messages_loaded is True
+        texts = [self.chat_window.messageList.itemWidget(self.chat_window.messageList.item(i)).message_text
+                 for i in range(3)]
+        assert texts == ["message 0", "message 1", "message 2"]
+
     def test_copy_message(self, qtbot):
         self._send_message(qtbot, "**test message**")
         self._send_message(qtbot, "**test message**")
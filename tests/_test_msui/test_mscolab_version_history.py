@@ -30,6 +30,7 @@ import mock
 from mslib.mscolab.conf import mscolab_settings
 from PyQt5 import QtCore, QtTest, QtWidgets
 from mslib.msui import mscolab
+from mslib.msui import mscolab_version_history
 from mslib.msui import msui
 from mslib.mscolab.seed import add_user, get_user, add_operation, add_user_to_operation
 from mslib.utils.config import modify_config_file
@@ -68,9 +69,11 @@ class Test_MscolabVersionHistory:
     def test_changes(self, qtbot):
         self._change_version_filter(1)
         len_prev = self.version_window.changes.count()
-        # make a changes
+        # make a changes, each saved on its own
         self.window.mscolab.waypoints_model.invert_direction()
+        self.window.mscolab.save_waypoints_changes()
         self.window.mscolab.waypoints_model.invert_direction()
+        self.window.mscolab.save_waypoints_changes()
 
         def assert_():
             self.version_window.load_all_changes()
@@ -97,6 +100,7 @@ class Test_MscolabVersionHistory:
         # make changes
         for i in range(2):
             self.window.mscolab.waypoints_model.invert_direction()
+            self.window.mscolab.save_waypoints_changes()
 
         def assert_():
             self.version_window.load_all_changes()
@@ -108,11 +112,42 @@ class Test_MscolabVersionHistory:
         new_changes_count = self.version_window.changes.count()
         assert changes_count + 1 == new_changes_count
 
+    def test_changes_coalesced(self, qtbot):
+        self._change_version_filter(1)
+        len_prev = self.version_window.changes.count()
+        # a burst of changes is saved once
+        for i in range(3):
+            self.window.mscolab.waypoints_model.invert_direction()
+        assert self.window.mscolab.save_timer.isActive()
+
+        def assert_():
+            assert not self.window.mscolab.save_timer.isActive()
+            self.version_window.load_all_changes()
+            assert self.version_window.changes.count() == len_prev + 1
+        qtbot.wait_until(assert_)
+
+    def test_load_more_changes(self, monkeypatch):
+        monkeypatch.setattr(mscolab_version_history, "CHANGES_PAGE_SIZE", 2)
+        self._change_version_filter(1)
+        for i in range(3):
+            self.window.mscolab.waypoints_model.invert_direction()
+            self.window.mscolab.save_waypoints_changes()
+        self.version_window.load_all_changes()
+        assert self.version_window.changes.count() == 2
+        assert self.version_window.all_changes_loaded is False
+        self.version_window.load_more_changes()
+        assert self.version_window.changes.count() == 3
+        assert self.version_window.all_changes_loaded is True
+        ids = [self.version_window.changes.item(i).id for i in range(3)]
+        assert ids == sorted(ids, reverse=True)
+
     def test_refresh(self):
         self._change_version_filter(1)
         changes_count = self.version_window.changes.count()
         self.window.mscolab.waypoints_model.invert_direction()
+        self.window.mscolab.save_waypoints_changes()
         self.window.mscolab.waypoints_model.invert_direction()
+        self.window.mscolab.save_waypoints_changes()
         QtTest.QTest.mouseClick(self.version_window.refreshBtn, QtCore.Qt.LeftButton)
         new_changes_count = self.version_window.changes.count()
         assert new_changes_count == changes_count + 2
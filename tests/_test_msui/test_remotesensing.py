@@ -28,7 +28,7 @@
 
 import datetime
 
-from mock import Mock
+from mock import Mock, patch
 from matplotlib.collections import LineCollection
 import pytest
 import skyfield_data
@@ -184,6 +184,33 @@ class Test_RemoteSensingControlWidget:
         result = result.compute_solar_lines(self.bmap, self.coordinates, self.heights, self.times, self.solar_type)
         assert isinstance(result, LineCollection)
 
+    def test_compute_solar_lines_cached(self):
+        coordinates = self.coordinates + [[70.5, 30.25]]
+        heights = [0.0, 10.0, 10.0]
+        times = self.times + [datetime.datetime(2023, 4, 15, 12, 30)]
+        widget = self.remote_widget
+        with patch.object(widget, "_compute_solar_leg", wraps=widget._compute_solar_leg) as compute_leg:
+            result = widget.compute_solar_lines(self.bmap, coordinates, heights, times, self.solar_type)
+            assert compute_leg.call_count == 2
+            assert len(result.get_segments()) == len(result.get_array())
+            widget.dsbObsAngleAzimuth.setValue(270.)
+            result2 = widget.compute_solar_lines(self.bmap, coordinates, heights, times, ("sun", "azimuth"))
+            assert compute_leg.call_count == 2
+            assert len(result2.get_segments()) == len(result.get_segments())
+            coordinates[-1] = [71.0, 30.0]
+            widget.compute_solar_lines(self.bmap, coordinates, heights, times, self.solar_type)
+            assert compute_leg.call_count == 3
+            widget.compute_solar_lines(self.bmap, coordinates, heights, times, ("moon", "total"))
+            assert compute_leg.call_count == 5
+
+    def test_body_angles(self):
+        jsecs = [734839200., 734842800.5]
+        lons, lats = [78.01, -20.5], [25.27, 60.]
+        azi, ele = self.remote_widget.compute_body_angles("sun", jsecs, lons, lats)
+        for i in range(2):
+            assert (azi[i], ele[i]) == pytest.approx(
+                self.remote_widget.compute_body_angle("sun", jsecs[i], lons[i], lats[i]))
+
     def test_tangent_point_coordinates(self):
         tangent_point_coordinates = self.remote_widget.tangent_point_coordinates
         coordinates = tangent_point_coordinates(lon_lin=self.lon_lin, lat_lin=self.lat_lin, cut_height=self.cut_height)
@@ -26,6 +26,7 @@
 """
 
 import mock
+import numpy as np
 import os
 import pytest
 
@@ -205,6 +206,37 @@ class Test_TableView:
         wps_after = list(self.window.waypoints_model.waypoints)
         assert wps_before != wps_after, (wps_before, wps_after)
 
+    def test_update_distances(self):
+        """
+        Check that only the legs of changed waypoints are recomputed
+        """
+        model = self.window.waypoints_model
+        with mock.patch("mslib.msui.flighttrack.get_distance", wraps=ft.get_distance) as get_distance:
+            def computed_distances():
+                return sum(np.size(call.args[0]) for call in get_distance.call_args_list)
+            model.setData(model.index(2, ft.LAT), "52.5")
+            assert computed_distances() == 2
+            model.setData(model.index(3, ft.FLIGHTLEVEL), "250")
+            assert computed_distances() == 2
+            model.invert_direction()
+            assert computed_distances() == 6
+            # the legs to and from an inserted waypoint, and the leg bridging a removed one
+            model.insertRows(2, waypoints=[ft.Waypoint(51., 9., 300)])
+            assert computed_distances() == 8
+            model.removeRows(2)
+            assert computed_distances() == 9
+            # the new last leg is only flown differently
+            model.removeRows(len(model.waypoints) - 1)
+            assert computed_distances() == 9
+
+        reference = ft.WaypointsTableModel("")
+        reference.insertRows(0, rows=len(model.waypoints), waypoints=[
+            ft.Waypoint(wp.lat, wp.lon, wp.flightlevel) for wp in model.waypoints])
+        for wp, wp_ref in zip(model.waypoints, reference.waypoints):
+            for attribute in ("distance_to_prev", "distance_total", "leg_time", "cum_time",
+                              "leg_fuel", "rem_fuel", "weight", "ascent_rate"):
+                assert getattr(wp, attribute) == pytest.approx(getattr(wp_ref, attribute))
+
     def test_roundtrip(self):
         """
         Test connecting the last and first point
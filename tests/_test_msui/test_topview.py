@@ -81,6 +81,15 @@ class Test_MSSTopViewWindow:
         rsdock.dsbObsAngleAzimuth.setValue(70)
         QtTest.QTest.mouseClick(rsdock.cbDrawTangents, QtCore.Qt.LeftButton)
         rsdock.cbShowSolarAngle.setChecked(True)
+        plotter = self.window.mpl.canvas.waypoints_interactor.plotter
+        self.window.mpl.canvas.map.overlay_workers.wait()
+        assert plotter.tangent_lines is None
+        assert plotter.solar_lines is not None
+        QtTest.QTest.mouseClick(rsdock.cbDrawTangents, QtCore.Qt.LeftButton)
+        self.window.mpl.canvas.map.overlay_workers.wait()
+        assert plotter.tangent_lines is not None
+        rsdock.cbShowSolarAngle.setChecked(False)
+        assert plotter.solar_lines is None
 
     def test_open_kml(self):
         self.window.cbTools.currentIndexChanged.emit(4)
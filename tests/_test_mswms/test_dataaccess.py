@@ -133,6 +133,74 @@ class Test_CachedDataAccess(Test_DefaultDataAccess):
         self.dut.setup()
         assert "nothere" not in self.dut._file_cache
 
+    def test_update_sequence(self):
+        sequence = self.dut.get_update_sequence()
+        assert sequence > 0
+        self.dut._parse_file = mock.MagicMock()
+        self.dut._add_to_filetree = mock.MagicMock()
+        self.dut.setup()
+        self.dut.update()
+        assert self.dut.get_update_sequence() == sequence
+        assert self.dut._add_to_filetree.call_count == 0
+
+        fn = list(self.dut._file_cache.keys())[0]
+        mtime = os.path.getmtime(os.path.join(DATA_DIR, fn))
+        try:
+            os.utime(os.path.join(DATA_DIR, fn), (mtime + 10, mtime + 10))
+            self.dut.update()
+            assert self.dut.get_update_sequence() > sequence
+            self.dut._parse_file.assert_called_once_with(fn)
+            # another process, or a restarted one, reports the same sequence
+            other = CachedDataAccess(DATA_DIR, "EUR_LL015")
+            other.setup()
+            assert other.get_update_sequence() == self.dut.get_update_sequence()
+        finally:
+            os.utime(os.path.join(DATA_DIR, fn), (mtime, mtime))
+
+    def test_skipped_files(self):
+        fn = list(self.dut._file_cache.keys())[0]
+        del self.dut._file_cache[fn]
+        self.dut._parse_file = mock.MagicMock(side_effect=IOError("broken"))
+        self.dut.setup()
+        assert fn in self.dut._skipped_files
+        sequence = self.dut.get_update_sequence()
+        self.dut.setup()
+        assert self.dut._parse_file.call_count == 1
+        assert self.dut.get_update_sequence() == sequence
+
+    def test_scan_interval(self):
+        dut = CachedDataAccess(DATA_DIR, "EUR_LL015", scan_interval=3600)
+        dut.update()
+        assert dut.get_update_sequence() > 0
+        assert dut._scanner_pid == os.getpid()
+        with mock.patch.object(dut, "setup") as setup:
+            dut.update()
+            assert setup.call_count == 0
+
+    def test_metadata_cache(self, tmp_path):
+        cache_file = str(tmp_path / "metadata.sqlite")
+        dut = CachedDataAccess(DATA_DIR, "EUR_LL015", metadata_cache=cache_file)
+        dut.setup()
+        assert dut._filetree == self.dut._filetree
+
+        # a second server process starts with the metadata of the first one
+        dut2 = CachedDataAccess(DATA_DIR, "EUR_LL015", metadata_cache=cache_file)
+        dut2._parse_file = mock.MagicMock()
+        dut2.setup()
+        assert dut2._parse_file.call_count == 0
+        assert dut2._filetree == self.dut._filetree
+        assert list(dut2.get_elevations("pl")) == list(self.dut.get_elevations("pl"))
+
+        # files with differing modification time are parsed again
+        fn = dut2.get_all_datafiles()[0]
+        mtime = dut2._file_cache[fn][0]
+        dut3 = CachedDataAccess(DATA_DIR, "EUR_LL015", metadata_cache=cache_file)
+        dut3._parse_file = mock.MagicMock(side_effect=dut._parse_file)
+        with mock.patch.object(dut3, "_scan_files",
+                               return_value={**dut3._scan_files(), fn: mtime + 1}):
+            dut3.setup()
+        dut3._parse_file.assert_called_once_with(fn)
+
 
 class Test_DefaultDataAccessNoInit:
     def setup_method(self):
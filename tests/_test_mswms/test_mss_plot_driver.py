@@ -28,16 +28,25 @@
 """
 
 from datetime import datetime
+import logging
 import os
+import time
 import warnings
 import sys
 
+import netCDF4
+import numpy as np
 import pytest
 from PIL import Image
 from xml.etree import ElementTree
 import io
-from mslib.mswms.mss_plot_driver import VerticalSectionDriver, HorizontalSectionDriver, LinearSectionDriver
+import mock
+from mslib.mswms.mss_plot_driver import VerticalSectionDriver, HorizontalSectionDriver, LinearSectionDriver, \
+    PlotDriverPool, PooledDataset
 import mswms_settings
+from mslib.mswms.dataaccess import WatchModificationDataAccess
+from tests.constants import DATA_DIR
+import mslib.utils.coordinate as coordinate
 import mslib.mswms.mpl_vsec_styles as mpl_vsec_styles
 import mslib.mswms.mpl_hsec_styles as mpl_hsec_styles
 import mslib.mswms.mpl_lsec_styles as mpl_lsec_styles
@@ -101,6 +110,48 @@ class Test_VSec:
         img = self.plot(mpl_vsec_styles.VS_TemperatureStyle_01(driver=self.vsec))
         assert img is not None
 
+    def test_path_windows(self):
+        # global grid stored as 0..360 with decreasing latitudes
+        driver = VerticalSectionDriver(None)
+        driver.lat_data = np.arange(-90, 90.5, 1.)
+        driver.lat_order = -1
+        driver.lon_data = ((np.arange(0, 360, 1.) + 180) % 360) - 180
+        driver.vert_order = 1
+        rng = np.random.default_rng(0)
+        field = np.ma.masked_array(rng.normal(size=(1, 5, len(driver.lat_data), len(driver.lon_data))))
+        field[0, 2, 100:120, 10:20] = np.ma.masked
+
+        for path in [[[45, 8], [50, 12], [51, 15]], [[60, 170], [65, -170]], [[20, -120], [60, 120], [10, 0]]]:
+            driver._set_vertical_section_path(path, 301, "greatcircle")
+            lats, lons, weights, windows = driver._get_path_windows()
+            result = coordinate.interpolate_vertsec(
+                driver._load_path_windows(field, 0, windows), lats, lons, driver.lats, driver.lons, weights=weights)
+            assert sum((_x[1] - _x[0]) * (_x[3] - _x[2]) for _x in windows[3]) < 0.1 * field[0, 0].size
+
+            left_longitude = np.unwrap(driver.lons, period=360).min() - 1
+            lon_data = ((driver.lon_data - left_longitude) % 360) + left_longitude
+            expected = coordinate.interpolate_vertsec(
+                field[0, ::-1, ::-1][:, :, lon_data.argsort()], driver.lat_data, np.sort(lon_data),
+                driver.lats, ((driver.lons - left_longitude) % 360) + left_longitude)
+            assert (result.mask == expected.mask).all()
+            assert np.allclose(result.filled(0), expected.filled(0))
+
+    def test_path_cache(self):
+        self.plot(mpl_vsec_styles.VS_TemperatureStyle_01(driver=self.vsec))
+        lats, windows = self.vsec.lats, self.vsec._get_path_windows()
+        hits = self.vsec.path_cache.hits
+        self.plot(mpl_vsec_styles.VS_HorizontalVelocityStyle_01(driver=self.vsec))
+        assert self.vsec.lats is lats and self.vsec._get_path_windows() is windows
+        assert self.vsec.path_cache.hits >= hits + 3
+
+        # other paths and grids are computed anew
+        self.path = self.path[::-1]
+        self.plot(mpl_vsec_styles.VS_TemperatureStyle_01(driver=self.vsec))
+        assert self.vsec.lats is not lats and np.allclose(self.vsec.lats, lats[::-1])
+        windows = self.vsec._get_path_windows()
+        self.vsec.lat_data = self.vsec.lat_data[1:]
+        assert self.vsec._get_path_windows()[3][0][0] == windows[3][0][0] - 1
+
     def test_VS_verticals(self):
         img = self.plot(mpl_vsec_styles.VS_TemperatureStyle_01(driver=self.vsec), draw_verticals=True)
         assert img is not None
@@ -116,6 +167,84 @@ class Test_VSec:
         assert img is not None
         ElementTree.fromstring(img)
 
+    def test_VS_netcdf(self):
+        xml = ElementTree.fromstring(
+            self.plot(mpl_vsec_styles.VS_TemperatureStyle_01(driver=self.vsec), mime_type="text/xml"))
+        data = self.plot(mpl_vsec_styles.VS_TemperatureStyle_01(driver=self.vsec), mime_type="application/x-netcdf")
+        with netCDF4.Dataset("vsec.nc", memory=data) as ncfile:
+            assert ncfile.title == xml.find("Title").text.strip()
+            assert ncfile.valid_time == xml.find("ValidTime").text.strip()
+            for name in ["lat", "lon"]:
+                node = xml.find("Latitude" if name == "lat" else "Longitude")
+                assert np.allclose(ncfile[name][:], [float(_x) for _x in node.text.split(",")])
+            for node in xml.find("Data"):
+                values = np.array([[float(_x) for _x in row.split(",")] for row in node.text.strip().split("\n")])
+                assert ncfile[node.tag].dimensions == ("level", "waypoint")
+                assert np.allclose(ncfile[node.tag][:], values, equal_nan=True)
+            assert ncfile["air_temperature"].units == "K"
+
+    def test_VS_netcdf_sfc_fields(self):
+        ml_style = mpl_vsec_styles.VS_GenericStyle_ML_mole_fraction_of_ozone_in_air
+
+        class VS_SfcStyle(ml_style):
+            # the surface field is written before the curtains
+            required_datafields = [("sfc", "air_pressure_at_sea_level", "Pa")] + ml_style.required_datafields
+
+        data = self.plot(VS_SfcStyle(driver=self.vsec), mime_type="application/x-netcdf")
+        # the model level file is opened as master of the combined dataset
+        assert self.vsec.filenames[0].endswith(".ml.nc")
+        with netCDF4.Dataset("vsec.nc", memory=data) as ncfile:
+            assert [_x for _x in ncfile.variables if _x not in ("lat", "lon")][0] == "air_pressure_at_sea_level"
+            assert ncfile["air_pressure_at_sea_level"].dimensions == ("waypoint",)
+            assert np.allclose(ncfile["air_pressure_at_sea_level"][:],
+                               np.ma.filled(self.vsec.plot_object.data["air_pressure_at_sea_level"][0], np.nan),
+                               equal_nan=True)
+            assert ncfile["mole_fraction_of_ozone_in_air"].dimensions == ("level", "waypoint")
+            assert np.allclose(ncfile["mole_fraction_of_ozone_in_air"][:],
+                               np.ma.filled(self.vsec.plot_object.data["mole_fraction_of_ozone_in_air"], np.nan),
+                               equal_nan=True)
+
+    def test_timestep_runs(self):
+        # only the requested time steps are read
+        runs = VerticalSectionDriver._get_timestep_runs(np.array([0, 1, 47]))
+        assert runs == [slice(0, 2, 1), slice(47, 48, 1)]
+        runs = VerticalSectionDriver._get_timestep_runs(np.array([0, 2, 4, 5, 9]))
+        assert runs == [slice(0, 5, 2), slice(5, 10, 4)]
+        assert sum(len(range(*_x.indices(48))) for _x in runs) == 5
+
+    def test_VS_valid_times(self):
+        valid_times = [datetime(2012, 10, 17, 12), datetime(2012, 10, 18, 0), datetime(2012, 10, 17, 18)]
+        self.vsec.set_plot_parameters(plot_object=mpl_vsec_styles.VS_TemperatureStyle_01(driver=self.vsec),
+                                      bbox=self.bbox, vsec_path=self.path, vsec_numpoints=101,
+                                      vsec_path_connection="greatcircle", init_time=self.init_time,
+                                      valid_times=valid_times, mime_type="application/x-netcdf")
+        data = self.vsec.plot()
+        img = self.vsec.update_plot_parameters(mime_type="image/png") or self.vsec.plot()
+        with Image.open(io.BytesIO(img)) as image:
+            assert image.n_frames == len(valid_times)
+
+        with netCDF4.Dataset("vsec.nc", memory=data) as ncfile:
+            assert list(netCDF4.num2date(ncfile["time"][:], ncfile["time"].units)) == valid_times
+            for index, valid_time in enumerate(valid_times):
+                self.valid_time = valid_time
+                single = self.plot(mpl_vsec_styles.VS_TemperatureStyle_01(driver=self.vsec),
+                                   mime_type="application/x-netcdf")
+                with netCDF4.Dataset("single.nc", memory=single) as single:
+                    assert single.valid_time == valid_time.strftime("%Y-%m-%dT%H:%M:%SZ")
+                    for name in ["air_temperature", "air_potential_temperature"]:
+                        assert np.array_equal(ncfile[name][index], single[name][:], equal_nan=True)
+
+    def test_VS_valid_times_open_once(self):
+        valid_times = [datetime(2012, 10, 17, 12), datetime(2012, 10, 18, 0), datetime(2012, 10, 17, 18)]
+        with mock.patch("mslib.mswms.mss_plot_driver.PooledDataset", wraps=PooledDataset) as pooled:
+            self.vsec.set_plot_parameters(plot_object=mpl_vsec_styles.VS_TemperatureStyle_01(driver=self.vsec),
+                                          bbox=self.bbox, vsec_path=self.path, vsec_numpoints=101,
+                                          vsec_path_connection="greatcircle", init_time=self.init_time,
+                                          valid_times=valid_times, mime_type="application/x-netcdf")
+            self.vsec.plot()
+        # the valid times share their files, which are opened once
+        assert pooled.call_count == 1
+
     def test_VS_wrong_mime_type(self):
         with pytest.raises(RuntimeError):
             self.plot(mpl_vsec_styles.VS_TemperatureStyle_01(driver=self.vsec), mime_type="stupid/stuff")
@@ -269,6 +398,61 @@ class Test_LSec:
         img = self.plot(mpl_lsec_styles.LS_VerticalVelocityStyle_01(driver=self.lsec))
         assert img is not None
 
+    def test_LS_netcdf(self):
+        xml = ElementTree.fromstring(self.plot(mpl_lsec_styles.LS_DefaultStyle(driver=self.lsec)))
+        data = self.plot(mpl_lsec_styles.LS_DefaultStyle(driver=self.lsec), mime_type="application/x-netcdf")
+        with netCDF4.Dataset("lsec.nc", memory=data) as ncfile:
+            values = ncfile["air_temperature"]
+            assert values.dimensions == ("waypoint",) and values.units == xml.find("Data").get("unit")
+            assert np.allclose(values[:], [float(_x) for _x in xml.find("Data").text.split(",")], equal_nan=True)
+            assert np.allclose(ncfile["lat"][:], [float(_x) for _x in xml.find("Latitude").text.split(",")])
+
+    def test_vertical_interpolation_factors(self):
+        def reference(pressures, alts):
+            # straightforward implementation the vectorised one is benchmarked against
+            factors = []
+            for index_lonlat, alt in enumerate(alts):
+                pressure = pressures[:, index_lonlat]
+                idx0 = None
+                for index_altitude in range(len(pressures) - 1):
+                    if (pressure[index_altitude] <= alt <= pressure[index_altitude + 1]) or \
+                       (pressure[index_altitude] >= alt >= pressure[index_altitude + 1]):
+                        idx0 = index_altitude
+                        break
+                if idx0 is None:
+                    factors.append(((0, np.nan), (0, np.nan)))
+                    continue
+                idx1 = idx0 + 1
+                fac1 = (pressure[idx0] - alt) / (pressure[idx0] - pressure[idx1])
+                factors.append(((idx0, 1 - fac1), (idx1, fac1)))
+            return factors
+
+        rng = np.random.default_rng(0)
+        num_levels, num_points = 137, 2000
+        pressures = np.log(np.linspace(1, 1050, num_levels)[:, np.newaxis] * 100 *
+                           rng.uniform(0.9, 1.1, (1, num_points)))
+        pressures[5, ::7] = np.nan
+        pressures[::-1, ::3] = pressures[:, ::3]
+        alts = np.log(rng.uniform(0, 120000, num_points))
+        cross_section = rng.normal(size=(num_levels, num_points))
+
+        start = time.perf_counter()
+        factors = reference(pressures, alts)
+        expected = np.array([cross_section[idx0, index] * w0 + cross_section[idx1, index] * w1
+                             for index, ((idx0, w0), (idx1, w1)) in enumerate(factors)])
+        reference_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        (idx0, w0), (idx1, w1) = LinearSectionDriver._get_vertical_interpolation_factors(pressures, alts)
+        result = (np.take_along_axis(cross_section, idx0[np.newaxis], axis=0)[0] * w0 +
+                  np.take_along_axis(cross_section, idx1[np.newaxis], axis=0)[0] * w1)
+        vectorised_time = time.perf_counter() - start
+
+        assert np.isnan(result).any() and not np.isnan(result).all()
+        assert np.allclose(result, expected, equal_nan=True)
+        logging.info("vertical interpolation of %s points on %s levels: %.4fs (loop), %.4fs (vectorised)",
+                     num_points, num_levels, reference_time, vectorised_time)
+
     def test_LS_wrong_mime_type(self):
         with pytest.raises(RuntimeError):
             self.plot(mpl_lsec_styles.LS_RelativeHumdityStyle_01(driver=self.lsec), mime_type="stupid/stuff")
@@ -330,6 +514,79 @@ class Test_HSec:
         img = self.plot(mpl_hsec_styles.HS_TemperatureStyle_ML_01(driver=self.hsec), level=10)
         assert img is not None
 
+    def test_hyperslab(self):
+        img = self.plot(mpl_hsec_styles.HS_MSLPStyle_01(driver=self.hsec), bbox=[0, 40, 20, 50])
+        assert img is not None
+        lat_slice, lon_slices, lats, lons = self.hsec._get_hyperslab()
+        assert len(lats) < len(self.hsec.lat_data) and len(lons) < len(self.hsec.lon_data)
+        assert lats[0] < 40 < 50 < lats[-1] and lons[0] < 0 < 20 < lons[-1]
+
+        img = self.plot(mpl_hsec_styles.HS_MSLPStyle_01(driver=self.hsec), bbox=[-180, -90, 180, 90])
+        assert img is not None
+        assert self.hsec._get_hyperslab()[1] == [slice(None)]
+
+        # regions crossing the longitude boundary of global grids
+        self.hsec.bbox = [170, 40, 190, 50]
+        for lon_data, num_slices in [(np.arange(-180, 180.), 2), (((np.arange(0, 360.) + 180) % 360) - 180, 1)]:
+            self.hsec.lon_data = lon_data
+            _, lon_slices, _, lons = self.hsec._get_hyperslab()
+            assert len(lon_slices) == num_slices
+            assert np.allclose(np.diff(lons), 1) and lons[0] < 170 < 190 < lons[-1]
+            assert np.allclose(((lons + 180) % 360) - 180, np.concatenate([lon_data[_x] for _x in lon_slices]))
+
+    def test_dataset_pool(self, monkeypatch):
+        self.plot(mpl_hsec_styles.HS_MSLPStyle_01(driver=self.hsec))
+        sfc_dataset = self.hsec.dataset
+        self.plot(mpl_hsec_styles.HS_TemperatureStyle_ML_01(driver=self.hsec), level=10)
+        ml_dataset = self.hsec.dataset
+        assert ml_dataset is not sfc_dataset and len(self.hsec.dataset_pool) == 2
+
+        # switching back to a layer on the same files reuses the open files
+        self.plot(mpl_hsec_styles.HS_MSLPStyle_01(driver=self.hsec))
+        assert self.hsec.dataset is sfc_dataset
+        self.valid_time = datetime(2012, 10, 17, 18)
+        self.plot(mpl_hsec_styles.HS_MSLPStyle_01(driver=self.hsec))
+        assert self.hsec.dataset is sfc_dataset
+
+        # modified files are reopened
+        monkeypatch.setattr(self.hsec.data_access, "is_reload_required", lambda filenames: True)
+        self.plot(mpl_hsec_styles.HS_TemperatureStyle_ML_01(driver=self.hsec), level=10)
+        assert self.hsec.dataset is not ml_dataset and len(self.hsec.dataset_pool) == 2
+        monkeypatch.undo()
+
+        # the least recently used files are closed
+        hsec = HorizontalSectionDriver(self.hsec.data_access, dataset_pool_size=1)
+        self.hsec = hsec
+        self.plot(mpl_hsec_styles.HS_MSLPStyle_01(driver=hsec))
+        sfc_dataset = hsec.dataset
+        self.plot(mpl_hsec_styles.HS_TemperatureStyle_ML_01(driver=hsec), level=10)
+        self.plot(mpl_hsec_styles.HS_MSLPStyle_01(driver=hsec))
+        assert hsec.dataset is not sfc_dataset and len(hsec.dataset_pool) == 1
+
+    def test_dataset_pool_modified_files(self):
+        data_access = WatchModificationDataAccess(DATA_DIR, "EUR_LL015")
+        data_access.setup()
+        drivers = [HorizontalSectionDriver(data_access) for _ in range(2)]
+        datasets = []
+        for driver in drivers:
+            self.hsec = driver
+            self.plot(mpl_hsec_styles.HS_MSLPStyle_01(driver=driver))
+            datasets.append(driver.dataset)
+        assert datasets[0] is not datasets[1]
+
+        # the first driver brings the shared data access object up to date,
+        # the second one has to re-open the rewritten file nevertheless
+        filename = drivers[0].filenames[0]
+        mtime = os.path.getmtime(filename)
+        try:
+            os.utime(filename, (mtime + 10, mtime + 10))
+            for driver, dataset in zip(drivers, datasets):
+                self.hsec = driver
+                self.plot(mpl_hsec_styles.HS_MSLPStyle_01(driver=driver))
+                assert driver.dataset is not dataset
+        finally:
+            os.utime(filename, (mtime, mtime))
+
     def test_HS_CloudsStyle_01(self):
         for style in ["TOT", "HIGH", "MED", "LOW"]:
             img = self.plot(mpl_hsec_styles.HS_CloudsStyle_01(driver=self.hsec), style=style)
@@ -509,3 +766,37 @@ class Test_HSec:
 
         img = self.plot(HS_Template(driver=self.hsec), level=300)
         assert img is not None
+
+
+class Test_PlotDriverPool:
+    def setup_method(self):
+        data = mswms_settings.data["ecmwf_EUR_LL015"]
+        data.setup()
+        self.hsec = HorizontalSectionDriver(data)
+        self.layer = mpl_hsec_styles.HS_MSLPStyle_01(driver=self.hsec)
+        self.pool = PlotDriverPool(self.hsec, size=2)
+
+    def test_reuse_idle_driver(self):
+        with self.pool.checkout(self.layer) as (driver, plot_object):
+            assert driver is self.hsec
+            assert plot_object is self.layer
+        with self.pool.checkout(self.layer) as (driver, plot_object):
+            assert driver is self.hsec
+        assert len(self.pool) == 1
+
+    def test_concurrent_checkout(self):
+        with self.pool.checkout(self.layer) as (driver1, plot_object1):
+            with self.pool.checkout(self.layer) as (driver2, plot_object2):
+                assert driver1 is not driver2
+                assert isinstance(driver2, HorizontalSectionDriver)
+                assert plot_object2 is not self.layer
+                assert plot_object2.driver is driver2
+                assert plot_object2.name == self.layer.name
+                driver2.set_plot_parameters(plot_object=plot_object2, bbox=[-22.5, 27.5, 55, 62.5],
+                                            crs="EPSG:4326", init_time=datetime(2012, 10, 17, 12),
+                                            valid_time=datetime(2012, 10, 17, 12))
+                assert driver2.plot() is not None
+        assert len(self.pool) == 2
+        with self.pool.checkout(self.layer) as (driver, plot_object):
+            with self.pool.checkout(self.layer) as (_, plot_object2_again):
+                assert plot_object2_again is plot_object2
@@ -25,12 +25,16 @@
     See the License for the specific language governing permissions and
     limitations under the License.
 """
+import io
 import os
+from concurrent.futures import ThreadPoolExecutor
 from shutil import move
 
 import mock
+import netCDF4
 from nco import Nco
 import pytest
+from PIL import Image
 
 import mslib.mswms.wms
 import mslib.mswms.gallery_builder
@@ -109,6 +113,25 @@ class Test_WMS:
             callback_ok_xml(result.status, result.headers)
             assert isinstance(result.data, bytes), result
 
+    def test_get_capabilities_update_sequence(self):
+        query_string = 'request=GetCapabilities&service=WMS&version=1.3.0'
+        self.client = self.app.test_client()
+        result = self.client.get('/?{}'.format(query_string))
+        callback_ok_xml(result.status, result.headers)
+        sequence = max(data_access.get_update_sequence()
+                       for data_access in mslib.mswms.wms.mswms_settings.data.values())
+        assert f'updateSequence="{sequence}"'.encode() in result.data
+
+        for update_sequence, code in [(sequence - 1, None),
+                                      (sequence, b"CurrentUpdateSequence"),
+                                      (sequence + 1, b"InvalidUpdateSequence")]:
+            result = self.client.get('/?{}&updatesequence={}'.format(query_string, update_sequence))
+            callback_ok_xml(result.status, result.headers)
+            if code is None:
+                assert result.data.count(b"ServiceExceptionReport") == 0, result
+            else:
+                assert result.data.count(code) > 0, result
+
     def test_get_capabilities_lowercase(self):
         environ = {
             'wsgi.url_scheme': 'http',
@@ -294,6 +317,63 @@ class Test_WMS:
             callback_ok_xml(result.status, result.headers)
             assert result.data.count(b"ServiceExceptionReport") > 0, result
 
+    def test_produce_section_netcdf(self):
+        self.client = self.app.test_client()
+        query_string = (
+            'layers=ecmwf_EUR_LL015.LS_HV01&styles=&srs=LINE%3A1&format=application%2Fx-netcdf&'
+            'request=GetMap&dim_init_time=2012-10-17T12%3A00%3A00Z&'
+            'version=1.1.1&bbox=201&time=2012-10-17T12%3A00%3A00Z&'
+            'exceptions=application%2Fvnd.ogc.se_xml&path=52.78%2C-8.93%2C25000%2C48.08%2C11.28%2C25000')
+        result = self.client.get('/?{}'.format(query_string))
+        assert result.status_code == 200 and result.headers["Content-Type"] == "application/x-netcdf"
+        with netCDF4.Dataset("lsec.nc", memory=result.data) as ncfile:
+            assert all(_x.shape == (201,) for _x in ncfile.variables.values()) and len(ncfile.variables) == 3
+
+        query_string = (
+            'layers=ecmwf_EUR_LL015.VS_HV01&styles=&srs=VERT%3ALOGP&format=application%2Fx-netcdf&'
+            'request=GetMap&dim_init_time=2012-10-17T12%3A00%3A00Z&'
+            'version=1.1.1&bbox=201%2C500.0%2C10%2C100.0&time=2012-10-17T12%3A00%3A00Z&'
+            'exceptions=application%2Fvnd.ogc.se_xml&path=52.78%2C-8.93%2C48.08%2C11.28')
+        result = self.client.get('/?{}'.format(query_string))
+        assert result.status_code == 200 and result.headers["Content-Type"] == "application/x-netcdf"
+        with netCDF4.Dataset("vsec.nc", memory=result.data) as ncfile:
+            assert ncfile["air_pressure"].dimensions == ("level", "waypoint")
+            assert ncfile["lat"].shape == (201,)
+
+        # only single vertical and linear section layers can be returned as NetCDF
+        for orig, fake in [("layers=ecmwf_EUR_LL015.VS_HV01", "layers=ecmwf_EUR_LL015.VS_HV01,ecmwf_EUR_LL015.VS_HV01"),
+                           ("srs=VERT%3ALOGP", "srs=EPSG%3A4326")]:
+            result = self.client.get('/?{}'.format(query_string.replace(orig, fake)))
+            callback_ok_xml(result.status, result.headers)
+            assert result.data.count(b"InvalidFORMAT") > 0, result
+
+    def test_produce_vsec_valid_times(self):
+        self.client = self.app.test_client()
+        query_string = (
+            'layers=ecmwf_EUR_LL015.VS_HV01&styles=&srs=VERT%3ALOGP&format=application%2Fx-netcdf&'
+            'request=GetMap&dim_init_time=2012-10-17T12%3A00%3A00Z&'
+            'version=1.1.1&bbox=201%2C500.0%2C10%2C100.0&'
+            'time=2012-10-17T12%3A00%3A00Z%2F2012-10-18T00%3A00%3A00Z%2FPT6H&'
+            'exceptions=application%2Fvnd.ogc.se_xml&path=52.78%2C-8.93%2C48.08%2C11.28')
+        result = self.client.get('/?{}'.format(query_string))
+        assert result.status_code == 200 and result.headers["Content-Type"] == "application/x-netcdf"
+        with netCDF4.Dataset("vsec.nc", memory=result.data) as ncfile:
+            assert ncfile["time"][:].tolist() == [0, 6, 12]
+            assert ncfile["air_pressure"].dimensions == ("time", "level", "waypoint")
+
+        query_string = query_string.replace("application%2Fx-netcdf", "image%2Fpng")
+        result = self.client.get('/?{}'.format(query_string))
+        callback_ok_image(result.status, result.headers)
+        with Image.open(io.BytesIO(result.data)) as image:
+            assert image.n_frames == 3
+
+        for orig, fake in [("format=image%2Fpng", "format=text%2Fxml"),
+                           ("layers=ecmwf_EUR_LL015.VS_HV01", "layers=ecmwf_EUR_LL015.VS_HV01,ecmwf_EUR_LL015.VS_HV01"),
+                           ("PT6H", "PT1M"), ("PT6H", "P1M")]:
+            result = self.client.get('/?{}'.format(query_string.replace(orig, fake)))
+            callback_ok_xml(result.status, result.headers)
+            assert result.data.count(b"InvalidDimensionValue") > 0, result
+
     def test_application_request(self):
         environ = {
             'wsgi.url_scheme': 'http',
@@ -363,6 +443,34 @@ class Test_WMS:
         callback_ok_image(result.status, result.headers)
         assert isinstance(result.data, bytes), result
 
+    def test_multiple_images_service_exception(self):
+        query_string = (
+            'layers=ecmwf_EUR_LL015.PLDiv01,ecmwf_EUR_LL015.PLTemp01&styles=&elevation=200&'
+            'srs=EPSG%3A4326&format=image%2Fpng&'
+            'request=GetMap&bgcolor=0xFFFFFF&height=376&dim_init_time=2012-10-17T12%3A00%3A00Z&width=479&'
+            'version=1.1.1&bbox=-50.0%2C20.0%2C20.0%2C75.0&time=2012-10-17T12%3A00%3A00Z&'
+            'exceptions=application%2Fvnd.ogc.se_xml&transparent=FALSE')
+        self.client = self.app.test_client()
+        result = self.client.get('/?{}'.format(query_string.replace("elevation=200", "elevation=1234")))
+        callback_ok_xml(result.status, result.headers)
+        assert result.data.count(b"ServiceExceptionReport") > 0, result
+
+    def test_squash_multiple_images(self):
+        background = Image.new("RGBA", (4, 4), (255, 0, 0, 255))
+        foreground = Image.new("RGBA", (4, 4), (0, 0, 0, 0))
+        foreground.putpixel((1, 1), (0, 0, 255, 255))
+        with Image.open(io.BytesIO(mslib.mswms.wms.squash_multiple_images([background, foreground]))) as image:
+            assert image.mode == "P"
+            image = image.convert("RGBA")
+            assert image.getpixel((0, 0)) == (255, 0, 0, 255)
+            assert image.getpixel((1, 1)) == (0, 0, 255, 255)
+
+        background = Image.new("RGBA", (4, 4), (0, 0, 0, 0))
+        with Image.open(io.BytesIO(mslib.mswms.wms.squash_multiple_images([background, foreground]))) as image:
+            assert image.mode == "RGBA"
+            assert image.getpixel((0, 0))[3] == 0
+            assert image.getpixel((1, 1)) == (0, 0, 255, 255)
+
     def test_multiple_xml(self):
         environ = {
             'wsgi.url_scheme': 'http',
@@ -377,6 +485,76 @@ class Test_WMS:
         result = self.client.get('/?{}'.format(environ["QUERY_STRING"]))
         callback_ok_xml(result.status, result.headers)
 
+    def test_produce_hsec_plot_concurrently(self):
+        query_string = (
+            'layers=ecmwf_EUR_LL015.{}&styles=&elevation=200&srs=EPSG%3A4326&format=image%2Fpng&'
+            'request=GetMap&bgcolor=0xFFFFFF&height=376&dim_init_time=2012-10-17T12%3A00%3A00Z&width=479&'
+            'version=1.1.1&bbox=-50.0%2C20.0%2C20.0%2C75.0&time=2012-10-17T12%3A00%3A00Z&'
+            'exceptions=application%2Fvnd.ogc.se_xml&transparent=FALSE')
+        layers = ["PLDiv01", "PLTemp01"] * 4
+
+        def request(layer):
+            return self.app.test_client().get('/?{}'.format(query_string.format(layer)))
+
+        expected = {layer: request(layer).data for layer in set(layers)}
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(request, layers))
+        for layer, result in zip(layers, results):
+            callback_ok_image(result.status, result.headers)
+            assert result.data == expected[layer]
+
+    def test_produce_plot_cached(self):
+        query_string = (
+            'layers=ecmwf_EUR_LL015.PLDiv01&styles=&elevation=200&srs=EPSG%3A4326&format=image%2Fpng&'
+            'request=GetMap&bgcolor=0xFFFFFF&height=376&dim_init_time=2012-10-17T12%3A00%3A00Z&width=479&'
+            'version=1.1.1&bbox=-50.0%2C20.0%2C20.0%2C75.0&time=2012-10-17T12%3A00%3A00Z&'
+            'exceptions=application%2Fvnd.ogc.se_xml&transparent=FALSE')
+        cache = mslib.mswms.wms.ResponseCache(10 * 1024 ** 2)
+        self.client = self.app.test_client()
+        with mock.patch.object(mslib.mswms.wms.server, "response_cache", new=cache):
+            result = self.client.get('/?{}'.format(query_string))
+            callback_ok_image(result.status, result.headers)
+            assert (cache.hits, cache.misses, len(cache)) == (0, 1, 1)
+
+            # parameter order and case do not matter
+            result2 = self.client.get('/?{}'.format("&".join(
+                param[0].upper() + param[1:] for param in reversed(query_string.split("&")))))
+            callback_ok_image(result2.status, result2.headers)
+            assert result2.data == result.data
+            assert (cache.hits, cache.misses) == (1, 1)
+
+            # a modified data file invalidates the response
+            filename = next(iter(next(iter(cache._entries.values()))[2]))
+            mtime = os.path.getmtime(filename)
+            os.utime(filename, (mtime + 1, mtime + 1))
+            try:
+                result3 = self.client.get('/?{}'.format(query_string))
+            finally:
+                os.utime(filename, (mtime, mtime))
+            callback_ok_image(result3.status, result3.headers)
+            assert (cache.hits, cache.misses, len(cache)) == (1, 2, 1)
+
+            # service exceptions are not cached
+            result4 = self.client.get('/?{}'.format(query_string.replace("elevation=200", "elevation=1234")))
+            callback_ok_xml(result4.status, result4.headers)
+            assert (cache.misses, len(cache)) == (3, 1)
+
+    def test_response_cache_eviction(self):
+        cache = mslib.mswms.wms.ResponseCache(10)
+        for key in "abc":
+            cache.put(key, (b"1234", "image/png"), (0,), [])
+        assert len(cache) == 2
+        assert cache.get("a", (0,)) is None
+        assert cache.get("b", (0,)) == (b"1234", "image/png")
+        cache.put("d", (b"1234", "image/png"), (0,), [])
+        assert cache.get("b", (0,)) is not None
+        assert cache.get("c", (0,)) is None
+        assert cache.get("b", (1,)) is None
+        assert len(cache) == 1
+        cache.put("e", (b"12345678901", "image/png"), (0,), [])
+        assert cache.get("e", (0,)) is None
+        assert (cache.hits, cache.misses) == (2, 4)
+
     def test_import_error(self):
         pytest.skip("disabled because of reload")
         with mock.patch.dict("sys.modules", {"mswms_settings": None, "mswms_auth": None}):
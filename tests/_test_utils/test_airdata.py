@@ -26,9 +26,11 @@
 """
 import os
 import mock
+import numpy as np
 from PyQt5 import QtWidgets
 from mslib.utils.airdata import download_progress, get_airports, \
-    get_available_airspaces, update_airspace, get_airspaces
+    get_available_airspaces, update_airspace, get_airspaces, BoundingBoxIndex, get_airports_index, \
+    get_airspaces_index
 from tests.constants import ROOT_DIR
 
 
@@ -134,6 +136,35 @@ def test_get_downloaded_airports(mockbox):
         assert 'continent' in airports[0].keys()
 
 
+@mock.patch("PyQt5.QtWidgets.QMessageBox.question", return_value=QtWidgets.QMessageBox.Yes)
+def test_get_airports_cached(mockbox):
+    with mock.patch("mslib.utils.airdata.download_progress", _download_progress_airports):
+        airports = get_airports(force_download=True)
+    assert get_airports() is airports
+    lons, lats, types, index = get_airports_index(airports)
+    assert get_airports_index(airports)[-1] is index
+    assert lons.tolist() == [-74.93360137939453]
+    assert types.tolist() == ["heliport"]
+    file_path = os.path.join(ROOT_DIR, "downloads", "aip", "airports.csv")
+    os.utime(file_path, (os.path.getmtime(file_path) + 1,) * 2)
+    reloaded = get_airports()
+    assert reloaded is not airports and reloaded == airports
+    assert mockbox.call_count == 1
+
+
+def test_bounding_box_index():
+    index = BoundingBoxIndex([170, -10, 0, -180], [-170 + 360, 10, 0, 180], [-10, -10, 45, -90], [10, 10, 45, 90])
+    assert index.query(-5, 5, 175, 10).tolist() == [True, False, False, True]
+    assert index.query(-5, 5, 355, 10).tolist() == [False, True, False, True]
+    assert index.query(40, 50, -20, 19).tolist() == [False, False, False, True]
+    assert index.query(40, 50, 0, 360).tolist() == [False, False, True, True]
+    polygons, bottoms, index = get_airspaces_index([
+        {"name": "A", "bottom": 1, "top": 2, "polygon": [(179, 0), (181, 1), (180, 2)]}])
+    assert bottoms.tolist() == [1]
+    np.testing.assert_array_equal(polygons[0], [(179, 0), (181, 1), (180, 2)])
+    assert index.query(0.5, 0.6, -179.5, 0.1).tolist() == [True]
+
+
 def test_get_available_airspaces():
     _cleanup_test_files()
     airspaces = get_available_airspaces()
@@ -27,8 +27,11 @@
 import logging
 import datetime
 
+import mock
 import numpy as np
 import pytest
+from scipy.interpolate import interp1d
+from scipy.ndimage import map_coordinates
 
 import mslib.utils.coordinate as coordinate
 
@@ -51,6 +54,30 @@ class TestGetDistance:
         assert coordinate.find_location(50.92, 6.36) == ([50.92, 6.36], 'Juelich')
         assert coordinate.find_location(50.9200002, 6.36) == ([50.92, 6.36], 'Juelich')
 
+    def test_find_location_index(self):
+        rng = np.random.default_rng(0)
+        locations = {f"L{i}": [lat, lon] for i, (lat, lon) in enumerate(zip(
+            np.degrees(np.arcsin(rng.uniform(-1, 1, 2000))).tolist(), rng.uniform(-180, 180, 2000).tolist()))}
+        locations["North Pole"] = [90., 0.]
+        with mock.patch("mslib.utils.coordinate.config_loader", return_value=locations):
+            for lat, lon in [(0., 179.99), (89.9, 45.), (-30., -60.)] + list(zip(
+                    rng.uniform(-90, 90, 50).tolist(), rng.uniform(-180, 180, 50).tolist())):
+                nearest = min((coordinate.get_distance(lat, lon, *location), name)
+                              for name, location in locations.items())
+                for tolerance in (1e-3, 50, 200, 1000):
+                    expected = (locations[nearest[1]], nearest[1]) if nearest[0] <= tolerance else None
+                    assert coordinate.find_location(lat, lon, tolerance) == expected
+            lat, lon = locations["L0"]
+            assert coordinate.find_location(lat, lon, 1e-3) == ([lat, lon], "L0")
+            assert coordinate.find_location(lat + 1e-3, lon, 0.2) == ([lat, lon], "L0")
+
+        # replaced locations rebuild the index
+        with mock.patch("mslib.utils.coordinate.config_loader", return_value={"Moved": [lat + 1e-3, lon]}):
+            assert coordinate.find_location(lat, lon, 1e-3) is None
+            assert coordinate.find_location(lat + 1e-3, lon, 1e-3) == ([lat + 1e-3, lon], "Moved")
+        with mock.patch("mslib.utils.coordinate.config_loader", return_value={}):
+            assert coordinate.find_location(lat, lon) is None
+
 
 class TestProjections:
     def test_get_projection_params(self):
@@ -190,3 +217,36 @@ def test_pathpoints():
     for i in range(3):
         assert pytest.approx(result[i][0]) == ref[i][0]
         assert pytest.approx(result[i][-1]) == ref[i][-1]
+
+
+def test_interpolate_vertsec():
+    def reference(data3D, data3D_lats, data3D_lons, lats, lons):
+        # interpolation with one call of map_coordinates per level
+        ind_lats = interp1d(data3D_lats, np.arange(len(data3D_lats)), bounds_error=False)(lats)
+        ind_lons = interp1d(data3D_lons, np.arange(len(data3D_lons)), bounds_error=False)(lons)
+        curtain = np.array([map_coordinates(level.filled(np.nan), [ind_lats, ind_lons], order=1)
+                            for level in data3D])
+        curtain[:, np.isnan(ind_lats) | np.isnan(ind_lons)] = np.nan
+        return np.ma.masked_invalid(curtain)
+
+    rng = np.random.default_rng(0)
+    data3D_lats = np.sort(rng.uniform(-80, 80, 40))
+    data3D_lons = np.linspace(-20, 40, 60)
+    data3D = np.ma.masked_array(rng.normal(size=(30, 40, 60)).astype(np.float32))
+    data3D[3, 10:12, 20:25] = np.ma.masked
+    data3D[5, 39, :] = np.nan
+    data3D[7, :, -1] = np.ma.masked
+    lats = np.concatenate([rng.uniform(-90, 90, 500), data3D_lats[[0, -1]], [data3D_lats[5]] * 2])
+    lons = np.concatenate([rng.uniform(-30, 50, 500), data3D_lons[[0, -1]], [data3D_lons[-1], 3.]])
+
+    expected = reference(data3D, data3D_lats, data3D_lons, lats, lons)
+    result = coordinate.interpolate_vertsec(data3D, data3D_lats, data3D_lons, lats, lons)
+    assert result.shape == expected.shape
+    assert (result.mask == expected.mask).all()
+    assert 0 < result.mask.sum() < result.size
+    assert np.allclose(result.filled(0), expected.filled(0))
+
+    weights = coordinate.get_interpolation_weights(data3D_lats, data3D_lons, lats, lons)
+    result = coordinate.interpolate_vertsec(data3D[:1], data3D_lats, data3D_lons, lats, lons, weights=weights)
+    assert (result.mask == expected[:1].mask).all()
+    assert np.allclose(result.filled(0), expected[:1].filled(0))
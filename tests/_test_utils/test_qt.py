@@ -25,6 +25,8 @@
     limitations under the License.
 """
 
+import threading
+
 import pytest
 import mock
 import mslib.utils.qt as mqt
@@ -185,3 +187,31 @@ def test_get_existing_directory_qt():
     with mock.patch("mslib.utils.qt.QtWidgets.QFileDialog.getExistingDirectory", return_value=dirname):
         _dirname = mqt.get_existing_directory_qt()
         assert _dirname == dirname
+
+
+def test_worker_pool(qtbot):
+    pool = mqt.WorkerPool()
+    release = threading.Event()
+    calls, results, errors = [], [], []
+
+    def compute(value):
+        calls.append(value)
+        if value == 0:
+            release.wait(10)
+        if value < 0:
+            raise ValueError(value)
+        return value
+
+    pool.submit("a", lambda: compute(0), results.append)
+    pool.submit("a", lambda: compute(1), results.append)
+    pool.submit("a", lambda: compute(2), results.append)
+    pool.submit("b", lambda: compute(3), results.append)
+    pool.submit("c", lambda: compute(4), results.append)
+    pool.cancel("c")
+    pool.submit("d", lambda: compute(-1), results.append, errors.append)
+    release.set()
+    pool.wait()
+    # superseded submissions are never started, results of cancelled ones are discarded
+    assert sorted(calls) == [-1, 0, 2, 3, 4]
+    assert sorted(results) == [2, 3]
+    assert [str(_x) for _x in errors] == ["-1"]
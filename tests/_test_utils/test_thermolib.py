@@ -25,8 +25,12 @@
     limitations under the License.
 """
 
+import logging
+import time
+
 import numpy as np
 import pytest
+from metpy.constants import Rd, g
 
 from mslib.utils.units import units
 from mslib.utils import thermolib
@@ -70,6 +74,49 @@ def test_pressure2flightlevel():
         thermolib.pressure2flightlevel(3.9 * units.Pa)
 
 
+def test_height2pressure():
+    def reference(height):
+        # former pint based implementation the unit-free one is benchmarked against
+        p = np.full_like(height, np.nan) * units.Pa
+        for i, ((z0, t0, p0, gamma), (z1, t1, p1, _)) in enumerate(zip(thermolib._STANDARD_ATMOSPHERE[:-1],
+                                                                       thermolib._STANDARD_ATMOSPHERE[1:])):
+            indices = (height >= z0) & (height < z1)
+            if i == 0:
+                indices |= height < z0
+            if gamma != 0:
+                p[indices] = p0 * ((t0 - gamma * (height[indices] - z0)) / t0) ** (g / (gamma * Rd))
+            else:
+                p[indices] = p0 * np.exp(-g * (height[indices] - z0) / (Rd * t0))
+        return p
+
+    heights = np.random.default_rng(0).uniform(-500, 70999, 1000000)
+    start = time.perf_counter()
+    expected = reference(heights * units.m).m_as(units.Pa)
+    reference_time = time.perf_counter() - start
+    start = time.perf_counter()
+    pressures = thermolib.height2pressure(heights)
+    fast_time = time.perf_counter() - start
+    start = time.perf_counter()
+    heights_p = thermolib.pressure2height(pressures)
+    inverse_time = time.perf_counter() - start
+    logging.info("pint: %.3fs, unit-free: %.3fs, inverse: %.3fs", reference_time, fast_time, inverse_time)
+    assert pressures == pytest.approx(expected, rel=1e-12)
+    # the tabulated layer pressures are rounded, which leaves sub-metre steps at the layer boundaries
+    assert heights_p == pytest.approx(heights, abs=0.5)
+
+    # scalars and arbitrary shapes
+    assert isinstance(thermolib.height2pressure(0), float)
+    assert thermolib.height2pressure(0) == pytest.approx(101325)
+    assert thermolib.pressure2height(101325.) == pytest.approx(0)
+    assert thermolib.height2pressure(heights[:6].reshape(2, 3)).shape == (2, 3)
+    for height in [71000, np.nan, [0, 72000]]:
+        with pytest.raises(ValueError):
+            thermolib.height2pressure(height)
+    for pressure in [3.9, np.nan, [1000, 3]]:
+        with pytest.raises(ValueError):
+            thermolib.pressure2height(pressure)
+
+
 def test_isa_temperature():
     assert thermolib.isa_temperature(100 * units.hft).magnitude == pytest.approx(268.338)
     assert thermolib.isa_temperature(200 * units.hft).magnitude == pytest.approx(248.526)
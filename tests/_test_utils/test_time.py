@@ -26,6 +26,7 @@
 """
 import logging
 import datetime
+import pytest
 import mslib.utils.time as time
 
 LOGGER = logging.getLogger(__name__)
@@ -38,6 +39,19 @@ class TestParseTime:
     def test_parse_iso_duration(self):
         assert time.parse_iso_duration('P01W') == datetime.timedelta(days=7)
 
+    def test_parse_iso_time_list(self):
+        times = [datetime.datetime(2012, 10, 17, 12), datetime.datetime(2012, 10, 17, 18)]
+        assert time.parse_iso_time_list("2012-10-17T12:00:00Z") == times[:1]
+        assert time.parse_iso_time_list("2012-10-17T12:00:00Z,2012-10-17T18:00:00Z") == times
+        assert time.parse_iso_time_list("2012-10-17T12:00:00Z/2012-10-17T20:00:00Z/PT6H") == times
+        for string in ["2012-10-17T12:00:00Z/2012-10-17T20:00:00Z", "2012-10-17T12:00:00Z/2012-10-17T20:00:00Z/P1M",
+                       "2012-10-17T12:00:00Z/2012-10-17T20:00:00Z/-PT6H", "2012-10-17T12:00:00Z,fnord"]:
+            with pytest.raises(ValueError):
+                time.parse_iso_time_list(string)
+        with pytest.raises(ValueError):
+            time.parse_iso_time_list("2012-10-17T12:00:00Z/2012-10-17T20:00:00Z/PT1H", max_length=8)
+        assert len(time.parse_iso_time_list("2012-10-17T12:00:00Z/2012-10-17T20:00:00Z/PT1H", max_length=9)) == 9
+
 
 class TestTimes:
     """
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+
+    tests._test_utils.test_waypoint_patch
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    This module provides pytest functions to tests mslib.utils.waypoint_patch
+
+    This file is part of MSS.
+
+    :copyright: Copyright 2024 by the MSS team, see AUTHORS.
+    :license: APACHE-2.0, see LICENSE for details.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+import random
+import pytest
+
+from mslib.utils.waypoint_patch import (waypoint_dict, read_waypoints, write_waypoints,
+                                        apply_waypoint_patch, diff_waypoints)
+
+
+class TestWaypointPatch:
+    waypoints = [waypoint_dict("Kiruna", 67.821, 20.336, 250.),
+                 waypoint_dict("", 70., 15., 350., "Dive"),
+                 waypoint_dict("Ny-Alesund", 78.928, 11.986, 250., "Landing & <refuel>")]
+
+    def test_read_write(self):
+        xml_content = write_waypoints(self.waypoints)
+        assert read_waypoints(xml_content) == self.waypoints
+        assert write_waypoints(read_waypoints(xml_content)) == xml_content
+        with pytest.raises(ValueError):
+            read_waypoints("<FlightTrack>")
+
+    def test_apply(self):
+        new_waypoint = waypoint_dict("", 1., 2., 3.)
+        assert apply_waypoint_patch(self.waypoints, [{"op": "insert", "index": 3, "waypoint": new_waypoint}]) == \
+            self.waypoints + [new_waypoint]
+        assert apply_waypoint_patch(self.waypoints, [{"op": "delete", "index": 0}]) == self.waypoints[1:]
+        assert apply_waypoint_patch(self.waypoints, [{"op": "edit", "index": 1, "waypoint": new_waypoint}]) == \
+            [self.waypoints[0], new_waypoint, self.waypoints[2]]
+        assert apply_waypoint_patch(self.waypoints, [{"op": "move", "index": 0, "to": 2}]) == \
+            [self.waypoints[1], self.waypoints[2], self.waypoints[0]]
+        # the input is not modified
+        assert len(self.waypoints) == 3
+
+    @pytest.mark.parametrize("ops", [
+        [{"op": "delete", "index": 3}],
+        [{"op": "insert", "index": 4, "waypoint": waypoint_dict()}],
+        [{"op": "edit", "index": 0, "waypoint": {"lat": 1.}}],
+        [{"op": "move", "index": 0, "to": 3}],
+        [{"op": "rotate", "index": 0}],
+        [{"index": 0}],
+    ])
+    def test_apply_invalid(self, ops):
+        with pytest.raises(ValueError):
+            apply_waypoint_patch(self.waypoints, ops)
+
+    def test_diff(self):
+        assert diff_waypoints(self.waypoints, self.waypoints) == []
+        moved = [self.waypoints[1], self.waypoints[2], self.waypoints[0]]
+        assert diff_waypoints(self.waypoints, moved) == [{"op": "move", "index": 0, "to": 2}]
+        edited = [self.waypoints[0], waypoint_dict("", 70.5, 15., 350., "Dive"), self.waypoints[2]]
+        ops = diff_waypoints(self.waypoints, edited)
+        assert [(op["op"], op["index"]) for op in ops] == [("edit", 1)]
+
+    def test_diff_apply(self):
+        rng = random.Random(0)
+        for _ in range(500):
+            old = [waypoint_dict("", rng.randint(0, 5), 0., 0.) for _ in range(rng.randint(0, 8))]
+            new = list(old)
+            for _ in range(rng.randint(0, 3)):
+                if new and rng.random() < 0.5:
+                    new.pop(rng.randrange(len(new)))
+                else:
+                    new.insert(rng.randint(0, len(new)), waypoint_dict("", rng.randint(0, 5), 1., 0.))
+            assert apply_waypoint_patch(old, diff_waypoints(old, new)) == new
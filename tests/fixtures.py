@@ -119,13 +119,15 @@ def mscolab_session_server(mscolab_session_app, mscolab_session_managers):
 
 
 @pytest.fixture
-def reset_mscolab(mscolab_session_app):
+def reset_mscolab(mscolab_session_app, mscolab_session_managers):
     """Cleans up before every test that uses MSColab.
 
     This fixture is not explicitly needed in tests, it is used in the other fixtures to
     do the cleanup actions.
     """
     handle_db_reset()
+    _, _, fm = mscolab_session_managers
+    fm.operation_versions.clear()
 
 
 @pytest.fixture